@@ -0,0 +1,98 @@
+"""add notifications and notification_preferences tables
+
+Revision ID: 3c9e1f7a2b64
+Revises: 930f7ed16793
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e1f7a2b64"
+down_revision: Union[str, Sequence[str], None] = "930f7ed16793"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create notification tables (skipped where they were created from the models)."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("notifications"):
+        op.create_table(
+            "notifications",
+            sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("type", sa.String(length=50), nullable=False),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("message", sa.Text(), nullable=False),
+            sa.Column("reference_id", postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column("reference_type", sa.String(length=50), nullable=True),
+            sa.Column("actor_id", postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column("is_read", sa.Boolean(), nullable=False),
+            sa.Column("read_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False
+            ),
+            sa.Column(
+                "updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False
+            ),
+            sa.ForeignKeyConstraint(
+                ["user_id"], ["users.id"], name="fk_notifications_user_id_users", ondelete="CASCADE"
+            ),
+            sa.ForeignKeyConstraint(
+                ["actor_id"], ["users.id"], name="fk_notifications_actor_id_users", ondelete="SET NULL"
+            ),
+            sa.PrimaryKeyConstraint("id", name="pk_notifications"),
+        )
+        op.create_index("ix_notifications_user_id", "notifications", ["user_id"])
+        op.create_index("ix_notifications_is_read", "notifications", ["is_read"])
+        op.create_index("ix_notifications_type", "notifications", ["type"])
+        op.create_index("ix_notifications_created_at", "notifications", ["created_at"])
+        op.create_index("ix_notifications_user_id_is_read", "notifications", ["user_id", "is_read"])
+        op.create_index(
+            "ix_notifications_user_id_created_at", "notifications", ["user_id", "created_at"]
+        )
+
+    if not inspector.has_table("notification_preferences"):
+        op.create_table(
+            "notification_preferences",
+            sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("mentions", sa.Boolean(), nullable=False),
+            sa.Column("reactions", sa.Boolean(), nullable=False),
+            sa.Column("replies", sa.Boolean(), nullable=False),
+            sa.Column("direct_messages", sa.Boolean(), nullable=False),
+            sa.Column("channel_updates", sa.Boolean(), nullable=False),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False
+            ),
+            sa.Column(
+                "updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False
+            ),
+            sa.ForeignKeyConstraint(
+                ["user_id"],
+                ["users.id"],
+                name="fk_notification_preferences_user_id_users",
+                ondelete="CASCADE",
+            ),
+            sa.PrimaryKeyConstraint("id", name="pk_notification_preferences"),
+        )
+        op.create_index(
+            "ix_notification_preferences_user_id",
+            "notification_preferences",
+            ["user_id"],
+            unique=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop notification tables."""
+    op.drop_table("notification_preferences")
+    op.drop_table("notifications")
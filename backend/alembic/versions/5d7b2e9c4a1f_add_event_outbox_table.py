@@ -0,0 +1,46 @@
+"""add event_outbox table
+
+Revision ID: 5d7b2e9c4a1f
+Revises: 3c9e1f7a2b64
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5d7b2e9c4a1f"
+down_revision: Union[str, Sequence[str], None] = "3c9e1f7a2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the transactional outbox (skipped where it was created from the models)."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("event_outbox"):
+        op.create_table(
+            "event_outbox",
+            sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+            sa.Column("shard", sa.SmallInteger(), nullable=False),
+            sa.Column("topic", sa.String(length=100), nullable=False),
+            sa.Column("key", sa.String(length=255), nullable=True),
+            sa.Column("event_type", sa.String(length=100), nullable=False),
+            sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False
+            ),
+            sa.PrimaryKeyConstraint("id", name="pk_event_outbox"),
+        )
+        op.create_index("ix_event_outbox_shard_id", "event_outbox", ["shard", "id"])
+
+
+def downgrade() -> None:
+    """Drop the transactional outbox."""
+    op.drop_index("ix_event_outbox_shard_id", table_name="event_outbox")
+    op.drop_table("event_outbox")
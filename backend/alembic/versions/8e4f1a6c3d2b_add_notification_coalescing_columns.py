@@ -0,0 +1,48 @@
+"""add notification coalescing columns
+
+Revision ID: 8e4f1a6c3d2b
+Revises: 5d7b2e9c4a1f
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4f1a6c3d2b"
+down_revision: Union[str, Sequence[str], None] = "5d7b2e9c4a1f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add group_key/actor_count and the index of open aggregates."""
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("notifications")}
+
+    if "group_key" not in columns:
+        op.add_column("notifications", sa.Column("group_key", sa.String(length=100), nullable=True))
+    if "actor_count" not in columns:
+        op.add_column(
+            "notifications",
+            sa.Column("actor_count", sa.Integer(), server_default="1", nullable=False),
+        )
+    if "ix_notifications_user_id_group_key_unread" not in {
+        index["name"] for index in inspector.get_indexes("notifications")
+    }:
+        op.create_index(
+            "ix_notifications_user_id_group_key_unread",
+            "notifications",
+            ["user_id", "group_key"],
+            postgresql_where=sa.text("group_key IS NOT NULL AND NOT is_read"),
+        )
+
+
+def downgrade() -> None:
+    """Drop the coalescing columns."""
+    op.drop_index("ix_notifications_user_id_group_key_unread", table_name="notifications")
+    op.drop_column("notifications", "actor_count")
+    op.drop_column("notifications", "group_key")
@@ -0,0 +1,36 @@
+"""add notification actor ids
+
+Revision ID: b7c3e9d14a5f
+Revises: 8e4f1a6c3d2b
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b7c3e9d14a5f"
+down_revision: Union[str, Sequence[str], None] = "8e4f1a6c3d2b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the distinct actors of aggregated notifications."""
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("notifications")}
+
+    if "actor_ids" not in columns:
+        op.add_column(
+            "notifications",
+            sa.Column("actor_ids", postgresql.ARRAY(postgresql.UUID(as_uuid=True)), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    """Drop the aggregate actors."""
+    op.drop_column("notifications", "actor_ids")
@@ -0,0 +1,3 @@
+"""Root pytest configuration for the backend."""
+
+pytest_plugins = ["shared.testing.pytest_plugin"]
@@ -5,18 +5,25 @@ This script seeds sample data for the BI analytics dashboard if the database
 has too few records (< 5 users or < 20 messages). It creates realistic sample
 channels and messages spread over the past few days without breaking existing data.
 
+With --large it instead bulk-loads a power-law synthetic dataset through COPY
+(see shared.testing.datagen), for capacity testing and the hot-query EXPLAIN
+suite (explain_hot_queries.py).
+
 Usage:
     python seed_analytics_data.py
+    python seed_analytics_data.py --large --profile large --reset
 
 Can also be run inside a Docker container:
     docker exec colink-message python -m scripts.seed_analytics_data
 """
 
+import argparse
 import asyncio
 import logging
 import os
 import random
 import sys
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
@@ -38,6 +45,7 @@ from shared.database.models import (
     UserStatus,
     UserRole,
 )
+from shared.testing.datagen import PROFILES, load_dataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -227,5 +235,31 @@ async def seed_data():
         await engine.dispose()
 
 
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--large", action="store_true", help="Bulk-load a large synthetic dataset")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="medium")
+    parser.add_argument("--messages", type=int)
+    parser.add_argument("--notifications", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--reset", action="store_true", help="Delete a previous large dataset first")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_data())
+    args = parse_args()
+    if args.large:
+        overrides = {
+            name: getattr(args, name)
+            for name in ("messages", "notifications", "seed")
+            if getattr(args, name) is not None
+        }
+        profile = replace(PROFILES[args.profile], **overrides)
+        stats = asyncio.run(load_dataset(DATABASE_URL, profile, reset=args.reset))
+        logger.info(
+            f"✅ Large dataset seeded: {stats.total_rows} rows in {stats.elapsed:.1f}s "
+            f"({stats.rows_per_minute:,.0f} rows/min)"
+        )
+    else:
+        asyncio.run(seed_data())
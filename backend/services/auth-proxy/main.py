@@ -8,7 +8,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from shared.database import close_db, init_db
+from shared.database import DatabaseMetricsMiddleware, close_db, init_db
 
 from .config import settings
 from .middleware import auth_middleware
@@ -53,6 +53,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
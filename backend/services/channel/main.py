@@ -10,8 +10,8 @@ from fastapi.openapi.utils import get_openapi
 from config import settings
 from middleware import AuthMiddleware
 from routers import channels, health, members
-from services.kafka_producer import kafka_producer
-from shared.database import close_db, init_db
+from services.kafka_producer import kafka_producer, outbox_relay
+from shared.database import DatabaseMetricsMiddleware, close_db, init_db
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Configure logging
@@ -37,7 +37,10 @@ async def lifespan(app: FastAPI):
         await kafka_producer.start()
     except Exception as e:
         logger.error(f"Failed to start Kafka producer: {e}")
-        logger.warning("Continuing without Kafka - events will not be published")
+        logger.warning("Continuing without Kafka - events stay in the outbox until it is back")
+
+    # Start publishing committed events
+    outbox_relay.start()
 
     logger.info("Channel Service started successfully")
 
@@ -46,6 +49,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Channel Service...")
 
+    # Stop the outbox relay before the producer it publishes with
+    await outbox_relay.stop()
+
     # Stop Kafka producer
     await kafka_producer.stop()
 
@@ -70,6 +76,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 def custom_openapi():
     """Customize OpenAPI schema to add security."""
     if app.openapi_schema:
@@ -8,18 +8,77 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, desc, or_, select
+from sqlalchemy import and_, desc, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from dependencies import get_current_user, get_pagination_params, security, verify_channel_admin
-from shared.database import Channel, ChannelMember, ChannelType, Message, User, get_db
+from shared.database import (
+    Channel,
+    ChannelMember,
+    ChannelType,
+    Message,
+    User,
+    get_db,
+    query_budget,
+)
+from shared.events.outbox import add_outbox_event
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+# Helper Functions
+async def get_member_counts(channel_ids: List[UUID], db: AsyncSession) -> dict:
+    """Get member counts for multiple channels in a single query."""
+    if not channel_ids:
+        return {}
+
+    stmt = (
+        select(ChannelMember.channel_id, func.count(ChannelMember.id))
+        .where(ChannelMember.channel_id.in_(channel_ids))
+        .group_by(ChannelMember.channel_id)
+    )
+    result = await db.execute(stmt)
+    return dict(result.all())
+
+
+async def get_unread_counts(
+    channel_ids: List[UUID], user_id: UUID, db: AsyncSession
+) -> dict:
+    """Get unread message counts for multiple channels in a single query.
+
+    A message is unread if it was posted by someone else after the user's
+    last_read_at (or at any time if the channel was never read).
+    """
+    if not channel_ids:
+        return {}
+
+    stmt = (
+        select(Message.channel_id, func.count(Message.id))
+        .join(
+            ChannelMember,
+            and_(
+                ChannelMember.channel_id == Message.channel_id,
+                ChannelMember.user_id == user_id,
+            ),
+        )
+        .where(
+            Message.channel_id.in_(channel_ids),
+            Message.author_id != user_id,  # Don't count own messages
+            Message.deleted_at.is_(None),  # Don't count deleted messages
+            or_(
+                ChannelMember.last_read_at.is_(None),
+                Message.created_at > ChannelMember.last_read_at,
+            ),
+        )
+        .group_by(Message.channel_id)
+    )
+    result = await db.execute(stmt)
+    return dict(result.all())
+
+
 # Request/Response Models
 class ChannelCreate(BaseModel):
     """Request model for creating a channel."""
@@ -65,6 +124,13 @@ class ChannelResponse(BaseModel):
         from_attributes = True
 
 
+class MembershipSnapshotResponse(BaseModel):
+    """Response model for the channels a user belongs to."""
+
+    user_id: UUID
+    channel_ids: List[UUID]
+
+
 class ChannelListResponse(BaseModel):
     """Response model for a list of channels."""
 
@@ -76,6 +142,7 @@ class ChannelListResponse(BaseModel):
 
 # Endpoints
 @router.post("/channels", response_model=ChannelResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(5)
 async def create_channel(
     channel_data: ChannelCreate,
     current_user: User = Depends(get_current_user),
@@ -122,20 +189,11 @@ async def create_channel(
     )
     db.add(member)
 
-    await db.commit()
-    await db.refresh(channel)
-
-    logger.info(
-        f"Channel created: {channel.id} ({channel.name}) by user {current_user.id}"
-    )
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="channel.created",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "channel.created",
+        {
             "id": str(channel.id),
             "name": channel.name,
             "channel_type": channel.channel_type,
@@ -145,6 +203,11 @@ async def create_channel(
         },
         key=str(channel.id),
     )
+    await db.commit()
+
+    logger.info(
+        f"Channel created: {channel.id} ({channel.name}) by user {current_user.id}"
+    )
 
     return ChannelResponse(
         id=channel.id,
@@ -195,7 +258,29 @@ async def mark_channel_as_read(
     return None
 
 
+@router.get("/channels/memberships/me", response_model=MembershipSnapshotResponse)
+@query_budget(2)
+async def get_membership_snapshot(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the IDs of every channel the current user is a member of.
+
+    Used by the WebSocket service to subscribe a connecting client to all of
+    its channel rooms at once. Unlike GET /channels this is unpaginated and
+    carries no counts, so it stays a single index lookup.
+    """
+    stmt = select(ChannelMember.channel_id).where(ChannelMember.user_id == current_user.id)
+    result = await db.execute(stmt)
+
+    return MembershipSnapshotResponse(
+        user_id=current_user.id,
+        channel_ids=list(result.scalars().all()),
+    )
+
+
 @router.get("/channels/{channel_id}", response_model=ChannelResponse)
+@query_budget(4)
 async def get_channel(
     channel_id: UUID,
     current_user: User = Depends(get_current_user),
@@ -217,15 +302,16 @@ async def get_channel(
         )
 
     # Get member count
-    stmt = select(ChannelMember).where(ChannelMember.channel_id == channel_id)
-    result = await db.execute(stmt)
-    members = result.scalars().all()
-    member_count = len(members)
+    member_counts = await get_member_counts([channel_id], db)
+    member_count = member_counts.get(channel_id, 0)
 
     # Check if current user is a member
-    user_membership = next(
-        (m for m in members if m.user_id == current_user.id), None
+    stmt = select(ChannelMember).where(
+        ChannelMember.channel_id == channel_id,
+        ChannelMember.user_id == current_user.id,
     )
+    result = await db.execute(stmt)
+    user_membership = result.scalar_one_or_none()
     is_member = user_membership is not None
     is_admin = user_membership.is_admin if user_membership else False
 
@@ -244,6 +330,7 @@ async def get_channel(
 
 
 @router.get("/channels", response_model=ChannelListResponse)
+@query_budget(5)
 async def list_user_channels(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -255,7 +342,7 @@ async def list_user_channels(
     """
     # Get user's channel memberships
     stmt = (
-        select(Channel)
+        select(Channel, ChannelMember)
         .join(ChannelMember, Channel.id == ChannelMember.channel_id)
         .where(ChannelMember.user_id == current_user.id)
         .order_by(desc(Channel.updated_at))
@@ -263,59 +350,23 @@ async def list_user_channels(
         .offset(pagination["offset"])
     )
     result = await db.execute(stmt)
-    channels = result.scalars().all()
+    channels_with_membership = result.all()
 
     # Get total count
-    count_stmt = (
-        select(Channel)
-        .join(ChannelMember, Channel.id == ChannelMember.channel_id)
-        .where(ChannelMember.user_id == current_user.id)
+    count_stmt = select(func.count(ChannelMember.id)).where(
+        ChannelMember.user_id == current_user.id
     )
     count_result = await db.execute(count_stmt)
-    total = len(count_result.scalars().all())
+    total = count_result.scalar() or 0
+
+    # Fetch member and unread counts for all channels on the page
+    channel_ids = [channel.id for channel, _ in channels_with_membership]
+    member_counts = await get_member_counts(channel_ids, db)
+    unread_counts = await get_unread_counts(channel_ids, current_user.id, db)
 
     # Build response
     channel_responses = []
-    for channel in channels:
-        # Get member count
-        member_stmt = select(ChannelMember).where(
-            ChannelMember.channel_id == channel.id
-        )
-        member_result = await db.execute(member_stmt)
-        members = member_result.scalars().all()
-
-        # Check if user is admin
-        user_membership = next(
-            (m for m in members if m.user_id == current_user.id), None
-        )
-        is_admin = user_membership.is_admin if user_membership else False
-
-        # Calculate unread count
-        unread_count = 0
-        if user_membership and user_membership.last_read_at:
-            # Count messages after last_read_at
-            unread_stmt = select(Message).where(
-                and_(
-                    Message.channel_id == channel.id,
-                    Message.created_at > user_membership.last_read_at,
-                    Message.author_id != current_user.id,  # Don't count own messages
-                    Message.deleted_at.is_(None),  # Don't count deleted messages
-                )
-            )
-            unread_result = await db.execute(unread_stmt)
-            unread_count = len(unread_result.scalars().all())
-        elif not user_membership or not user_membership.last_read_at:
-            # If never read, count all messages except own
-            unread_stmt = select(Message).where(
-                and_(
-                    Message.channel_id == channel.id,
-                    Message.author_id != current_user.id,
-                    Message.deleted_at.is_(None),
-                )
-            )
-            unread_result = await db.execute(unread_stmt)
-            unread_count = len(unread_result.scalars().all())
-
+    for channel, user_membership in channels_with_membership:
         channel_responses.append(
             ChannelResponse(
                 id=channel.id,
@@ -325,10 +376,10 @@ async def list_user_channels(
                 topic=channel.topic,
                 created_at=channel.created_at,
                 updated_at=channel.updated_at,
-                member_count=len(members),
+                member_count=member_counts.get(channel.id, 0),
                 is_member=True,
-                is_admin=is_admin,
-                unread_count=unread_count,
+                is_admin=user_membership.is_admin,
+                unread_count=unread_counts.get(channel.id, 0),
             )
         )
 
@@ -341,6 +392,7 @@ async def list_user_channels(
 
 
 @router.get("/channels/public/list", response_model=ChannelListResponse)
+@query_budget(5)
 async def list_public_channels(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -366,29 +418,32 @@ async def list_public_channels(
     channels = result.scalars().all()
 
     # Get total count
-    count_stmt = select(Channel).where(Channel.channel_type == ChannelType.public.value)
+    count_stmt = select(func.count(Channel.id)).where(
+        Channel.channel_type == ChannelType.public.value
+    )
     if search:
         count_stmt = count_stmt.where(Channel.name.ilike(f"%{search}%"))
     count_result = await db.execute(count_stmt)
-    total = len(count_result.scalars().all())
+    total = count_result.scalar() or 0
 
-    # Get user's memberships
-    membership_stmt = select(ChannelMember).where(
-        ChannelMember.user_id == current_user.id
-    )
-    membership_result = await db.execute(membership_stmt)
-    user_memberships = {m.channel_id: m for m in membership_result.scalars().all()}
+    channel_ids = [channel.id for channel in channels]
+
+    # Get user's memberships for the channels on this page
+    user_memberships = {}
+    if channel_ids:
+        membership_stmt = select(ChannelMember).where(
+            ChannelMember.user_id == current_user.id,
+            ChannelMember.channel_id.in_(channel_ids),
+        )
+        membership_result = await db.execute(membership_stmt)
+        user_memberships = {m.channel_id: m for m in membership_result.scalars().all()}
+
+    # Get member counts for all channels on this page
+    member_counts = await get_member_counts(channel_ids, db)
 
     # Build response
     channel_responses = []
     for channel in channels:
-        # Get member count
-        member_stmt = select(ChannelMember).where(
-            ChannelMember.channel_id == channel.id
-        )
-        member_result = await db.execute(member_stmt)
-        member_count = len(member_result.scalars().all())
-
         # Check if user is member/admin
         membership = user_memberships.get(channel.id)
         is_member = membership is not None
@@ -403,7 +458,7 @@ async def list_public_channels(
                 topic=channel.topic,
                 created_at=channel.created_at,
                 updated_at=channel.updated_at,
-                member_count=member_count,
+                member_count=member_counts.get(channel.id, 0),
                 is_member=is_member,
                 is_admin=is_admin,
             )
@@ -458,18 +513,11 @@ async def update_channel(
 
     channel.updated_at = datetime.now(timezone.utc)
 
-    await db.commit()
-    await db.refresh(channel)
-
-    logger.info(f"Channel updated: {channel.id} by user {current_user.id}")
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="channel.updated",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "channel.updated",
+        {
             "id": str(channel.id),
             "name": channel.name,
             "description": channel.description,
@@ -479,11 +527,13 @@ async def update_channel(
         },
         key=str(channel.id),
     )
+    await db.commit()
+
+    logger.info(f"Channel updated: {channel.id} by user {current_user.id}")
 
     # Get member count for response
-    stmt = select(ChannelMember).where(ChannelMember.channel_id == channel_id)
-    result = await db.execute(stmt)
-    member_count = len(result.scalars().all())
+    member_counts = await get_member_counts([channel_id], db)
+    member_count = member_counts.get(channel_id, 0)
 
     return ChannelResponse(
         id=channel.id,
@@ -530,17 +580,11 @@ async def delete_channel(
 
     # Delete the channel
     await db.delete(channel)
-    await db.commit()
-
-    logger.info(f"Channel deleted: {channel_id} by user {current_user.id}")
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="channel.deleted",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "channel.deleted",
+        {
             "id": str(channel_id),
             "name": channel.name,
             "deleted_by": str(current_user.id),
@@ -548,9 +592,13 @@ async def delete_channel(
         },
         key=str(channel_id),
     )
+    await db.commit()
+
+    logger.info(f"Channel deleted: {channel_id} by user {current_user.id}")
 
 
 @router.post("/channels/dm", response_model=ChannelResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(6)
 async def create_dm_channel(
     dm_data: DMChannelCreate,
     current_user: User = Depends(get_current_user),
@@ -580,46 +628,43 @@ async def create_dm_channel(
         )
 
     # Check if DM channel already exists between these users
-    # A DM channel has both users as members
+    # A DM channel has exactly two members, and both users are among them
+    member_count = func.count(ChannelMember.id)
     stmt = (
         select(Channel)
         .join(ChannelMember, Channel.id == ChannelMember.channel_id)
-        .where(
-            Channel.channel_type == ChannelType.direct.value,
-            ChannelMember.user_id.in_([current_user.id, dm_data.other_user_id]),
-        )
+        .where(Channel.channel_type == ChannelType.direct.value)
         .group_by(Channel.id)
+        .having(member_count == 2)
+        .having(
+            member_count.filter(
+                ChannelMember.user_id.in_([current_user.id, dm_data.other_user_id])
+            )
+            == 2
+        )
+        .limit(1)
     )
     result = await db.execute(stmt)
-    potential_channels = result.scalars().all()
+    channel = result.scalar_one_or_none()
 
-    # Check which channel has both users
-    for channel in potential_channels:
-        member_stmt = select(ChannelMember).where(
-            ChannelMember.channel_id == channel.id
+    if channel:
+        # Found existing DM channel
+        logger.info(
+            f"Returning existing DM channel: {channel.id} between users {current_user.id} and {dm_data.other_user_id}"
         )
-        member_result = await db.execute(member_stmt)
-        members = member_result.scalars().all()
-        member_ids = {m.user_id for m in members}
-
-        if member_ids == {current_user.id, dm_data.other_user_id}:
-            # Found existing DM channel
-            logger.info(
-                f"Returning existing DM channel: {channel.id} between users {current_user.id} and {dm_data.other_user_id}"
-            )
 
-            return ChannelResponse(
-                id=channel.id,
-                name=channel.name,
-                channel_type=channel.channel_type,
-                description=channel.description,
-                topic=channel.topic,
-                created_at=channel.created_at,
-                updated_at=channel.updated_at,
-                member_count=2,
-                is_member=True,
-                is_admin=True,
-            )
+        return ChannelResponse(
+            id=channel.id,
+            name=channel.name,
+            channel_type=channel.channel_type,
+            description=channel.description,
+            topic=channel.topic,
+            created_at=channel.created_at,
+            updated_at=channel.updated_at,
+            member_count=2,
+            is_member=True,
+            is_admin=True,
+        )
 
     # Create new DM channel
     # DM channel name format: "dm_<user1_id>_<user2_id>" (sorted for consistency)
@@ -652,20 +697,11 @@ async def create_dm_channel(
     db.add(member1)
     db.add(member2)
 
-    await db.commit()
-    await db.refresh(channel)
-
-    logger.info(
-        f"DM channel created: {channel.id} between users {current_user.id} and {dm_data.other_user_id}"
-    )
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="channel.created",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "channel.created",
+        {
             "id": str(channel.id),
             "name": channel.name,
             "channel_type": channel.channel_type,
@@ -674,6 +710,11 @@ async def create_dm_channel(
         },
         key=str(channel.id),
     )
+    await db.commit()
+
+    logger.info(
+        f"DM channel created: {channel.id} between users {current_user.id} and {dm_data.other_user_id}"
+    )
 
     return ChannelResponse(
         id=channel.id,
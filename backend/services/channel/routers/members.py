@@ -15,7 +15,8 @@ from dependencies import (
     verify_channel_admin,
     verify_channel_membership,
 )
-from shared.database import Channel, ChannelMember, ChannelType, User, get_db
+from shared.database import Channel, ChannelMember, ChannelType, User, get_db, query_budget
+from shared.events.outbox import add_outbox_event
 
 logger = logging.getLogger(__name__)
 
@@ -138,20 +139,13 @@ async def add_member(
     )
 
     db.add(member)
-    await db.commit()
-    await db.refresh(member)
+    await db.flush()  # Get member.created_at for the event
 
-    logger.info(
-        f"Member added: user {member_data.user_id} to channel {channel_id} by {current_user.id}"
-    )
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="member.added",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "member.added",
+        {
             "channel_id": str(channel_id),
             "user_id": str(member_data.user_id),
             "added_by": str(current_user.id),
@@ -159,6 +153,11 @@ async def add_member(
         },
         key=str(channel_id),
     )
+    await db.commit()
+
+    logger.info(
+        f"Member added: user {member_data.user_id} to channel {channel_id} by {current_user.id}"
+    )
 
     return MemberResponse(
         user_id=user_to_add.id,
@@ -171,6 +170,7 @@ async def add_member(
 
 
 @router.get("/channels/{channel_id}/members", response_model=MemberListResponse)
+@query_budget(3)
 async def list_members(
     channel_id: UUID,
     current_user: User = Depends(get_current_user),
@@ -252,8 +252,19 @@ async def update_member(
             await verify_channel_admin(channel_id, current_user.id, db)
         member.notifications_enabled = member_update.notifications_enabled
 
+    add_outbox_event(
+        db,
+        "channels",
+        "member.updated",
+        {
+            "channel_id": str(channel_id),
+            "user_id": str(user_id),
+            "is_admin": member.is_admin,
+            "updated_by": str(current_user.id),
+        },
+        key=str(channel_id),
+    )
     await db.commit()
-    await db.refresh(member)
 
     # Get user info
     stmt = select(User).where(User.id == user_id)
@@ -264,21 +275,6 @@ async def update_member(
         f"Member updated: user {user_id} in channel {channel_id} by {current_user.id}"
     )
 
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="member.updated",
-        channel_data={
-            "channel_id": str(channel_id),
-            "user_id": str(user_id),
-            "is_admin": member.is_admin,
-            "updated_by": str(current_user.id),
-        },
-        key=str(channel_id),
-    )
-
     return MemberResponse(
         user_id=user.id,
         username=user.username,
@@ -344,19 +340,11 @@ async def remove_member(
 
     # Delete member
     await db.delete(member)
-    await db.commit()
-
-    logger.info(
-        f"Member removed: user {user_id} from channel {channel_id} by {current_user.id}"
-    )
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="member.removed",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "member.removed",
+        {
             "channel_id": str(channel_id),
             "user_id": str(user_id),
             "removed_by": str(current_user.id),
@@ -364,6 +352,11 @@ async def remove_member(
         },
         key=str(channel_id),
     )
+    await db.commit()
+
+    logger.info(
+        f"Member removed: user {user_id} from channel {channel_id} by {current_user.id}"
+    )
 
 
 @router.post(
@@ -421,24 +414,22 @@ async def join_channel(
     )
 
     db.add(member)
-    await db.commit()
-    await db.refresh(member)
+    await db.flush()  # Get member.created_at for the event
 
-    logger.info(f"User {current_user.id} joined channel {channel_id}")
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="member.joined",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "member.joined",
+        {
             "channel_id": str(channel_id),
             "user_id": str(current_user.id),
             "created_at": member.created_at.isoformat(),
         },
         key=str(channel_id),
     )
+    await db.commit()
+
+    logger.info(f"User {current_user.id} joined channel {channel_id}")
 
     return MemberResponse(
         user_id=current_user.id,
@@ -496,20 +487,17 @@ async def leave_channel(
 
     # Delete membership
     await db.delete(member)
-    await db.commit()
-
-    logger.info(f"User {current_user.id} left channel {channel_id}")
-
-    # Import here to avoid circular dependency
-    from services.kafka_producer import kafka_producer
-
-    # Publish event to Kafka
-    await kafka_producer.publish_channel_event(
-        event_type="member.left",
-        channel_data={
+    add_outbox_event(
+        db,
+        "channels",
+        "member.left",
+        {
             "channel_id": str(channel_id),
             "user_id": str(current_user.id),
             "left_at": datetime.now(timezone.utc).isoformat(),
         },
         key=str(channel_id),
     )
+    await db.commit()
+
+    logger.info(f"User {current_user.id} left channel {channel_id}")
@@ -5,6 +5,8 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from shared.database import DatabaseMetricsMiddleware
+
 from .config import settings
 from .middleware.auth_jwt import AuthMiddleware
 from .routers import files_router, health_router
@@ -36,6 +38,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 
 def custom_openapi():
     """Customize OpenAPI schema to include security."""
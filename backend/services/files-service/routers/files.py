@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Upload
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.database import User, get_db
+from shared.database import User, get_db, query_budget
 
 from ..dependencies import get_current_user, get_pagination_params
 from ..schemas.files import (
@@ -102,6 +102,7 @@ async def upload_file(
     "/files/{file_id}",
     response_model=FileResponse,
 )
+@query_budget(2)
 async def get_file(
     file_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -248,6 +249,7 @@ async def delete_file(
     "/files",
     response_model=FileListResponse,
 )
+@query_budget(3)
 async def list_files(
     channel_id: Optional[UUID] = Query(None),
     message_id: Optional[UUID] = Query(None),
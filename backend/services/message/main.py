@@ -8,12 +8,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer
 
-from shared.database import close_db, init_db
+from shared.database import DatabaseMetricsMiddleware, close_db, init_db
 
 from .config import settings
 from .middleware import AuthMiddleware
 from .routers import analytics, health, messages, reactions
-from .services.kafka_producer import kafka_producer
+from .services.kafka_producer import kafka_producer, outbox_relay
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Configure logging
@@ -39,11 +39,17 @@ async def lifespan(app: FastAPI):
     await kafka_producer.start()
     logger.info("Kafka producer initialized")
 
+    # Start publishing committed events
+    outbox_relay.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Message Service...")
 
+    # Stop the outbox relay before the producer it publishes with
+    await outbox_relay.stop()
+
     # Stop Kafka producer
     await kafka_producer.stop()
 
@@ -70,6 +76,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 def custom_openapi():
     """Customize OpenAPI schema to add security."""
     if app.openapi_schema:
@@ -22,10 +22,12 @@ from shared.database import (
     User,
     UserRole,
     get_db,
+    query_budget,
 )
+from shared.events.outbox import add_outbox_event
 
+from ..config import settings
 from ..dependencies import get_current_user, security, verify_channel_access
-from ..services.kafka_producer import kafka_producer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -201,6 +203,7 @@ class MessageListResponse(BaseModel):
 
 
 @router.post("/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(15)
 async def create_message(
     message_data: MessageCreate,
     request: Request,
@@ -261,15 +264,14 @@ async def create_message(
     db.add(message)
     await db.flush()  # Flush to get message.id before creating attachments
 
-    # Handle file attachments
+    # Handle file attachments (resolve all referenced files in one query)
     if message_data.attachment_ids:
-        for file_id in message_data.attachment_ids:
-            # Verify file exists
-            file_stmt = select(File).where(File.id == file_id)
-            file_result = await db.execute(file_stmt)
-            file = file_result.scalar_one_or_none()
+        file_stmt = select(File.id).where(File.id.in_(message_data.attachment_ids))
+        file_result = await db.execute(file_stmt)
+        existing_file_ids = set(file_result.scalars().all())
 
-            if not file:
+        for file_id in message_data.attachment_ids:
+            if file_id not in existing_file_ids:
                 logger.warning(f"File {file_id} not found, skipping attachment")
                 continue
 
@@ -280,26 +282,16 @@ async def create_message(
             )
             db.add(msg_attachment)
 
-    await db.commit()
-    await db.refresh(message)
-
     # Update thread metadata if this is a reply
     if thread_id and thread:
         thread.reply_count += 1
         thread.last_reply_at = message.created_at
-        await db.commit()
 
-    logger.info(
-        f"Message created: {message.id} by user {current_user.id} in channel {message_data.channel_id}"
-    )
+    await db.flush()
 
     # Get parent message ID for API response (if this is a thread reply)
-    parent_message_id = None
-    if thread_id:
-        # thread was already fetched if we got here
-        stmt = select(Thread.root_message_id).where(Thread.id == thread_id)
-        result = await db.execute(stmt)
-        parent_message_id = result.scalar_one_or_none()
+    # The thread root is the parent we were given, so no lookup is needed
+    parent_message_id = message_data.parent_id if thread_id else None
 
     # Load attachments for the message
     stmt = (
@@ -356,11 +348,19 @@ async def create_message(
     if attachments_for_kafka:
         kafka_message_data["attachments"] = attachments_for_kafka
 
-    await kafka_producer.publish_message_event(
-        event_type="message.created",
-        message_data=kafka_message_data,
+    # Event is committed with the message and relayed to Kafka in the background
+    add_outbox_event(
+        db,
+        settings.kafka_message_topic,
+        "message.created",
+        kafka_message_data,
         key=str(message_data.channel_id),
     )
+    await db.commit()
+
+    logger.info(
+        f"Message created: {message.id} by user {current_user.id} in channel {message_data.channel_id}"
+    )
 
     # Build response
     response = MessageResponse(
@@ -386,6 +386,7 @@ async def create_message(
 
 
 @router.get("/messages/{message_id}", response_model=MessageResponse)
+@query_budget(6)
 async def get_message(
     message_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -442,6 +443,7 @@ async def get_message(
 
 
 @router.get("/channels/{channel_id}/messages", response_model=MessageListResponse)
+@query_budget(10)
 async def get_channel_messages(
     channel_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -612,15 +614,11 @@ async def update_message(
     message.edited_at = datetime.now(timezone.utc)
     message.updated_at = datetime.now(timezone.utc)
 
-    await db.commit()
-    await db.refresh(message)
-
-    logger.info(f"Message updated: {message.id} by user {current_user.id}")
-
-    # Publish event to Kafka
-    await kafka_producer.publish_message_event(
-        event_type="message.updated",
-        message_data={
+    add_outbox_event(
+        db,
+        settings.kafka_message_topic,
+        "message.updated",
+        {
             "id": str(message.id),
             "content": message.content,
             "channel_id": str(message.channel_id),
@@ -631,6 +629,10 @@ async def update_message(
         },
         key=str(message.channel_id),
     )
+    await db.commit()
+    await db.refresh(message)
+
+    logger.info(f"Message updated: {message.id} by user {current_user.id}")
 
     # Build response
     response = MessageResponse(
@@ -692,19 +694,19 @@ async def delete_message(
     message.content = "[Message deleted]"
     message.updated_at = datetime.now(timezone.utc)
 
-    await db.commit()
-
-    logger.info(f"Message deleted: {message.id} by user {current_user.id}")
-
-    # Publish event to Kafka
-    await kafka_producer.publish_message_event(
-        event_type="message.deleted",
-        message_data={
+    add_outbox_event(
+        db,
+        settings.kafka_message_topic,
+        "message.deleted",
+        {
             "id": str(message.id),
             "channel_id": str(message.channel_id),
             "deleted_by": str(current_user.id),
         },
         key=str(message.channel_id),
     )
+    await db.commit()
+
+    logger.info(f"Message deleted: {message.id} by user {current_user.id}")
 
     return None
@@ -10,10 +10,11 @@ from pydantic import BaseModel, Field
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.database import Message, Reaction, User, get_db
+from shared.database import Message, Reaction, User, get_db, query_budget
+from shared.events.outbox import add_outbox_event
 
+from ..config import settings
 from ..dependencies import get_current_user, verify_channel_access
-from ..services.kafka_producer import kafka_producer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -64,6 +65,7 @@ class ReactionSummary(BaseModel):
     response_model=ReactionResponse,
     status_code=status.HTTP_201_CREATED,
 )
+@query_budget(7)
 async def add_reaction(
     message_id: UUID,
     reaction_data: ReactionCreate,
@@ -116,17 +118,13 @@ async def add_reaction(
     )
 
     db.add(reaction)
-    await db.commit()
-    await db.refresh(reaction)
-
-    logger.info(
-        f"Reaction added: {reaction.emoji} by user {current_user.id} on message {message_id}"
-    )
+    await db.flush()  # Get reaction.id and created_at for the event
 
-    # Publish event to Kafka
-    await kafka_producer.publish_reaction_event(
-        event_type="reaction.added",
-        reaction_data={
+    add_outbox_event(
+        db,
+        settings.kafka_reaction_topic,
+        "reaction.added",
+        {
             "id": str(reaction.id),
             "message_id": str(message_id),
             "channel_id": str(message.channel_id),
@@ -137,6 +135,11 @@ async def add_reaction(
         },
         key=str(message_id),
     )
+    await db.commit()
+
+    logger.info(
+        f"Reaction added: {reaction.emoji} by user {current_user.id} on message {message_id}"
+    )
 
     return ReactionResponse(
         id=reaction.id,
@@ -190,14 +193,11 @@ async def remove_reaction(
 
     # Delete reaction
     await db.delete(reaction)
-    await db.commit()
-
-    logger.info(f"Reaction removed: {emoji} by user {current_user.id} from message {message_id}")
-
-    # Publish event to Kafka
-    await kafka_producer.publish_reaction_event(
-        event_type="reaction.removed",
-        reaction_data={
+    add_outbox_event(
+        db,
+        settings.kafka_reaction_topic,
+        "reaction.removed",
+        {
             "message_id": str(message_id),
             "channel_id": str(message.channel_id),
             "user_id": str(current_user.id),
@@ -206,11 +206,15 @@ async def remove_reaction(
         },
         key=str(message_id),
     )
+    await db.commit()
+
+    logger.info(f"Reaction removed: {emoji} by user {current_user.id} from message {message_id}")
 
     return None
 
 
 @router.get("/messages/{message_id}/reactions", response_model=List[ReactionSummary])
+@query_budget(5)
 async def get_message_reactions(
     message_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -25,10 +25,33 @@ class Settings(BaseSettings):
         "KAFKA_BOOTSTRAP_SERVERS", "localhost:9092"
     )
     kafka_group_id: str = os.getenv("KAFKA_GROUP_ID", "notifications-service")
+    kafka_max_batch: int = 500  # events per getmany poll, written together
+    kafka_poll_timeout_ms: int = 100
+    # Published for the websocket service to push to the recipient's sessions
+    kafka_notifications_topic: str = os.getenv("KAFKA_NOTIFICATIONS_TOPIC", "notifications")
+    realtime_lookup_batch: int = 1000  # recipients resolved per query when publishing
 
     # Redis
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379")
-    redis_cache_ttl: int = 300  # 5 minutes
+
+    # Unread counters (see services/unread_counters.py)
+    unread_counter_ttl: int = 86400  # recounted a day after seeding
+    unread_reconcile_interval: float = 300.0
+    unread_reconcile_batch: int = 500
+
+    # Preference cache (see services/preference_cache.py)
+    preference_cache_ttl: int = 3600  # Redis; entries are invalidated on update
+    preference_cache_local_ttl: float = 60.0  # in-process
+    preference_cache_max_entries: int = 50_000
+
+    # Reactions and replies to the same message within this many seconds
+    # update one aggregated notification (0 disables coalescing)
+    notification_coalesce_window: int = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", "600"))
+
+    # Broadcast mentions (@channel, @everyone, @here)
+    fanout_page_size: int = 1000  # members read and copied per round trip
+    # Presence hash of the websocket service (its redis_key_prefix + ":presence")
+    websocket_presence_key: str = os.getenv("WEBSOCKET_PRESENCE_KEY", "ws:presence")
 
     # Auth
     keycloak_url: str = os.getenv("KEYCLOAK_URL", "http://localhost:8080")
@@ -37,6 +60,7 @@ class Settings(BaseSettings):
     # Pagination
     default_page_size: int = 20
     max_page_size: int = 100
+    notification_count_cap: int = 1000  # list totals are counted up to this many
 
     # Notification defaults
     default_mentions_enabled: bool = True
@@ -8,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer
 
+from shared.database import DatabaseMetricsMiddleware
 from shared.database.base import close_db, init_db
 
 from .config import settings
@@ -69,6 +70,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 
 def custom_openapi():
     """Customize OpenAPI schema to add security."""
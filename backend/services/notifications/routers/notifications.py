@@ -9,9 +9,10 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.database import Notification, User
+from shared.database import Notification, User, query_budget
 from shared.database.base import get_db
 
+from ..config import settings
 from ..dependencies import get_current_user
 from ..schemas.notifications import (
     MarkAllReadResponse,
@@ -33,41 +34,52 @@ router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
 @router.get("", response_model=NotificationListResponse)
+@query_budget(5)
 async def get_notifications(
-    page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    page: int = Query(1, ge=1, description="Page number, when no cursor is given"),
+    page_size: int = Query(
+        settings.default_page_size, ge=1, le=settings.max_page_size, description="Items per page"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     is_read: Optional[bool] = Query(None, description="Filter by read status"),
     type: Optional[NotificationType] = Query(None, description="Filter by type"),
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get user notifications with pagination and filters."""
-    notifications, total_count = await notification_manager.get_user_notifications(
-        db=db,
-        user_id=current_user.id,
-        page=page,
-        page_size=page_size,
-        is_read=is_read,
-        notification_type=type,
-    )
+    """Get user notifications with pagination and filters.
+
+    Follow next_cursor to page; ``page`` is kept for older clients.
+    """
+    try:
+        notification_page = await notification_manager.get_user_notifications(
+            db=db,
+            user_id=current_user.id,
+            page=page,
+            page_size=page_size,
+            is_read=is_read,
+            notification_type=type,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    notifications = notification_page.notifications
 
     # Get unread count
     unread_count = await notification_manager.get_unread_count(db, current_user.id)
 
+    # Resolve all actors for the page in one query
+    actor_ids = {notif.actor_id for notif in notifications if notif.actor_id}
+    actors = {}
+    if actor_ids:
+        stmt = select(User).where(User.id.in_(actor_ids))
+        result = await db.execute(stmt)
+        actors = {actor.id: actor for actor in result.scalars().all()}
+
     # Build response with actor info
     notification_responses = []
     for notif in notifications:
-        # Get actor info if present
-        actor_username = None
-        actor_display_name = None
-        if notif.actor_id:
-            stmt = select(User).where(User.id == notif.actor_id)
-            result = await db.execute(stmt)
-            actor = result.scalar_one_or_none()
-            if actor:
-                actor_username = actor.username
-                actor_display_name = actor.display_name
+        actor = actors.get(notif.actor_id)
 
         notification_responses.append(
             NotificationResponse(
@@ -81,17 +93,21 @@ async def get_notifications(
                 is_read=notif.is_read,
                 created_at=notif.created_at,
                 read_at=notif.read_at,
-                actor_username=actor_username,
-                actor_display_name=actor_display_name,
+                actor_username=actor.username if actor else None,
+                actor_display_name=actor.display_name if actor else None,
+                actor_count=notif.actor_count,
             )
         )
 
     return NotificationListResponse(
         notifications=notification_responses,
-        total_count=total_count,
+        total_count=notification_page.total_count,
+        total_is_estimate=notification_page.total_is_estimate,
         unread_count=unread_count,
         page=page,
         page_size=page_size,
+        has_more=notification_page.next_cursor is not None,
+        next_cursor=notification_page.next_cursor,
     )
 
 
@@ -145,6 +161,7 @@ async def mark_notification_read(
         read_at=notification.read_at,
         actor_username=actor_username,
         actor_display_name=actor_display_name,
+        actor_count=notification.actor_count,
     )
 
 
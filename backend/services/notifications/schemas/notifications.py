@@ -56,6 +56,8 @@ class NotificationResponse(BaseModel):
     read_at: Optional[datetime] = None
     actor_username: Optional[str] = None
     actor_display_name: Optional[str] = None
+    # Actors merged into this notification ("Alice and 48 others reacted")
+    actor_count: int = 1
 
 
 class NotificationListResponse(BaseModel):
@@ -63,9 +65,13 @@ class NotificationListResponse(BaseModel):
 
     notifications: List[NotificationResponse]
     total_count: int
+    # total_count is a lower bound: the count stopped at the cap
+    total_is_estimate: bool = False
     unread_count: int
     page: int
     page_size: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class UnreadCountResponse(BaseModel):
@@ -0,0 +1,181 @@
+"""Coalescing of notification bursts.
+
+A popular message can collect thousands of reactions or replies in
+minutes; one notification per event floods its author's inbox and the
+database. Reaction and reply notifications carry a group key
+(``reaction:<message_id>``, ``reply:<parent_message_id>``), and while a
+group's aggregate notification is unread and younger than
+``notification_coalesce_window`` seconds, new events update it in place
+("Alice and 48 others reacted to your message") instead of adding rows:
+
+- a batch's events are first merged per (recipient, group key);
+- open aggregates for all of the batch's groups are loaded (and locked)
+  with one query, served by ``ix_notifications_user_id_group_key_unread``;
+- aggregates found are updated with one executemany UPDATE, the others
+  are returned to be inserted as new aggregates.
+
+An aggregate keeps its distinct actors in ``actor_ids``, so an actor
+reacting again, in the same batch or a later one, is counted once;
+``actor_count`` is the number of actors.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import desc, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database import Notification
+
+from ..config import settings
+from ..schemas.notifications import NotificationType
+
+logger = logging.getLogger(__name__)
+
+# Coalesced notification types and the phrase their titles end with
+COALESCED_TYPES = {
+    NotificationType.REACTION.value: "reacted to your message",
+    NotificationType.REPLY.value: "replied to your message",
+}
+
+GroupKey = Tuple[UUID, str]  # (recipient, group_key)
+
+
+def group_key(notification_type: NotificationType, reference_id: UUID) -> str:
+    """Group key of a notification about ``reference_id``."""
+    return f"{notification_type.value}:{reference_id}"
+
+
+def aggregate_title(notification_type: str, actor_name: str, actor_count: int) -> str:
+    """Title of an aggregate, e.g. "Alice and 48 others reacted to your message"."""
+    action = COALESCED_TYPES[notification_type]
+    if actor_count <= 1:
+        return f"{actor_name} {action}"
+    others = actor_count - 1
+    return f"{actor_name} and {others} other{'s' if others > 1 else ''} {action}"
+
+
+def _merge_actors(aggregate, events: List[Dict]) -> Tuple[List[UUID], int]:
+    """Distinct actors of an aggregate once the events are merged, and their count."""
+    known: List[UUID] = []
+    if aggregate is not None:
+        # Aggregates written before actor_ids existed only know their latest actor
+        known = list(aggregate.actor_ids or [aggregate.actor_id])
+    actor_ids = list(dict.fromkeys(known + [event["actor_id"] for event in events]))
+    actor_count = len(actor_ids)
+    if aggregate is not None and aggregate.actor_ids is None:
+        actor_count = aggregate.actor_count + len(actor_ids) - len(known)
+    return actor_ids, actor_count
+
+
+class NotificationCoalescer:
+    """Merges reaction and reply notifications into per-group aggregates.
+
+    Args:
+        window: Seconds an unread aggregate keeps absorbing new events;
+            0 disables coalescing
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = settings.notification_coalesce_window if window is None else window
+
+    async def coalesce(
+        self, db: AsyncSession, notifications: List[Dict], actor_names: Dict[UUID, str]
+    ) -> List[Dict]:
+        """Coalesce a batch's notifications; returns those still to be inserted.
+
+        Open aggregates are updated in the session's transaction, which the
+        caller commits with the inserts.
+
+        Args:
+            db: Session
+            notifications: Notification column values, in event order
+            actor_names: Display name of each actor
+        """
+        if self.window <= 0:
+            return notifications
+
+        passthrough: List[Dict] = []
+        groups: Dict[GroupKey, List[Dict]] = {}
+        for notification in notifications:
+            if notification["type"] in COALESCED_TYPES and notification.get("group_key"):
+                key = (notification["user_id"], notification["group_key"])
+                groups.setdefault(key, []).append(notification)
+            else:
+                passthrough.append(notification)
+        if not groups:
+            return notifications
+
+        open_aggregates = await self._open_aggregates(db, list(groups))
+
+        to_insert, updates = [], []
+        for key, events in groups.items():
+            latest = events[-1]
+            aggregate = open_aggregates.get(key)
+            actor_ids, actor_count = _merge_actors(aggregate, events)
+            title = aggregate_title(
+                latest["type"],
+                actor_names.get(latest["actor_id"]) or "Someone",
+                actor_count,
+            )
+            if aggregate:
+                updates.append(
+                    {
+                        "id": aggregate.id,
+                        "title": title,
+                        "message": latest["message"],
+                        "reference_id": latest["reference_id"],
+                        "actor_id": latest["actor_id"],
+                        "actor_ids": actor_ids,
+                        "actor_count": actor_count,
+                        "updated_at": datetime.now(timezone.utc),
+                    }
+                )
+            else:
+                to_insert.append(
+                    {
+                        **latest,
+                        "title": title,
+                        "actor_ids": actor_ids,
+                        "actor_count": actor_count,
+                    }
+                )
+
+        if updates:
+            await db.execute(update(Notification), updates)
+
+        merged = len(notifications) - len(passthrough) - len(to_insert)
+        if merged:
+            logger.info(
+                f"Coalesced {merged} notifications ({len(updates)} aggregates updated)"
+            )
+        return passthrough + to_insert
+
+    async def _open_aggregates(self, db: AsyncSession, keys: List[GroupKey]) -> Dict:
+        """The newest unread aggregate of each group within the window, locked."""
+        result = await db.execute(
+            select(
+                Notification.id,
+                Notification.user_id,
+                Notification.group_key,
+                Notification.actor_id,
+                Notification.actor_ids,
+                Notification.actor_count,
+            )
+            .where(
+                tuple_(Notification.user_id, Notification.group_key).in_(keys),
+                Notification.group_key.isnot(None),
+                ~Notification.is_read,
+                Notification.deleted_at.is_(None),
+                Notification.created_at
+                >= datetime.now(timezone.utc) - timedelta(seconds=self.window),
+            )
+            .order_by(desc(Notification.created_at))
+            .with_for_update()
+        )
+        aggregates = {}
+        for row in result:
+            aggregates.setdefault((row.user_id, row.group_key), row)
+        return aggregates
@@ -0,0 +1,190 @@
+"""Fan-out of broadcast mentions (@channel, @everyone, @here).
+
+A broadcast mention notifies every member of a channel, which can be tens
+of thousands of users, so recipients are never loaded at once and never
+inserted one by one:
+
+- members are paged with keyset pagination on ``(channel_id, user_id)``,
+  served by ``uq_channel_members_channel_user``;
+- members who left, disabled notifications for the channel, muted it
+  (``muted_until`` in the future) or turned off mention notifications are
+  filtered out in SQL, so they are never read;
+- for ``@here``, each page is narrowed to users with an open websocket
+  session, read from the websocket cluster's presence hash in Redis (kept
+  only by its Redis client manager: without the hash, @here is skipped with
+  a warning rather than treated as nobody online);
+- each page is written with COPY, and everything is committed once, so a
+  failed fan-out leaves no partial notifications behind.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database import ChannelMember, NotificationPreference, User
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Notifications columns written by COPY; created_at/updated_at use the server default
+COPY_COLUMNS = (
+    "id",
+    "user_id",
+    "type",
+    "title",
+    "message",
+    "reference_id",
+    "reference_type",
+    "actor_id",
+    "is_read",
+)
+
+
+class BroadcastFanout:
+    """Writes one notification per eligible member of a channel.
+
+    Args:
+        page_size: Members read and copied per round trip
+        presence_key: Redis hash of online users (JWT subject -> session count)
+            maintained by the websocket service
+    """
+
+    def __init__(
+        self,
+        page_size: int = settings.fanout_page_size,
+        presence_key: str = settings.websocket_presence_key,
+    ):
+        self.page_size = page_size
+        self.presence_key = presence_key
+
+    async def fan_out(
+        self,
+        db: AsyncSession,
+        channel_id: UUID,
+        notification: Dict,
+        here: bool = False,
+        exclude: Iterable[UUID] = (),
+        redis_client=None,
+    ) -> List[UUID]:
+        """Notify the channel's members; returns the recipients.
+
+        Args:
+            db: Session; the notifications are committed by the caller
+            channel_id: Channel whose members are notified
+            notification: Column values shared by every notification
+                (type, title, message, reference_id, reference_type, actor_id)
+            here: Only notify members that are online
+            exclude: Users not to notify (the author, users mentioned by name)
+            redis_client: Client to read presence with, required for ``here``
+        """
+        if here and (redis_client is None or not await self._presence_kept(redis_client)):
+            logger.warning(f"@here in channel {channel_id} skipped: presence is unavailable")
+            return []
+
+        exclude = list(exclude)
+        recipients: List[UUID] = []
+        after: Optional[UUID] = None
+        while True:
+            page = await self._page(db, channel_id, exclude, after, here)
+            if not page:
+                break
+            after = page[-1].user_id
+
+            user_ids = [row.user_id for row in page]
+            if here:
+                user_ids = await self._online(redis_client, page)
+            if user_ids:
+                await self._copy(db, notification, user_ids)
+                recipients.extend(user_ids)
+
+            if len(page) < self.page_size:
+                break
+
+        logger.info(
+            f"Broadcast mention in channel {channel_id}: {len(recipients)} notifications"
+        )
+        return recipients
+
+    async def _page(
+        self,
+        db: AsyncSession,
+        channel_id: UUID,
+        exclude: Sequence[UUID],
+        after: Optional[UUID],
+        here: bool,
+    ) -> list:
+        """The next page of eligible members, ordered by user_id."""
+        columns = [ChannelMember.user_id]
+        if here:
+            columns.append(User.keycloak_id)
+
+        query = (
+            select(*columns)
+            .outerjoin(
+                NotificationPreference,
+                NotificationPreference.user_id == ChannelMember.user_id,
+            )
+            .where(
+                ChannelMember.channel_id == channel_id,
+                ChannelMember.left_at.is_(None),
+                ChannelMember.notifications_enabled.is_(True),
+                or_(ChannelMember.muted_until.is_(None), ChannelMember.muted_until <= func.now()),
+                func.coalesce(
+                    NotificationPreference.mentions, settings.default_mentions_enabled
+                ).is_(True),
+            )
+            .order_by(ChannelMember.user_id)
+            .limit(self.page_size)
+        )
+        if here:
+            query = query.join(User, User.id == ChannelMember.user_id)
+        if exclude:
+            query = query.where(ChannelMember.user_id.notin_(exclude))
+        if after is not None:
+            query = query.where(ChannelMember.user_id > after)
+
+        result = await db.execute(query)
+        return result.all()
+
+    async def _online(self, redis_client, page: list) -> List[UUID]:
+        """Members of the page with at least one websocket session."""
+        counts = await redis_client.hmget(self.presence_key, [row.keycloak_id for row in page])
+        return [
+            row.user_id
+            for row, count in zip(page, counts, strict=True)
+            if count and int(count) > 0
+        ]
+
+    async def _presence_kept(self, redis_client) -> bool:
+        """Whether the websocket service maintains the presence hash."""
+        try:
+            return bool(await redis_client.exists(self.presence_key))
+        except Exception as e:
+            logger.warning(f"Presence lookup failed: {e}")
+            return False
+
+    async def _copy(self, db: AsyncSession, notification: Dict, user_ids: List[UUID]):
+        """Write a page of notifications with COPY on the session's connection."""
+        records = [
+            (
+                uuid4(),
+                user_id,
+                notification["type"],
+                notification["title"],
+                notification["message"],
+                notification.get("reference_id"),
+                notification.get("reference_type"),
+                notification.get("actor_id"),
+                False,
+            )
+            for user_id in user_ids
+        ]
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "notifications", records=records, columns=COPY_COLUMNS
+        )
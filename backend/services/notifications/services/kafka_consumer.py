@@ -1,23 +1,51 @@
-"""Kafka consumer for processing events and creating notifications."""
+"""Kafka consumer for processing events and creating notifications.
+
+Events are consumed in batches (``getmany``). For each batch the authors,
+mentioned users, parent messages, channels and recipient preferences are
+resolved with one query each, reactions and replies are coalesced into
+aggregates (see services/coalescing.py), the remaining notifications are
+written with a single INSERT, and offsets are committed once the batch is
+stored.
+"""
 
 import asyncio
-import json
 import logging
-from typing import Dict
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 from aiokafka import AIOKafkaConsumer
-from sqlalchemy import select
+from sqlalchemy import or_, select
 
-from shared.database import Message, User
+from shared.database import Channel, Message, User
 from shared.database import base as db_base
+from shared.events.envelope import decode_event
 
 from ..config import settings
 from ..schemas.notifications import NotificationType
-from .notification_manager import notification_manager
+from .coalescing import NotificationCoalescer, group_key
+from .fanout import BroadcastFanout
+from .notification_manager import BROADCAST_MENTIONS, PREFERENCE_FIELDS, notification_manager
 
 logger = logging.getLogger(__name__)
 
+# Event types that create notifications ("channel.member_added" is the legacy
+# name of "member.added")
+MESSAGE_CREATED = "message.created"
+REACTION_ADDED = "reaction.added"
+MEMBER_ADDED = ("member.added", "channel.member_added")
+
+
+def _uuid(value: Any) -> Optional[UUID]:
+    """Parse an id from an event, None if missing or malformed."""
+    try:
+        return UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _preview(content: str) -> str:
+    return f"{content[:100]}{'...' if len(content) > 100 else ''}"
+
 
 class KafkaConsumerService:
     """Kafka consumer service for processing events."""
@@ -28,6 +56,9 @@ class KafkaConsumerService:
         self.bootstrap_servers = settings.kafka_bootstrap_servers
         self.group_id = settings.kafka_group_id
         self.running = False
+        self._task: Optional[asyncio.Task] = None
+        self.fanout = BroadcastFanout()
+        self.coalescer = NotificationCoalescer()
 
     async def start(self):
         """Start the Kafka consumer."""
@@ -38,8 +69,10 @@ class KafkaConsumerService:
                 "channels",  # Subscribe to channels topic
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+                value_deserializer=lambda m: decode_event(m).as_dict(),
                 auto_offset_reset="latest",
+                # Offsets are committed after each batch is written
+                enable_auto_commit=False,
             )
 
             await self.consumer.start()
@@ -49,7 +82,7 @@ class KafkaConsumerService:
 
             # Start consuming messages
             self.running = True
-            asyncio.create_task(self._consume_messages())
+            self._task = asyncio.create_task(self._consume_messages())
 
         except Exception as e:
             logger.error(f"Failed to start Kafka consumer: {e}")
@@ -58,225 +91,331 @@ class KafkaConsumerService:
     async def stop(self):
         """Stop the Kafka consumer."""
         self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
         if self.consumer:
             await self.consumer.stop()
             logger.info("Kafka consumer stopped")
 
     async def _consume_messages(self):
-        """Consume messages from Kafka."""
+        """Consume events from Kafka in batches."""
         try:
-            async for message in self.consumer:
-                try:
-                    event_data = message.value
-                    event_type = event_data.get("event_type")
-                    data = event_data.get("data", {})
-
-                    logger.debug(f"Received event: {event_type}")
-
-                    # Route to appropriate handler
-                    if event_type == "message.created":
-                        await self._handle_message_created(data)
-                    elif event_type == "reaction.added":
-                        await self._handle_reaction_added(data)
-                    elif event_type == "channel.member_added":
-                        await self._handle_channel_member_added(data)
+            while self.running:
+                batches = await self.consumer.getmany(
+                    timeout_ms=settings.kafka_poll_timeout_ms,
+                    max_records=settings.kafka_max_batch,
+                )
+                events = [record.value for records in batches.values() for record in records]
+                if not events:
+                    continue
 
-                except Exception as e:
-                    logger.error(f"Error processing message: {e}", exc_info=True)
+                await self._process_or_isolate(events)
+                await self.consumer.commit()
 
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
             if self.running:
                 logger.error(f"Consumer loop error: {e}", exc_info=True)
 
-    async def _handle_message_created(self, data: Dict):
-        """Handle message.created event.
+    async def _process_or_isolate(self, events: List[Dict]):
+        """Process a batch; if it fails, retry its events one by one.
 
-        Creates notifications for:
-        1. @mentions in the message
-        2. Replies to threads (notify parent message author)
+        A single bad event then only loses its own notifications instead of
+        the whole batch's.
         """
         try:
-            # The message service sends 'id' but we use it as message_id
-            message_id = data.get("id") or data.get("message_id")
-            author_id = data.get("author_id")
-            content = data.get("content", "")
-            parent_message_id = data.get("parent_message_id")
-
-            if not message_id or not author_id:
-                logger.warning(f"message.created event missing required fields: {data}")
-                return
-
-            async with db_base.async_session_factory() as db:
-                # Get author info
-                stmt = select(User).where(User.id == UUID(author_id))
-                result = await db.execute(stmt)
-                author = result.scalar_one_or_none()
-
-                if not author:
-                    logger.warning(f"Author {author_id} not found")
-                    return
-
-                # 1. Check for mentions
-                mentions = notification_manager.extract_mentions(content)
-                if mentions:
-                    # Get mentioned users
-                    stmt = select(User).where(User.username.in_(mentions))
-                    result = await db.execute(stmt)
-                    mentioned_users = result.scalars().all()
-
-                    for mentioned_user in mentioned_users:
-                        # Don't notify if user mentions themselves
-                        if mentioned_user.id == UUID(author_id):
-                            continue
-
-                        # Check if user wants mention notifications
-                        should_notify = await notification_manager.should_notify(
-                            db, mentioned_user.id, NotificationType.MENTION
-                        )
-
-                        if should_notify:
-                            await notification_manager.create_notification(
-                                db=db,
-                                user_id=mentioned_user.id,
-                                notification_type=NotificationType.MENTION,
-                                title=f"{author.display_name} mentioned you",
-                                message=f"@{author.username}: {content[:100]}{'...' if len(content) > 100 else ''}",
-                                reference_id=UUID(message_id),
-                                reference_type="message",
-                                actor_id=UUID(author_id),
-                            )
-
-                # 2. Check for thread replies
-                if parent_message_id:
-                    # Get parent message to find its author
-                    stmt = select(Message).where(Message.id == UUID(parent_message_id))
-                    result = await db.execute(stmt)
-                    parent_message = result.scalar_one_or_none()
-
-                    if parent_message and parent_message.author_id != UUID(author_id):
-                        # Check if parent author wants reply notifications
-                        should_notify = await notification_manager.should_notify(
-                            db, parent_message.author_id, NotificationType.REPLY
-                        )
-
-                        if should_notify:
-                            await notification_manager.create_notification(
-                                db=db,
-                                user_id=parent_message.author_id,
-                                notification_type=NotificationType.REPLY,
-                                title=f"{author.display_name} replied to your message",
-                                message=f"{content[:100]}{'...' if len(content) > 100 else ''}",
-                                reference_id=UUID(message_id),
-                                reference_type="message",
-                                actor_id=UUID(author_id),
-                            )
-
+            await self.process_batch(events)
+            return
         except Exception as e:
-            logger.error(f"Error handling message.created event: {e}", exc_info=True)
+            logger.error(f"Error processing batch of {len(events)} events: {e}", exc_info=True)
+
+        for event in events:
+            try:
+                await self.process_batch([event])
+            except Exception as e:
+                logger.error(
+                    f"Error processing {event.get('event_type')} event: {e}", exc_info=True
+                )
 
-    async def _handle_reaction_added(self, data: Dict):
-        """Handle reaction.added event.
+    async def process_batch(self, events: List[Dict]) -> int:
+        """Create the notifications for a batch of events.
+
+        Creates notifications for:
+        1. @mentions in new messages, including @channel/@everyone/@here
+        2. Replies to threads (notify parent message author)
+        3. Reactions (notify message author)
+        4. Being added to a channel
 
-        Creates notification for message author when someone reacts.
+        Returns the number of notifications created.
         """
-        try:
-            message_id = data.get("message_id")
-            user_id = data.get("user_id")
-            emoji = data.get("emoji")
+        messages, reactions, members = [], [], []
+        for event in events:
+            event_type = event.get("event_type")
+            data = event.get("data") or {}
+            if event_type == MESSAGE_CREATED:
+                messages.append(data)
+            elif event_type == REACTION_ADDED:
+                reactions.append(data)
+            elif event_type in MEMBER_ADDED:
+                members.append(data)
+
+        if not (messages or reactions or members):
+            return 0
+
+        async with db_base.async_session_factory() as db:
+            resolved = await self._resolve(db, messages, reactions, members)
+            candidates = (
+                self._message_notifications(messages, resolved)
+                + self._reaction_notifications(reactions, resolved)
+                + self._member_notifications(members, resolved)
+            )
 
-            if not message_id or not user_id or not emoji:
-                logger.warning("reaction.added event missing required fields")
-                return
-
-            async with db_base.async_session_factory() as db:
-                # Get the message
-                stmt = select(Message).where(Message.id == UUID(message_id))
-                result = await db.execute(stmt)
-                message = result.scalar_one_or_none()
-
-                if not message:
-                    logger.warning(f"Message {message_id} not found")
-                    return
-
-                # Don't notify if user reacts to their own message
-                if message.author_id == UUID(user_id):
-                    return
-
-                # Get reactor info
-                stmt = select(User).where(User.id == UUID(user_id))
-                result = await db.execute(stmt)
-                reactor = result.scalar_one_or_none()
-
-                if not reactor:
-                    logger.warning(f"User {user_id} not found")
-                    return
-
-                # Check if message author wants reaction notifications
-                should_notify = await notification_manager.should_notify(
-                    db, message.author_id, NotificationType.REACTION
+            prefs = await notification_manager.get_preferences_bulk(
+                db, {candidate["user_id"] for candidate in candidates}
+            )
+            notifications = [
+                candidate
+                for candidate in candidates
+                if prefs[candidate["user_id"]][
+                    PREFERENCE_FIELDS[NotificationType(candidate["type"])]
+                ]
+            ]
+            notifications = await self.coalescer.coalesce(
+                db,
+                notifications,
+                {user.id: user.display_name for user in resolved["users"].values()},
+            )
+
+            fanned_out = await self._fan_out_broadcasts(db, messages, resolved, candidates)
+            return await notification_manager.create_notifications(
+                db, notifications, fanned_out=fanned_out
+            )
+
+    async def _fan_out_broadcasts(
+        self, db, messages: List[Dict], resolved: Dict, candidates: List[Dict]
+    ) -> List[UUID]:
+        """Notify channel members of @channel/@everyone/@here mentions."""
+        recipients: List[UUID] = []
+        for data in messages:
+            content = data.get("content") or ""
+            mention = notification_manager.extract_broadcast_mention(content)
+            if not mention:
+                continue
+
+            message_id = _uuid(data.get("message_id"))
+            channel_id = _uuid(data.get("channel_id"))
+            author = resolved["users"].get(_uuid(data.get("author_id")))
+            if not message_id or not channel_id or not author:
+                logger.warning(f"Broadcast mention without message, channel or author: {data}")
+                continue
+
+            # Users mentioned by name already get a notification for this message
+            mentioned = {
+                candidate["user_id"]
+                for candidate in candidates
+                if candidate["reference_id"] == message_id
+                and candidate["type"] == NotificationType.MENTION.value
+            }
+            recipients += await self.fanout.fan_out(
+                db,
+                channel_id,
+                {
+                    "type": NotificationType.MENTION.value,
+                    "title": f"{author.display_name} mentioned @{mention}",
+                    "message": f"@{author.username}: {_preview(content)}",
+                    "reference_id": message_id,
+                    "reference_type": "message",
+                    "actor_id": author.id,
+                },
+                here=BROADCAST_MENTIONS[mention],
+                exclude=mentioned | {author.id},
+                redis_client=notification_manager.redis_client,
+            )
+        return recipients
+
+    async def _resolve(
+        self, db, messages: List[Dict], reactions: List[Dict], members: List[Dict]
+    ) -> Dict[str, Dict]:
+        """Load everything the batch's notifications refer to, one query per kind."""
+        user_ids, usernames, message_ids, channel_ids = set(), set(), set(), set()
+
+        for data in messages:
+            user_ids.add(_uuid(data.get("author_id")))
+            usernames.update(notification_manager.extract_mentions(data.get("content") or ""))
+            message_ids.add(_uuid(data.get("parent_message_id")))
+        for data in reactions:
+            user_ids.add(_uuid(data.get("user_id")))
+            message_ids.add(_uuid(data.get("message_id")))
+        for data in members:
+            user_ids.add(_uuid(data.get("added_by") or data.get("added_by_id")))
+            if not data.get("channel_name"):
+                channel_ids.add(_uuid(data.get("channel_id")))
+        user_ids.discard(None)
+        message_ids.discard(None)
+        channel_ids.discard(None)
+
+        users, users_by_name, message_authors, channel_names = {}, {}, {}, {}
+
+        if user_ids or usernames:
+            result = await db.execute(
+                select(User.id, User.username, User.display_name).where(
+                    or_(User.id.in_(user_ids), User.username.in_(usernames))
                 )
+            )
+            for user in result:
+                users[user.id] = user
+                users_by_name[user.username] = user
 
-                if should_notify:
-                    await notification_manager.create_notification(
-                        db=db,
-                        user_id=message.author_id,
-                        notification_type=NotificationType.REACTION,
-                        title=f"{reactor.display_name} reacted to your message",
-                        message=f"Reacted with {emoji}",
-                        reference_id=UUID(message_id),
-                        reference_type="message",
-                        actor_id=UUID(user_id),
+        if message_ids:
+            result = await db.execute(
+                select(Message.id, Message.author_id).where(Message.id.in_(message_ids))
+            )
+            message_authors = {row.id: row.author_id for row in result}
+
+        if channel_ids:
+            result = await db.execute(
+                select(Channel.id, Channel.name).where(Channel.id.in_(channel_ids))
+            )
+            channel_names = {row.id: row.name for row in result}
+
+        return {
+            "users": users,
+            "users_by_name": users_by_name,
+            "message_authors": message_authors,
+            "channel_names": channel_names,
+        }
+
+    def _message_notifications(self, messages: List[Dict], resolved: Dict) -> List[Dict]:
+        """Mention and reply notifications for message.created events."""
+        notifications = []
+        for data in messages:
+            message_id = _uuid(data.get("message_id"))
+            author_id = _uuid(data.get("author_id"))
+            content = data.get("content") or ""
+
+            if not message_id or not author_id:
+                logger.warning(f"message.created event missing required fields: {data}")
+                continue
+
+            author = resolved["users"].get(author_id)
+            if not author:
+                logger.warning(f"Author {author_id} not found")
+                continue
+
+            # 1. Mentions (users don't get notified of their own mentions)
+            for username in notification_manager.extract_mentions(content):
+                mentioned_user = resolved["users_by_name"].get(username)
+                if mentioned_user and mentioned_user.id != author_id:
+                    notifications.append(
+                        {
+                            "user_id": mentioned_user.id,
+                            "type": NotificationType.MENTION.value,
+                            "title": f"{author.display_name} mentioned you",
+                            "message": f"@{author.username}: {_preview(content)}",
+                            "reference_id": message_id,
+                            "reference_type": "message",
+                            "actor_id": author_id,
+                        }
                     )
 
-        except Exception as e:
-            logger.error(f"Error handling reaction.added event: {e}", exc_info=True)
+            # 2. Thread replies notify the parent message's author
+            parent_id = _uuid(data.get("parent_message_id"))
+            parent_author_id = resolved["message_authors"].get(parent_id)
+            if parent_author_id and parent_author_id != author_id:
+                notifications.append(
+                    {
+                        "user_id": parent_author_id,
+                        "type": NotificationType.REPLY.value,
+                        "title": f"{author.display_name} replied to your message",
+                        "message": _preview(content),
+                        "reference_id": message_id,
+                        "reference_type": "message",
+                        "actor_id": author_id,
+                        "group_key": group_key(NotificationType.REPLY, parent_id),
+                    }
+                )
+        return notifications
+
+    def _reaction_notifications(self, reactions: List[Dict], resolved: Dict) -> List[Dict]:
+        """Notifications for message authors when someone reacts."""
+        notifications = []
+        for data in reactions:
+            message_id = _uuid(data.get("message_id"))
+            user_id = _uuid(data.get("user_id"))
+            emoji = data.get("emoji")
 
-    async def _handle_channel_member_added(self, data: Dict):
-        """Handle channel.member_added event.
+            if not message_id or not user_id or not emoji:
+                logger.warning("reaction.added event missing required fields")
+                continue
+
+            author_id = resolved["message_authors"].get(message_id)
+            if not author_id:
+                logger.warning(f"Message {message_id} not found")
+                continue
+
+            # Don't notify if user reacts to their own message
+            if author_id == user_id:
+                continue
+
+            reactor = resolved["users"].get(user_id)
+            if not reactor:
+                logger.warning(f"User {user_id} not found")
+                continue
+
+            notifications.append(
+                {
+                    "user_id": author_id,
+                    "type": NotificationType.REACTION.value,
+                    "title": f"{reactor.display_name} reacted to your message",
+                    "message": f"Reacted with {emoji}",
+                    "reference_id": message_id,
+                    "reference_type": "message",
+                    "actor_id": user_id,
+                    "group_key": group_key(NotificationType.REACTION, message_id),
+                }
+            )
+        return notifications
 
-        Creates notification for user when added to a channel.
-        """
-        try:
-            channel_id = data.get("channel_id")
-            user_id = data.get("user_id")
-            channel_name = data.get("channel_name", "a channel")
-            added_by_id = data.get("added_by_id")
+    def _member_notifications(self, members: List[Dict], resolved: Dict) -> List[Dict]:
+        """Notifications for users added to a channel by someone else."""
+        notifications = []
+        for data in members:
+            channel_id = _uuid(data.get("channel_id"))
+            user_id = _uuid(data.get("user_id"))
+            added_by_id = _uuid(data.get("added_by") or data.get("added_by_id"))
 
             if not channel_id or not user_id:
-                logger.warning("channel.member_added event missing required fields")
-                return
-
-            async with db_base.async_session_factory() as db:
-                # Check if user wants channel update notifications
-                should_notify = await notification_manager.should_notify(
-                    db, UUID(user_id), NotificationType.CHANNEL_INVITE
-                )
+                logger.warning("member.added event missing required fields")
+                continue
 
-                if should_notify:
-                    # Get who added them (if available)
-                    adder_name = "Someone"
-                    if added_by_id:
-                        stmt = select(User).where(User.id == UUID(added_by_id))
-                        result = await db.execute(stmt)
-                        adder = result.scalar_one_or_none()
-                        if adder:
-                            adder_name = adder.display_name
-
-                    await notification_manager.create_notification(
-                        db=db,
-                        user_id=UUID(user_id),
-                        notification_type=NotificationType.CHANNEL_INVITE,
-                        title=f"Added to #{channel_name}",
-                        message=f"{adder_name} added you to #{channel_name}",
-                        reference_id=UUID(channel_id),
-                        reference_type="channel",
-                        actor_id=UUID(added_by_id) if added_by_id else None,
-                    )
+            if added_by_id == user_id:
+                continue
 
-        except Exception as e:
-            logger.error(
-                f"Error handling channel.member_added event: {e}", exc_info=True
+            channel_name = (
+                data.get("channel_name")
+                or resolved["channel_names"].get(channel_id)
+                or "a channel"
+            )
+            adder = resolved["users"].get(added_by_id)
+            adder_name = adder.display_name if adder else "Someone"
+
+            notifications.append(
+                {
+                    "user_id": user_id,
+                    "type": NotificationType.CHANNEL_INVITE.value,
+                    "title": f"Added to #{channel_name}",
+                    "message": f"{adder_name} added you to #{channel_name}",
+                    "reference_id": channel_id,
+                    "reference_type": "channel",
+                    "actor_id": added_by_id,
+                }
             )
+        return notifications
 
 
 # Global consumer instance
@@ -1,22 +1,118 @@
 """Notification manager - business logic for notifications."""
 
+import base64
+import binascii
 import logging
 import re
-from datetime import datetime
-from typing import List, Optional
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 from uuid import UUID, uuid4
 
 import redis.asyncio as redis
-from sqlalchemy import and_, desc, func, select, update
+from sqlalchemy import Select, and_, desc, func, insert, literal, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.database import Notification, NotificationPreference, User
 
 from ..config import settings
 from ..schemas.notifications import NotificationType
+from .kafka_producer import kafka_producer
+from .preference_cache import PreferenceCache
+from .realtime import EVENT_FIELDS, RealtimePublisher
+from .unread_counters import RedisUnreadCounters, UnreadCounters
 
 logger = logging.getLogger(__name__)
 
+# NotificationPreference flag consulted for each notification type
+PREFERENCE_FIELDS = {
+    NotificationType.MENTION: "mentions",
+    NotificationType.REACTION: "reactions",
+    NotificationType.REPLY: "replies",
+    NotificationType.DIRECT_MESSAGE: "direct_messages",
+    NotificationType.CHANNEL_INVITE: "channel_updates",
+}
+
+# Mentions that notify a channel's members rather than a user, and whether
+# they are limited to members that are online
+BROADCAST_MENTIONS = {"channel": False, "everyone": False, "here": True}
+
+
+@dataclass
+class NotificationPage:
+    """A page of a user's notifications, newest first."""
+
+    notifications: List[Notification]
+    total_count: int
+    # True when total_count is a lower bound (the count stopped at the cap)
+    total_is_estimate: bool = False
+    # Cursor of the next page, None on the last one
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(notification: Notification) -> str:
+    """Opaque keyset cursor pointing after a notification."""
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """(created_at, id) of a cursor; raises ValueError if it is malformed."""
+    try:
+        created_at, notification_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(notification_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def notification_conditions(
+    user_id: UUID,
+    is_read: Optional[bool] = None,
+    notification_type: Optional[NotificationType] = None,
+) -> List:
+    """WHERE conditions of a user's notification list."""
+    conditions = [Notification.user_id == user_id, Notification.deleted_at.is_(None)]
+    if is_read is not None:
+        conditions.append(Notification.is_read == is_read)
+    if notification_type:
+        conditions.append(Notification.type == notification_type.value)
+    return conditions
+
+
+def notification_page_query(
+    conditions: Sequence, page_size: int, after: Optional[tuple[datetime, UUID]] = None
+) -> Select:
+    """A page of notifications, newest first, after an optional (created_at, id) cursor.
+
+    One more row than ``page_size`` is read to know whether a next page exists.
+    """
+    query = (
+        select(Notification)
+        .where(*conditions)
+        .order_by(desc(Notification.created_at), desc(Notification.id))
+        .limit(page_size + 1)
+    )
+    if after:
+        query = query.where(
+            tuple_(Notification.created_at, Notification.id)
+            < tuple_(literal(after[0]), literal(after[1]))
+        )
+    return query
+
+
+def capped_count_query(conditions: Sequence, cap: int = settings.notification_count_cap) -> Select:
+    """Count of the notifications matching ``conditions``, stopping after ``cap`` + 1."""
+    # Ordered like the list so the scan walks the same index and stops early
+    capped = (
+        select(Notification.id)
+        .where(*conditions)
+        .order_by(desc(Notification.created_at))
+        .limit(cap + 1)
+        .subquery()
+    )
+    return select(func.count()).select_from(capped)
+
 
 class NotificationManager:
     """Manages notification operations."""
@@ -24,6 +120,9 @@ class NotificationManager:
     def __init__(self):
         """Initialize notification manager."""
         self.redis_client: Optional[redis.Redis] = None
+        self.preferences = PreferenceCache(self._load_preferences)
+        self.unread: UnreadCounters = RedisUnreadCounters()
+        self.realtime = RealtimePublisher(kafka_producer)
 
     async def init_redis(self):
         """Initialize Redis connection."""
@@ -36,9 +135,13 @@ class NotificationManager:
         except Exception as e:
             logger.warning(f"Redis connection failed: {e}. Caching disabled.")
             self.redis_client = None
+        await self.preferences.start(self.redis_client)
+        await self.unread.start(self.redis_client)
 
     async def close_redis(self):
         """Close Redis connection."""
+        await self.unread.stop()
+        await self.preferences.stop()
         if self.redis_client:
             await self.redis_client.close()
 
@@ -71,12 +174,73 @@ class NotificationManager:
         await db.commit()
         await db.refresh(notification)
 
-        # Invalidate unread count cache
-        await self._invalidate_unread_cache(user_id)
+        await self.unread.adjust({user_id: 1})
+        await self.publish_changes(
+            db,
+            [user_id],
+            created=[
+                {field: getattr(notification, field) for field in ("id", "user_id", *EVENT_FIELDS)}
+            ],
+        )
 
         logger.info(f"Created notification {notification.id} for user {user_id}")
         return notification
 
+    async def create_notifications(
+        self,
+        db: AsyncSession,
+        notifications: List[Dict[str, Any]],
+        fanned_out: Iterable[UUID] = (),
+    ) -> int:
+        """Create many notifications with one INSERT and a single commit.
+
+        Each item holds Notification column values: user_id, type, title,
+        message and optionally reference_id, reference_type, actor_id,
+        group_key, actor_ids and actor_count.
+        ``fanned_out`` lists the recipients of notifications a broadcast
+        fan-out already wrote in this transaction; they are committed and
+        their unread counters incremented along with the others, as are
+        aggregates the coalescer updated.
+        Recipients online are sent the new notifications and their unread
+        count over the websocket; fan-out recipients only the count.
+        Returns the number of notifications created.
+        """
+        fanned_out = list(fanned_out)
+        # Same keys, NULLs included, in every row: one statement for all
+        rows = [
+            {
+                "id": uuid4(),
+                "group_key": None,
+                "actor_ids": None,
+                "actor_count": 1,
+                "created_at": datetime.now(timezone.utc),
+                **notification,
+                "is_read": False,
+            }
+            for notification in notifications
+        ]
+        if rows:
+            await db.execute(insert(Notification).execution_options(render_nulls=True), rows)
+        await db.commit()
+
+        if rows or fanned_out:
+            deltas = Counter([row["user_id"] for row in rows] + fanned_out)
+            await self.unread.adjust(deltas)
+            await self.publish_changes(db, deltas, created=rows)
+            logger.info(f"Created {len(notifications) + len(fanned_out)} notifications")
+        return len(notifications) + len(fanned_out)
+
+    async def publish_changes(
+        self, db: AsyncSession, user_ids: Iterable[UUID], created: Sequence[Dict[str, Any]] = ()
+    ):
+        """Push committed changes to the users' websocket sessions, best effort."""
+        try:
+            await self.realtime.publish(
+                db, self.unread, user_ids, created, redis_client=self.redis_client
+            )
+        except Exception as e:
+            logger.warning(f"Realtime notification events not published: {e}")
+
     async def get_user_notifications(
         self,
         db: AsyncSession,
@@ -85,68 +249,60 @@ class NotificationManager:
         page_size: int = 20,
         is_read: Optional[bool] = None,
         notification_type: Optional[NotificationType] = None,
-    ) -> tuple[List[Notification], int]:
-        """Get user notifications with pagination and filters."""
-        # Build query
-        query = select(Notification).where(
-            and_(Notification.user_id == user_id, Notification.deleted_at.is_(None))
-        )
-
-        # Apply filters
-        if is_read is not None:
-            query = query.where(Notification.is_read == is_read)
-
-        if notification_type:
-            query = query.where(Notification.type == notification_type.value)
-
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        result = await db.execute(count_query)
-        total_count = result.scalar() or 0
-
-        # Apply pagination and ordering
-        query = query.order_by(desc(Notification.created_at))
-        query = query.offset((page - 1) * page_size).limit(page_size)
+        cursor: Optional[str] = None,
+    ) -> NotificationPage:
+        """Get user notifications, newest first, with filters.
+
+        Pages are read with keyset pagination on (created_at, id), served by
+        ix_notifications_user_id_created_at: pass the previous page's
+        next_cursor. Without a cursor, ``page`` is honoured with OFFSET for
+        older clients.
+
+        The total never costs a full count: the unread total is the user's
+        unread counter, a total that fits in the first page is known from
+        it, and anything else is counted up to
+        ``settings.notification_count_cap``.
+        """
+        conditions = notification_conditions(user_id, is_read, notification_type)
+        offset = 0
+        if cursor:
+            query = notification_page_query(conditions, page_size, decode_cursor(cursor))
+        else:
+            offset = (page - 1) * page_size
+            query = notification_page_query(conditions, page_size).offset(offset)
 
         result = await db.execute(query)
-        notifications = result.scalars().all()
-
-        return list(notifications), total_count
-
-    async def get_unread_count(self, db: AsyncSession, user_id: UUID) -> int:
-        """Get unread notification count with Redis caching."""
-        # Try cache first
-        if self.redis_client:
-            try:
-                cache_key = f"notification:unread:{user_id}"
-                cached = await self.redis_client.get(cache_key)
-                if cached is not None:
-                    return int(cached)
-            except Exception as e:
-                logger.warning(f"Redis cache read failed: {e}")
-
-        # Query database
-        query = select(func.count()).where(
-            and_(
-                Notification.user_id == user_id,
-                Notification.is_read == False,
-                Notification.deleted_at.is_(None),
-            )
+        notifications = list(result.scalars().all())
+        has_more = len(notifications) > page_size
+        notifications = notifications[:page_size]
+
+        total_is_estimate = False
+        if is_read is False and not notification_type:
+            total_count = await self.get_unread_count(db, user_id)
+        elif not has_more and not cursor and offset == 0:
+            total_count = offset + len(notifications)
+        else:
+            cap = settings.notification_count_cap
+            total_count = (await db.execute(capped_count_query(conditions, cap))).scalar()
+            total_is_estimate = total_count > cap
+            total_count = min(total_count, cap)
+
+        return NotificationPage(
+            notifications=notifications,
+            total_count=total_count,
+            total_is_estimate=total_is_estimate,
+            next_cursor=encode_cursor(notifications[-1]) if has_more else None,
         )
-        result = await db.execute(query)
-        count = result.scalar() or 0
 
-        # Cache the result
-        if self.redis_client:
-            try:
-                cache_key = f"notification:unread:{user_id}"
-                await self.redis_client.setex(
-                    cache_key, settings.redis_cache_ttl, str(count)
-                )
-            except Exception as e:
-                logger.warning(f"Redis cache write failed: {e}")
+    async def get_unread_count(self, db: AsyncSession, user_id: UUID) -> int:
+        """Get unread notification count from the user's unread counter."""
+        return await self.unread.get(db, user_id)
 
-        return count
+    async def get_unread_counts(
+        self, db: AsyncSession, user_ids: Iterable[UUID]
+    ) -> Dict[UUID, int]:
+        """Get the unread counts of many users in one round trip."""
+        return await self.unread.get_many(db, user_ids)
 
     async def mark_as_read(
         self, db: AsyncSession, notification_id: UUID, user_id: UUID
@@ -171,8 +327,8 @@ class NotificationManager:
             await db.commit()
             await db.refresh(notification)
 
-            # Invalidate cache
-            await self._invalidate_unread_cache(user_id)
+            await self.unread.adjust({user_id: -1})
+            await self.publish_changes(db, [user_id])
 
         return notification
 
@@ -193,8 +349,9 @@ class NotificationManager:
         result = await db.execute(stmt)
         await db.commit()
 
-        # Invalidate cache
-        await self._invalidate_unread_cache(user_id)
+        if result.rowcount:
+            await self.unread.adjust({user_id: -result.rowcount})
+            await self.publish_changes(db, [user_id])
 
         return result.rowcount
 
@@ -218,16 +375,20 @@ class NotificationManager:
         notification.deleted_at = datetime.utcnow()
         await db.commit()
 
-        # Invalidate cache if it was unread
         if not notification.is_read:
-            await self._invalidate_unread_cache(user_id)
+            await self.unread.adjust({user_id: -1})
+            await self.publish_changes(db, [user_id])
 
         return True
 
     async def get_user_preferences(
         self, db: AsyncSession, user_id: UUID
     ) -> NotificationPreference:
-        """Get user notification preferences, creating defaults if not exists."""
+        """Get user notification preferences.
+
+        Users who never changed them get an unsaved row holding the defaults
+        from settings; the row is only written by update_user_preferences.
+        """
         query = select(NotificationPreference).where(
             NotificationPreference.user_id == user_id
         )
@@ -235,21 +396,13 @@ class NotificationManager:
         prefs = result.scalar_one_or_none()
 
         if not prefs:
-            # Create default preferences
             prefs = NotificationPreference(
                 id=uuid4(),
                 user_id=user_id,
-                mentions=settings.default_mentions_enabled,
-                reactions=settings.default_reactions_enabled,
-                replies=settings.default_replies_enabled,
-                direct_messages=settings.default_direct_messages_enabled,
-                channel_updates=settings.default_channel_updates_enabled,
+                **self.default_preferences(),
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow(),
             )
-            db.add(prefs)
-            await db.commit()
-            await db.refresh(prefs)
 
         return prefs
 
@@ -265,6 +418,8 @@ class NotificationManager:
     ) -> NotificationPreference:
         """Update user notification preferences."""
         prefs = await self.get_user_preferences(db, user_id)
+        if prefs not in db:
+            db.add(prefs)  # First change: store the defaults with it
 
         if mentions is not None:
             prefs.mentions = mentions
@@ -282,39 +437,85 @@ class NotificationManager:
         await db.commit()
         await db.refresh(prefs)
 
+        await self.preferences.invalidate(user_id)
+
         return prefs
 
+    async def get_preferences_bulk(
+        self, db: AsyncSession, user_ids: Iterable[UUID]
+    ) -> Dict[UUID, Dict[str, bool]]:
+        """Get the preference flags of many users, for notification fan-out.
+
+        Served from the preference cache; users missing from it are loaded
+        with one query.
+        """
+        return await self.preferences.get_many(db, user_ids)
+
+    async def _load_preferences(
+        self, db: AsyncSession, user_ids: Iterable[UUID]
+    ) -> Dict[UUID, Dict[str, bool]]:
+        """Load the preference flags of many users in one query.
+
+        Users without a preferences row get the defaults from settings; no
+        row is written for them.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+
+        query = select(
+            NotificationPreference.user_id,
+            *(getattr(NotificationPreference, field) for field in PREFERENCE_FIELDS.values()),
+        ).where(NotificationPreference.user_id.in_(user_ids))
+        result = await db.execute(query)
+
+        prefs = {
+            row.user_id: {field: getattr(row, field) for field in PREFERENCE_FIELDS.values()}
+            for row in result
+        }
+        for user_id in user_ids - prefs.keys():
+            prefs[user_id] = self.default_preferences()
+        return prefs
+
+    def default_preferences(self) -> Dict[str, bool]:
+        """Preference flags of a user who never changed them."""
+        return {
+            "mentions": settings.default_mentions_enabled,
+            "reactions": settings.default_reactions_enabled,
+            "replies": settings.default_replies_enabled,
+            "direct_messages": settings.default_direct_messages_enabled,
+            "channel_updates": settings.default_channel_updates_enabled,
+        }
+
     async def should_notify(
         self, db: AsyncSession, user_id: UUID, notification_type: NotificationType
     ) -> bool:
         """Check if user should receive a notification of given type."""
-        prefs = await self.get_user_preferences(db, user_id)
-
-        type_map = {
-            NotificationType.MENTION: prefs.mentions,
-            NotificationType.REACTION: prefs.reactions,
-            NotificationType.REPLY: prefs.replies,
-            NotificationType.DIRECT_MESSAGE: prefs.direct_messages,
-            NotificationType.CHANNEL_INVITE: prefs.channel_updates,
-        }
+        field = PREFERENCE_FIELDS.get(notification_type)
+        if not field:
+            return True
 
-        return type_map.get(notification_type, True)
+        prefs = await self.preferences.get(db, user_id)
+        return prefs[field]
 
     def extract_mentions(self, content: str) -> List[str]:
         """Extract @username mentions from message content."""
         # Match @username pattern (alphanumeric and underscores)
         pattern = r"@([a-zA-Z0-9_]+)"
-        mentions = re.findall(pattern, content)
-        return list(set(mentions))  # Remove duplicates
-
-    async def _invalidate_unread_cache(self, user_id: UUID):
-        """Invalidate unread count cache for user."""
-        if self.redis_client:
-            try:
-                cache_key = f"notification:unread:{user_id}"
-                await self.redis_client.delete(cache_key)
-            except Exception as e:
-                logger.warning(f"Redis cache invalidation failed: {e}")
+        mentions = set(re.findall(pattern, content)) - BROADCAST_MENTIONS.keys()
+        return list(mentions)
+
+    def extract_broadcast_mention(self, content: str) -> Optional[str]:
+        """The broadcast mention (@channel, @everyone, @here) in content, if any.
+
+        When several are present the widest wins: @channel and @everyone
+        notify every member, @here only those online.
+        """
+        mentions = set(re.findall(r"@(channel|everyone|here)\b", content))
+        for mention in ("channel", "everyone", "here"):
+            if mention in mentions:
+                return mention
+        return None
 
 
 # Global instance
@@ -0,0 +1,203 @@
+"""Cached notification preference flags.
+
+Every notification candidate is checked against the recipient's
+preferences, so a message mentioning twenty people used to cost twenty
+preference queries. Flags are now cached per user at two levels:
+
+- in process, for ``preference_cache_local_ttl`` seconds, bounded to
+  ``preference_cache_max_entries`` users;
+- in Redis (``notification:prefs:<user_id>``), shared by all replicas, for
+  ``preference_cache_ttl`` seconds.
+
+Bulk lookups (``get_many``) read the local level, then fetch every miss
+with one MGET, then load the remaining users with one database query and
+write them back to Redis in one pipeline.
+
+Changing preferences calls ``invalidate()``: it deletes the Redis entry and
+publishes the user on ``notification:prefs:invalidate``, which every
+replica subscribes to in order to drop its local copy. The TTLs are only a
+safety net for notices missed while Redis was unreachable.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFERENCE_LOOKUPS = Counter(
+    "notification_preference_lookups_total",
+    "Preference lookups by the level that answered them",
+    ["level"],  # local, redis, database
+)
+
+INVALIDATION_CHANNEL = "notification:prefs:invalidate"
+
+Flags = Dict[str, bool]
+
+# Coroutine ``load(db, user_ids)`` returning the flags of every given user
+LoadPreferences = Callable[[AsyncSession, set], Awaitable[Dict[UUID, Flags]]]
+
+
+def _cache_key(user_id: UUID) -> str:
+    return f"notification:prefs:{user_id}"
+
+
+class PreferenceCache:
+    """Two-level cache of preference flags, keyed by user.
+
+    Args:
+        load: Coroutine loading flags from the database, defaults included
+        local_ttl: Seconds a flag set is served from process memory
+        redis_ttl: Seconds a flag set is kept in Redis
+        max_entries: Users kept in process memory
+    """
+
+    def __init__(
+        self,
+        load: LoadPreferences,
+        local_ttl: float = settings.preference_cache_local_ttl,
+        redis_ttl: int = settings.preference_cache_ttl,
+        max_entries: int = settings.preference_cache_max_entries,
+    ):
+        self.load = load
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self.redis_client = None
+        self._local: Dict[UUID, Tuple[Flags, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    async def get(self, db: AsyncSession, user_id: UUID) -> Flags:
+        """Flags of one user."""
+        return (await self.get_many(db, [user_id]))[user_id]
+
+    async def get_many(
+        self, db: AsyncSession, user_ids: Iterable[UUID], now: Optional[float] = None
+    ) -> Dict[UUID, Flags]:
+        """Flags of many users: one MGET and at most one query for the misses."""
+        now = time.monotonic() if now is None else now
+        flags: Dict[UUID, Flags] = {}
+        missing = []
+        for user_id in set(user_ids):
+            cached = self._local.get(user_id)
+            if cached is not None and now - cached[1] < self.local_ttl:
+                flags[user_id] = cached[0]
+            else:
+                missing.append(user_id)
+        PREFERENCE_LOOKUPS.labels(level="local").inc(len(flags))
+        if not missing:
+            return flags
+
+        from_redis = await self._redis_get(missing)
+        PREFERENCE_LOOKUPS.labels(level="redis").inc(len(from_redis))
+        flags.update(from_redis)
+
+        to_load = {user_id for user_id in missing if user_id not in from_redis}
+        if to_load:
+            loaded = await self.load(db, to_load)
+            PREFERENCE_LOOKUPS.labels(level="database").inc(len(loaded))
+            flags.update(loaded)
+            await self._redis_set(loaded)
+
+        for user_id in missing:
+            self._remember(user_id, flags[user_id], now)
+        return flags
+
+    def _remember(self, user_id: UUID, flags: Flags, now: float):
+        self._local.pop(user_id, None)
+        self._local[user_id] = (flags, now)
+        while len(self._local) > self.max_entries:
+            # Oldest entry first (dicts keep insertion order)
+            del self._local[next(iter(self._local))]
+
+    async def _redis_get(self, user_ids: list) -> Dict[UUID, Flags]:
+        if not self.redis_client:
+            return {}
+        try:
+            values = await self.redis_client.mget([_cache_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f"Redis preference cache read failed: {e}")
+            return {}
+        return {
+            user_id: json.loads(value)
+            for user_id, value in zip(user_ids, values, strict=True)
+            if value is not None
+        }
+
+    async def _redis_set(self, flags: Dict[UUID, Flags]):
+        if not self.redis_client or not flags:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for user_id, user_flags in flags.items():
+                pipe.set(_cache_key(user_id), json.dumps(user_flags), ex=self.redis_ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis preference cache write failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    async def invalidate(self, user_id: UUID):
+        """Forget a user's flags here, in Redis and on every other replica."""
+        self.forget(user_id)
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.delete(_cache_key(user_id))
+            await self.redis_client.publish(INVALIDATION_CHANNEL, str(user_id))
+        except Exception as e:
+            logger.warning(f"Redis preference cache invalidation failed: {e}")
+
+    def forget(self, user_id: UUID):
+        """Drop the in-process copy of a user's flags."""
+        self._local.pop(user_id, None)
+
+    async def start(self, redis_client):
+        """Use Redis as the shared level and follow other replicas' invalidations."""
+        self.redis_client = redis_client
+        if redis_client:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop following invalidations."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.redis_client = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Entries cached while unsubscribed may have missed a notice
+                self._local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.forget(UUID(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Preference invalidation listener failed, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
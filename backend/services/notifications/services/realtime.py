@@ -0,0 +1,183 @@
+"""Realtime notification events for the websocket service.
+
+Clients used to discover new notifications by polling ``GET /notifications``
+and the unread count endpoint. Instead, after each commit the service
+publishes, on ``kafka_notifications_topic``:
+
+- ``notification.created`` for every notification inserted;
+- ``unread_count.changed`` with the recipient's new unread count.
+
+Events are keyed by the recipient's JWT subject (``users.keycloak_id``),
+which is how the websocket service identifies sessions: it drops events for
+users with no session on the node before decoding them, and delivers the
+rest to the user's sessions, batched per user per tick.
+
+These are best-effort UI signals, not a source of truth: they go through the
+fire-and-forget producer, and are skipped while it is disconnected rather
+than buffered (a client that reconnects refetches anyway). When presence is
+available, recipients without a websocket session anywhere are skipped too,
+so a broadcast fan-out to a large channel publishes for the members online.
+Presence is only kept by the websocket service's Redis client manager: with
+the in-memory one the hash does not exist and every recipient is published
+for.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database import User
+from shared.events import EventProducer
+
+from ..config import settings
+from .unread_counters import UnreadCounters
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_CREATED = "notification.created"
+UNREAD_COUNT_CHANGED = "unread_count.changed"
+
+# Notification columns carried by notification.created, besides the id
+EVENT_FIELDS = (
+    "type",
+    "title",
+    "message",
+    "reference_id",
+    "reference_type",
+    "actor_id",
+    "actor_count",
+    "created_at",
+)
+
+
+def _value(value):
+    """JSON-friendly event value."""
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class RealtimePublisher:
+    """Publishes notification and unread count events per recipient.
+
+    Args:
+        producer: Producer the events are published with
+        topic: Kafka topic the websocket service consumes
+        presence_key: Redis hash of online users (JWT subject -> session count)
+            maintained by the websocket service
+        lookup_batch: Recipients resolved per query
+    """
+
+    def __init__(
+        self,
+        producer: EventProducer,
+        topic: str = settings.kafka_notifications_topic,
+        presence_key: str = settings.websocket_presence_key,
+        lookup_batch: int = settings.realtime_lookup_batch,
+    ):
+        self.producer = producer
+        self.topic = topic
+        self.presence_key = presence_key
+        self.lookup_batch = lookup_batch
+        self._presence_missing = False  # warned once until the hash shows up
+
+    async def publish(
+        self,
+        db: AsyncSession,
+        unread: UnreadCounters,
+        user_ids: Iterable[UUID],
+        created: Sequence[Dict] = (),
+        redis_client=None,
+    ) -> int:
+        """Publish the events of a committed change; returns the recipients reached.
+
+        Args:
+            db: Session to resolve recipients and seed unread counters with
+            unread: Unread counters the published counts are read from
+            user_ids: Users whose unread count changed
+            created: Column values of the notifications inserted, id included
+            redis_client: Client to read presence with; without it, or
+                without a presence hash, every recipient is published for
+        """
+        if not self.producer.connected:
+            return 0
+        user_ids = set(user_ids)
+        if not user_ids:
+            return 0
+
+        subjects = await self._online_subjects(db, user_ids, redis_client)
+        if not subjects:
+            return 0
+        online = list(subjects)
+        counts: Dict[UUID, int] = {}
+        for start in range(0, len(online), self.lookup_batch):
+            counts.update(await unread.get_many(db, online[start : start + self.lookup_batch]))
+
+        for notification in created:
+            subject = subjects.get(notification["user_id"])
+            if subject:
+                self._publish(
+                    NOTIFICATION_CREATED,
+                    subject,
+                    {
+                        "notification_id": str(notification["id"]),
+                        **{field: _value(notification.get(field)) for field in EVENT_FIELDS},
+                    },
+                )
+        for user_id, subject in subjects.items():
+            self._publish(UNREAD_COUNT_CHANGED, subject, {"count": counts.get(user_id, 0)})
+        return len(subjects)
+
+    def _publish(self, event_type: str, subject: str, data: Dict):
+        self.producer.publish(
+            self.topic, event_type, {"recipient_id": subject, **data}, key=subject
+        )
+
+    async def _online_subjects(
+        self, db: AsyncSession, user_ids: Iterable[UUID], redis_client
+    ) -> Dict[UUID, str]:
+        """JWT subject of each recipient with a websocket session."""
+        user_ids = list(user_ids)
+        if redis_client is not None and not await self._presence_kept(redis_client):
+            redis_client = None
+        subjects: Dict[UUID, str] = {}
+        for start in range(0, len(user_ids), self.lookup_batch):
+            batch = user_ids[start : start + self.lookup_batch]
+            result = await db.execute(
+                select(User.id, User.keycloak_id).where(User.id.in_(batch))
+            )
+            rows: List = result.all()
+            if redis_client is not None and rows:
+                try:
+                    counts = await redis_client.hmget(
+                        self.presence_key, [row.keycloak_id for row in rows]
+                    )
+                    rows = [
+                        row
+                        for row, count in zip(rows, counts, strict=True)
+                        if count and int(count) > 0
+                    ]
+                except Exception as e:
+                    logger.warning(f"Presence lookup failed, publishing for every recipient: {e}")
+            subjects.update((row.id, row.keycloak_id) for row in rows)
+        return subjects
+
+    async def _presence_kept(self, redis_client) -> bool:
+        """Whether the websocket service maintains the presence hash."""
+        try:
+            if await redis_client.exists(self.presence_key):
+                self._presence_missing = False
+                return True
+            if not self._presence_missing:
+                self._presence_missing = True
+                logger.warning(
+                    f"Presence hash {self.presence_key} not found, publishing for every recipient"
+                )
+        except Exception as e:
+            logger.warning(f"Presence lookup failed, publishing for every recipient: {e}")
+        return False
@@ -0,0 +1,361 @@
+"""Per-user unread notification counters.
+
+Unread counts used to be cached as the result of a ``COUNT(*)`` and deleted
+on every change, so the next poll of an active user recounted from
+Postgres. Counters are now kept up to date instead:
+
+- creating notifications increments the recipients' counters, reading or
+  deleting unread ones decrements them, with atomic INCRBY applied only to
+  counters that exist (a missing counter is never created from a delta);
+- a missing counter is counted from the database on first read and seeded
+  with SET NX; counters expire ``unread_counter_ttl`` seconds after
+  seeding and are recounted then;
+- every ``unread_reconcile_interval`` seconds one replica walks all
+  counters, recounts them in batches with one GROUP BY query each and
+  corrects those that drifted (a counter that changed meanwhile is left
+  for the next pass);
+- many users' counters are read with one MGET, with one GROUP BY query for
+  the ones missing.
+
+``RedisUnreadCounters`` shares counters between replicas;
+``InMemoryUnreadCounters`` keeps them in process, for tests.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Iterable, List, Mapping, Optional, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.database import Notification
+from shared.database import base as db_base
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+UNREAD_LOOKUPS = Counter(
+    "notification_unread_counter_lookups_total",
+    "Unread count lookups by where they were answered",
+    ["level"],  # counter, database
+)
+UNREAD_CORRECTIONS = Counter(
+    "notification_unread_counter_corrections_total",
+    "Unread counters corrected by reconciliation",
+)
+
+COUNTER_PREFIX = "notification:unread:"
+RECONCILE_LOCK = "notification:unread-reconcile"
+
+
+def unread_count_query(user_ids: Iterable[UUID]) -> Select:
+    """(user_id, unread count) of each of ``user_ids`` with unread notifications."""
+    return (
+        select(Notification.user_id, func.count())
+        .where(
+            Notification.user_id.in_(user_ids),
+            Notification.is_read.is_(False),
+            Notification.deleted_at.is_(None),
+        )
+        .group_by(Notification.user_id)
+    )
+
+
+class UnreadCounters(ABC):
+    """Unread counters with their database fallback and reconciliation.
+
+    Subclasses provide the storage hooks.
+
+    Args:
+        ttl: Seconds a seeded counter lives before being recounted
+        reconcile_interval: Seconds between reconciliation passes
+        reconcile_batch: Counters recounted per query during reconciliation
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.unread_counter_ttl,
+        reconcile_interval: float = settings.unread_reconcile_interval,
+        reconcile_batch: int = settings.unread_reconcile_batch,
+    ):
+        self.ttl = ttl
+        self.reconcile_interval = reconcile_interval
+        self.reconcile_batch = reconcile_batch
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Reads and updates
+    # ------------------------------------------------------------------
+
+    async def get(self, db: AsyncSession, user_id: UUID) -> int:
+        """Unread count of one user."""
+        return (await self.get_many(db, [user_id]))[user_id]
+
+    async def get_many(self, db: AsyncSession, user_ids: Iterable[UUID]) -> Dict[UUID, int]:
+        """Unread counts of many users: one read, at most one query for the misses."""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+
+        counts: Dict[UUID, Optional[int]] = dict(
+            zip(user_ids, await self._safe_get(user_ids), strict=True)
+        )
+        missing = [user_id for user_id, count in counts.items() if count is None]
+        UNREAD_LOOKUPS.labels(level="counter").inc(len(user_ids) - len(missing))
+        if missing:
+            UNREAD_LOOKUPS.labels(level="database").inc(len(missing))
+            loaded = await self.count(db, missing)
+            counts.update(loaded)
+            await self._safe(self._store_seed(loaded), "seed")
+        return {user_id: max(count, 0) for user_id, count in counts.items()}
+
+    async def adjust(self, deltas: Mapping[UUID, int]):
+        """Apply committed changes: +n for new unread notifications, -n for read ones."""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if deltas:
+            await self._safe(self._store_adjust(deltas), "update")
+
+    async def count(self, db: AsyncSession, user_ids: Iterable[UUID]) -> Dict[UUID, int]:
+        """Count unread notifications in the database, one GROUP BY query."""
+        user_ids = list(user_ids)
+        result = await db.execute(unread_count_query(user_ids))
+        counts = dict.fromkeys(user_ids, 0)
+        counts.update(dict(result.all()))
+        return counts
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """Recount every counter against the database; returns how many were corrected."""
+        corrected = 0
+        async for user_ids in self._store_scan(self.reconcile_batch):
+            stored = dict(zip(user_ids, await self._store_get(user_ids), strict=True))
+            actual = await self.count(db, user_ids)
+            drifted = {
+                user_id: (stored[user_id], actual[user_id])
+                for user_id in user_ids
+                if stored[user_id] is not None and stored[user_id] != actual[user_id]
+            }
+            if drifted:
+                corrected += await self._store_replace(drifted)
+        if corrected:
+            UNREAD_CORRECTIONS.inc(corrected)
+            logger.info(f"Reconciliation corrected {corrected} unread counters")
+        return corrected
+
+    async def start(self, redis_client=None):
+        """Start periodic reconciliation."""
+        self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        """Stop periodic reconciliation."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                if await self._claim_reconcile():
+                    async with db_base.async_session_factory() as db:
+                        await self.reconcile(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Unread counter reconciliation failed: {e}")
+
+    async def _safe_get(self, user_ids: List[UUID]) -> List[Optional[int]]:
+        try:
+            return await self._store_get(user_ids)
+        except Exception as e:
+            logger.warning(f"Unread counter read failed: {e}")
+            return [None] * len(user_ids)
+
+    async def _safe(self, operation, action: str):
+        try:
+            await operation
+        except Exception as e:
+            logger.warning(f"Unread counter {action} failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Storage hooks
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def _store_get(self, user_ids: List[UUID]) -> List[Optional[int]]:
+        """Counter of each user, None where there is none."""
+
+    @abstractmethod
+    async def _store_seed(self, counts: Mapping[UUID, int]):
+        """Create counters that do not exist yet."""
+
+    @abstractmethod
+    async def _store_adjust(self, deltas: Mapping[UUID, int]):
+        """Add to existing counters, never below zero; missing ones stay missing."""
+
+    @abstractmethod
+    def _store_scan(self, batch: int) -> AsyncIterator[List[UUID]]:
+        """Users with a counter, in batches."""
+
+    @abstractmethod
+    async def _store_replace(self, changes: Mapping[UUID, Tuple[int, int]]) -> int:
+        """Set counters from expected to actual values, skipping those that changed."""
+
+    async def _claim_reconcile(self) -> bool:
+        """Whether this replica runs the next reconciliation pass."""
+        return True
+
+
+# ============================================================================
+# In-memory backend
+# ============================================================================
+
+
+class InMemoryUnreadCounters(UnreadCounters):
+    """Counters in process memory, for a single replica or tests."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.values: Dict[UUID, int] = {}
+
+    async def _store_get(self, user_ids: List[UUID]) -> List[Optional[int]]:
+        return [self.values.get(user_id) for user_id in user_ids]
+
+    async def _store_seed(self, counts: Mapping[UUID, int]):
+        for user_id, count in counts.items():
+            self.values.setdefault(user_id, count)
+
+    async def _store_adjust(self, deltas: Mapping[UUID, int]):
+        for user_id, delta in deltas.items():
+            if user_id in self.values:
+                self.values[user_id] = max(self.values[user_id] + delta, 0)
+
+    async def _store_scan(self, batch: int) -> AsyncIterator[List[UUID]]:
+        user_ids = list(self.values)
+        for start in range(0, len(user_ids), batch):
+            yield user_ids[start : start + batch]
+
+    async def _store_replace(self, changes: Mapping[UUID, Tuple[int, int]]) -> int:
+        replaced = 0
+        for user_id, (expected, actual) in changes.items():
+            if self.values.get(user_id) == expected:
+                self.values[user_id] = actual
+                replaced += 1
+        return replaced
+
+
+# ============================================================================
+# Redis backend
+# ============================================================================
+
+# KEYS: counters; ARGV: deltas, in the same order
+_ADJUST_EXISTING = """
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        if redis.call('INCRBY', key, ARGV[i]) < 0 then
+            redis.call('SET', key, 0, 'KEEPTTL')
+        end
+    end
+end
+return 0
+"""
+
+# KEYS: counters; ARGV: expected and actual value of each, in pairs
+_REPLACE_UNCHANGED = """
+local replaced = 0
+for i, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[2 * i - 1] then
+        redis.call('SET', key, ARGV[2 * i], 'KEEPTTL')
+        replaced = replaced + 1
+    end
+end
+return replaced
+"""
+
+
+def _counter_key(user_id: UUID) -> str:
+    return f"{COUNTER_PREFIX}{user_id}"
+
+
+class RedisUnreadCounters(UnreadCounters):
+    """Counters shared by every replica through Redis.
+
+    Keys:
+        notification:unread:{user_id}     unread count of the user
+        notification:unread-reconcile     held by the replica reconciling
+
+    Without a Redis client every read is counted from the database.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.redis_client = None
+        self._adjust_existing = None
+        self._replace_unchanged = None
+
+    async def start(self, redis_client=None):
+        self.redis_client = redis_client
+        if redis_client:
+            self._adjust_existing = redis_client.register_script(_ADJUST_EXISTING)
+            self._replace_unchanged = redis_client.register_script(_REPLACE_UNCHANGED)
+            await super().start()
+
+    async def stop(self):
+        await super().stop()
+        self.redis_client = None
+
+    async def _store_get(self, user_ids: List[UUID]) -> List[Optional[int]]:
+        if not self.redis_client:
+            return [None] * len(user_ids)
+        values = await self.redis_client.mget([_counter_key(user_id) for user_id in user_ids])
+        return [None if value is None else int(value) for value in values]
+
+    async def _store_seed(self, counts: Mapping[UUID, int]):
+        if not self.redis_client or not counts:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id, count in counts.items():
+            pipe.set(_counter_key(user_id), count, ex=self.ttl, nx=True)
+        await pipe.execute()
+
+    async def _store_adjust(self, deltas: Mapping[UUID, int]):
+        if not self.redis_client:
+            return
+        await self._adjust_existing(
+            keys=[_counter_key(user_id) for user_id in deltas], args=list(deltas.values())
+        )
+
+    async def _store_scan(self, batch: int) -> AsyncIterator[List[UUID]]:
+        user_ids: List[UUID] = []
+        async for key in self.redis_client.scan_iter(match=f"{COUNTER_PREFIX}*", count=batch):
+            user_ids.append(UUID(key[len(COUNTER_PREFIX) :]))
+            if len(user_ids) >= batch:
+                yield user_ids
+                user_ids = []
+        if user_ids:
+            yield user_ids
+
+    async def _store_replace(self, changes: Mapping[UUID, Tuple[int, int]]) -> int:
+        args = [value for expected, actual in changes.values() for value in (expected, actual)]
+        return await self._replace_unchanged(
+            keys=[_counter_key(user_id) for user_id in changes], args=args
+        )
+
+    async def _claim_reconcile(self) -> bool:
+        # Expires before the next pass is due, so a stopped replica never blocks it
+        return bool(
+            await self.redis_client.set(
+                RECONCILE_LOCK, "1", ex=max(int(self.reconcile_interval) - 1, 1), nx=True
+            )
+        )
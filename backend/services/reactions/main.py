@@ -8,13 +8,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer
 
-from shared.database import close_db, init_db
+from shared.database import DatabaseMetricsMiddleware, close_db, init_db
 
 from .config import settings
 from .middleware import AuthMiddleware
 from .routers import health_router, reactions_router
 from .services.kafka_consumer import kafka_consumer
-from .services.kafka_producer import kafka_producer
+from .services.kafka_producer import kafka_producer, outbox_relay
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Configure logging
@@ -40,6 +40,9 @@ async def lifespan(app: FastAPI):
     await kafka_producer.start()
     logger.info("Kafka producer initialized")
 
+    # Start publishing committed events
+    outbox_relay.start()
+
     # Start Kafka consumer
     await kafka_consumer.start()
     logger.info("Kafka consumer initialized")
@@ -52,6 +55,9 @@ async def lifespan(app: FastAPI):
     # Stop Kafka consumer
     await kafka_consumer.stop()
 
+    # Stop the outbox relay before the producer it publishes with
+    await outbox_relay.stop()
+
     # Stop Kafka producer
     await kafka_producer.stop()
 
@@ -78,6 +84,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 
 def custom_openapi():
     """Customize OpenAPI schema to add security."""
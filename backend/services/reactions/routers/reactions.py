@@ -10,7 +10,8 @@ from sqlalchemy import and_, delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from shared.database import Message, Reaction, User, get_db
+from shared.database import Message, Reaction, User, get_db, query_budget
+from shared.events.outbox import add_outbox_event
 
 from ..dependencies import (
     get_current_user,
@@ -24,7 +25,6 @@ from ..schemas.reactions import (
     ReactionSummaryItem,
     ReactionSummaryResponse,
 )
-from ..services.kafka_producer import kafka_producer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -36,6 +36,7 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(security)],
 )
+@query_budget(6)
 async def add_reaction(
     message_id: UUID,
     reaction_data: ReactionCreate,
@@ -77,15 +78,14 @@ async def add_reaction(
             emoji=reaction_data.emoji,
         )
         db.add(reaction)
-        await db.commit()
-        await db.refresh(reaction)
-
-        # Publish reaction.added event
-        await kafka_producer.publish_event(
-            topic="reactions",
-            key=str(message_id),
-            event_type="reaction.added",
-            data={
+        await db.flush()  # Get reaction.id; a concurrent duplicate fails here
+
+        # Committed together with the reaction, relayed to Kafka in the background
+        add_outbox_event(
+            db,
+            "reactions",
+            "reaction.added",
+            {
                 "reaction_id": str(reaction.id),
                 "message_id": str(message_id),
                 "channel_id": str(message.channel_id),
@@ -94,7 +94,9 @@ async def add_reaction(
                 "emoji": reaction_data.emoji,
                 "created_at": reaction.created_at.isoformat(),
             },
+            key=str(message_id),
         )
+        await db.commit()
 
         logger.info(
             f"User {current_user.id} added reaction {reaction_data.emoji} to message {message_id}"
@@ -123,6 +125,7 @@ async def add_reaction(
     status_code=status.HTTP_204_NO_CONTENT,
     dependencies=[Depends(security)],
 )
+@query_budget(6)
 async def remove_reaction(
     message_id: UUID,
     emoji: str,
@@ -157,14 +160,13 @@ async def remove_reaction(
 
     # Delete the reaction
     await db.delete(reaction)
-    await db.commit()
 
-    # Publish reaction.removed event
-    await kafka_producer.publish_event(
-        topic="reactions",
-        key=str(message_id),
-        event_type="reaction.removed",
-        data={
+    # Committed together with the deletion, relayed to Kafka in the background
+    add_outbox_event(
+        db,
+        "reactions",
+        "reaction.removed",
+        {
             "reaction_id": str(reaction.id),
             "message_id": str(message_id),
             "channel_id": str(message.channel_id),
@@ -173,7 +175,9 @@ async def remove_reaction(
             "emoji": emoji,
             "removed_at": datetime.now(timezone.utc).isoformat(),
         },
+        key=str(message_id),
     )
+    await db.commit()
 
     logger.info(
         f"User {current_user.id} removed reaction {emoji} from message {message_id}"
@@ -185,6 +189,7 @@ async def remove_reaction(
     response_model=ReactionListResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(4)
 async def list_reactions(
     message_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -236,6 +241,7 @@ async def list_reactions(
     response_model=ReactionSummaryResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(4)
 async def get_reaction_summary(
     message_id: UUID,
     db: AsyncSession = Depends(get_db),
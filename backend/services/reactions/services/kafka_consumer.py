@@ -1,7 +1,6 @@
 """Kafka consumer for processing message events."""
 
 import asyncio
-import json
 import logging
 from typing import Dict
 
@@ -11,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.database import Reaction
 from shared.database.base import async_session_factory
+from shared.events.envelope import decode_event
 
 from ..config import settings
 
@@ -34,7 +34,7 @@ class KafkaConsumerService:
                 "messages",  # Subscribe to messages topic
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+                value_deserializer=lambda m: decode_event(m).as_dict(),
                 auto_offset_reset="latest",
             )
 
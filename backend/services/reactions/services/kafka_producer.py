@@ -1,79 +1,25 @@
-"""Kafka producer for publishing reaction events."""
+"""Kafka producer for publishing reaction events.
 
-import json
-import logging
-from typing import Any, Dict, Optional
+Routers don't publish directly: they stage events in the transactional
+outbox (shared.events.outbox) and ``outbox_relay`` publishes them.
+"""
 
-from aiokafka import AIOKafkaProducer
+from shared.events import EventProducer
+from shared.events.outbox import OutboxRelay
 
 from ..config import settings
 
-logger = logging.getLogger(__name__)
 
-
-class KafkaProducerService:
+class KafkaProducerService(EventProducer):
     """Kafka producer service for publishing events."""
 
     def __init__(self):
         """Initialize Kafka producer."""
-        self.producer: Optional[AIOKafkaProducer] = None
-        self.bootstrap_servers = settings.kafka_bootstrap_servers
-
-    async def start(self):
-        """Start the Kafka producer."""
-        try:
-            self.producer = AIOKafkaProducer(
-                bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            )
-            await self.producer.start()
-            logger.info(f"Kafka producer started: {self.bootstrap_servers}")
-        except Exception as e:
-            logger.error(f"Failed to start Kafka producer: {e}")
-            raise
-
-    async def stop(self):
-        """Stop the Kafka producer."""
-        if self.producer:
-            await self.producer.stop()
-            logger.info("Kafka producer stopped")
-
-    async def publish_event(
-        self,
-        topic: str,
-        key: str,
-        event_type: str,
-        data: Dict[str, Any],
-    ):
-        """Publish an event to Kafka.
-
-        Args:
-            topic: Kafka topic name
-            key: Message key (for partitioning)
-            event_type: Type of event (e.g., 'reaction.added')
-            data: Event payload
-        """
-        if not self.producer:
-            logger.error("Kafka producer not initialized")
-            return
-
-        try:
-            message = {
-                "event_type": event_type,
-                "data": data,
-            }
-
-            await self.producer.send(
-                topic=topic,
-                value=message,
-                key=key.encode("utf-8"),
-            )
-
-            logger.info(f"Published event: {event_type} to topic: {topic}")
-
-        except Exception as e:
-            logger.error(f"Failed to publish event {event_type}: {e}")
+        super().__init__(settings.kafka_bootstrap_servers, client_id="reactions-service")
 
 
 # Global producer instance
 kafka_producer = KafkaProducerService()
+
+# Relays reaction events committed to the outbox
+outbox_relay = OutboxRelay(kafka_producer)
@@ -8,7 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer
 
-from shared.database import close_db, init_db
+from shared.database import DatabaseMetricsMiddleware, close_db, init_db
 
 from .config import settings
 from .middleware import AuthMiddleware
@@ -78,6 +78,9 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 logger.info("Prometheus metrics exposed at /metrics")
 
+# Record per-route query count, database time and pool metrics
+app.add_middleware(DatabaseMetricsMiddleware)
+
 def custom_openapi():
     """Customize OpenAPI schema to add security."""
     if app.openapi_schema:
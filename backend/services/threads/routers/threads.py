@@ -10,7 +10,16 @@ from sqlalchemy import and_, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from shared.database import Channel, Message, MessageType, Reaction, Thread, User, get_db
+from shared.database import (
+    Channel,
+    Message,
+    MessageType,
+    Reaction,
+    Thread,
+    User,
+    get_db,
+    query_budget,
+)
 
 from ..dependencies import (
     get_current_user,
@@ -166,6 +175,7 @@ async def update_thread_stats(
     response_model=ThreadResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(6)
 async def get_thread(
     thread_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -196,6 +206,7 @@ async def get_thread(
     response_model=ThreadRepliesResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(8)
 async def get_thread_replies(
     thread_id: UUID,
     limit: int = Query(50, ge=1, le=100),
@@ -278,6 +289,7 @@ async def get_thread_replies(
     response_model=ThreadRepliesResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(8)
 async def get_message_replies(
     message_id: UUID,
     limit: int = Query(50, ge=1, le=100),
@@ -386,6 +398,7 @@ async def get_message_replies(
     response_model=ThreadListResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(5)
 async def get_channel_threads(
     channel_id: UUID,
     limit: int = Query(20, ge=1, le=100),
@@ -404,9 +417,11 @@ async def get_channel_threads(
 
     # Build query to get threads
     # Join threads with messages to get channel_id
+    # Root message authors are joined in so the page costs a single query
     stmt = (
-        select(Thread, Message)
+        select(Thread, Message, User.username)
         .join(Message, Thread.root_message_id == Message.id)
+        .outerjoin(User, Message.author_id == User.id)
         .where(
             Message.channel_id == channel_id,
             Message.deleted_at.is_(None),
@@ -425,12 +440,7 @@ async def get_channel_threads(
     threads_data = rows[:limit]
 
     threads = []
-    for thread, root_message in threads_data:
-        # Get root message author
-        stmt = select(User).where(User.id == root_message.author_id)
-        result = await db.execute(stmt)
-        author = result.scalar_one_or_none()
-
+    for thread, root_message, author_username in threads_data:
         threads.append(
             ThreadResponse(
                 id=thread.id,
@@ -442,7 +452,7 @@ async def get_channel_threads(
                 created_at=thread.created_at,
                 updated_at=thread.updated_at,
                 root_message_content=root_message.content,
-                root_message_author=author.username if author else None,
+                root_message_author=author_username,
             )
         )
 
@@ -476,6 +486,7 @@ async def get_channel_threads(
     response_model=ThreadParticipantsResponse,
     dependencies=[Depends(security)],
 )
+@query_budget(6)
 async def get_thread_participants(
     thread_id: UUID,
     db: AsyncSession = Depends(get_db),
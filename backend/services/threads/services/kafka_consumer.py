@@ -1,7 +1,6 @@
 """Kafka consumer for processing message events."""
 
 import asyncio
-import json
 import logging
 from datetime import datetime, timezone
 from typing import Dict, Any
@@ -13,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.database import Message, Thread
 from shared.database.base import async_engine
+from shared.events.envelope import decode_event
 
 from ..config import settings
 
@@ -35,7 +35,7 @@ class KafkaConsumerService:
                 settings.kafka_message_topic,
                 bootstrap_servers=self.bootstrap_servers,
                 group_id="threads-service",
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+                value_deserializer=lambda m: decode_event(m).as_dict(),
                 auto_offset_reset="latest",  # Start from latest messages
                 enable_auto_commit=True,
             )
@@ -98,7 +98,7 @@ class KafkaConsumerService:
         """
         try:
             thread_id = data.get("thread_id")
-            message_id = data.get("id")
+            message_id = data.get("message_id")
             parent_message_id = data.get("parent_message_id")
 
             # If message has parent_message_id but no thread_id, create thread
@@ -119,7 +119,7 @@ class KafkaConsumerService:
         2. A thread reply - update thread stats
         """
         try:
-            message_id = data.get("id")
+            message_id = data.get("message_id")
             thread_id = data.get("thread_id")
 
             async with AsyncSession(async_engine) as db:
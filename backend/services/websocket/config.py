@@ -1,5 +1,8 @@
 """Configuration settings for WebSocket service."""
 
+import os
+import socket
+
 from pydantic_settings import BaseSettings
 
 
@@ -20,6 +23,70 @@ class Settings(BaseSettings):
     kafka_typing_topic: str = "typing"
     kafka_user_status_topic: str = "user_status"
     kafka_reactions_topic: str = "reactions"
+    kafka_channels_topic: str = "channels"
+    kafka_notifications_topic: str = "notifications"
+    kafka_max_batch: int = 500  # records per getmany poll
+    kafka_poll_timeout_ms: int = 100
+
+    # Dispatch: events hash by channel onto bounded worker queues, so order is
+    # kept within a channel while channels are handled in parallel
+    dispatch_workers: int = 8
+    dispatch_queue_size: int = 1000
+
+    # Typing indicators: per-user throttle, stale typer expiry and the tick at
+    # which each channel's "who is typing" snapshot is emitted
+    typing_throttle_seconds: float = 1.0
+    typing_ttl_seconds: float = 5.0
+    typing_snapshot_interval_seconds: float = 0.5
+
+    # Presence: offline is announced only after the grace period, changes are
+    # batched per tick, and explicit subscriptions are capped per session
+    presence_grace_seconds: float = 10.0
+    presence_interval_seconds: float = 1.0
+    presence_max_subscriptions: int = 500
+
+    # Channel memberships: loaded once per user on connect to auto-join rooms,
+    # then kept current from channel events
+    channel_service_url: str = "http://localhost:8003"
+    channel_service_timeout_seconds: float = 5.0
+    membership_cache_ttl_seconds: float = 300.0
+
+    # Notifications: new notifications and unread counts pushed to the
+    # recipient's sessions, batched per user per tick
+    notification_batch_interval_seconds: float = 0.25
+
+    # Reconnect catch-up: recent events kept per channel, and how long a
+    # channel's buffer outlives its last local subscriber
+    replay_buffer_size: int = 500
+    replay_retention_seconds: float = 300.0
+    replay_prune_interval_seconds: float = 30.0
+
+    # Backpressure: sessions whose transport backlog reaches the threshold are
+    # served from a bounded, coalescing queue and evicted if they stay behind
+    outbound_slow_backlog: int = 100
+    outbound_max_depth: int = 1000
+    outbound_max_lag_seconds: float = 30.0
+    outbound_check_interval_seconds: float = 0.5
+
+    # Emit cost: optional per-room micro-batching into "batch" frames, the
+    # socket.io packet serializer ("default" JSON, or "msgpack" for clients
+    # using socket.io-msgpack-parser), compression of long-polling responses
+    # above the threshold, and per-message deflate on websocket frames
+    emit_batching: bool = False
+    emit_batch_interval_seconds: float = 0.02
+    emit_batch_max_events: int = 100
+    socketio_serializer: str = "default"
+    compression_threshold: int = 1024
+    ws_per_message_deflate: bool = True
+
+    # Cluster: each node consumes every event and emits to its own sockets;
+    # sessions, rooms and presence are shared through the client manager
+    node_id: str = f"{socket.gethostname()}-{os.getpid()}"
+    client_manager: str = "memory"  # "memory" (single node) or "redis"
+    redis_url: str = "redis://localhost:6379/0"
+    redis_key_prefix: str = "ws"
+    node_heartbeat_seconds: float = 5.0
+    node_ttl_seconds: float = 30.0
 
     # JWT
     keycloak_url: str = "http://localhost:8080"
@@ -11,7 +11,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from jose import jwt
 
 from config import settings
+from services.batching import RoomBatcher
+from services.client_manager import PRESENCE_EVENT, client_manager
 from services.kafka_consumer import kafka_consumer
+from services.memberships import MembershipCache
+from services.outbound import OutboundQueues
+from services.presence import PresenceEngine
+from services.replay import ReplayBuffers
+from services.typing_indicators import TypingAggregator
+from services.user_events import NOTIFICATION_EVENTS, UserEventBatcher
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Configure logging
@@ -27,31 +35,204 @@ sio = socketio.AsyncServer(
     cors_allowed_origins=settings.cors_origins_list,
     logger=settings.debug,
     engineio_logger=settings.debug,
+    serializer=settings.socketio_serializer,
+    http_compression=True,
+    compression_threshold=settings.compression_threshold,
 )
 
-# Store user sessions: {user_id: set of session_ids}
-user_sessions = {}
-# Store channel memberships: {channel_id: set of session_ids}
-channel_rooms = {}
-# Store session metadata: {session_id: {user_id, channels}}
+# Socket.IO's default manager emits only to this node's sockets, which is what
+# we want: every node consumes every Kafka event itself. Sessions, rooms and
+# presence that other nodes need are shared through client_manager.
+
+# Store session metadata for local sockets:
+# {session_id: {user_id, username, display_name, token}}
 session_metadata = {}
 
+# Client-originated events relayed to every node through the client manager
+TYPING_BROADCAST = "typing"
+
+
+def engineio_socket(sid: str):
+    """The engine.io socket carrying a socket.io session, if still open."""
+    eio_sid = sio.manager.eio_sid_from_sid(sid, "/")
+    return sio.eio.sockets.get(eio_sid) if eio_sid else None
+
+
+def transport_backlog(sid: str) -> int:
+    """Packets handed to a session's transport but not yet written."""
+    socket = engineio_socket(sid)
+    return socket.queue.qsize() if socket else 0
+
+
+async def send_to_session(sid: str, event: str, payload: dict):
+    await sio.emit(event, payload, to=sid)
+
+
+async def evict_session(sid: str, hint: dict):
+    """Disconnect a session that fell behind, dropping its unsent packets.
+
+    The resync hint goes out ahead of the close; the client reconnects and
+    catches up through resume or a refetch.
+    """
+    socket = engineio_socket(sid)
+    if socket is None:
+        return
+    while not socket.queue.empty():
+        socket.queue.get_nowait()
+        socket.queue.task_done()
+    await sio.emit("resync", hint, to=sid)
+    await socket.close(wait=False)
+
+
+# Bounded, coalescing queues for sessions whose transport can't keep up
+outbound_queues = OutboundQueues(send_to_session, transport_backlog, evict_session)
+
+
+async def emit_room_events(room: str, events: list):
+    """Emit [event, payload] pairs to a room's local sockets in one frame.
+
+    Slow sessions get the events through their outbound queues instead.
+    """
+    members = client_manager.channel_rooms.get(room, ())
+    skip = set()
+    for event, payload in events:
+        skip.update(outbound_queues.divert(members, event, payload))
+
+    if len(events) == 1:
+        event, payload = events[0]
+        await sio.emit(event, payload, room=room, skip_sid=list(skip) or None)
+    else:
+        await sio.emit("batch", events, room=room, skip_sid=list(skip) or None)
+
+
+# Accumulates room emits per tick when emit_batching is enabled
+room_batcher = RoomBatcher(emit_room_events)
+
+
+async def emit_to_room(room: str, event: str, payload: dict):
+    """Emit to a room's local sockets, batched per tick if enabled."""
+    if settings.emit_batching:
+        await room_batcher.add(room, event, payload)
+    else:
+        await emit_room_events(room, [[event, payload]])
+
+
+async def emit_typing_snapshot(channel_id: str, snapshot: dict):
+    """Send a channel's "who is typing" list to its local sockets."""
+    await emit_to_room(f"channel:{channel_id}", "typing_snapshot", snapshot)
+
+
+# Coalesces typing events into one snapshot per channel per tick
+typing_aggregator = TypingAggregator(emit_typing_snapshot)
+
+
+async def emit_presence_diff(sid: str, diff: dict):
+    """Send one session the presence changes it should see this tick."""
+    await outbound_queues.emit_to(sid, "presence_diff", diff)
+
+
+# Debounced presence, scoped to sessions sharing a room with the user
+presence_engine = PresenceEngine(client_manager, emit_presence_diff)
+
+
+async def emit_user_events(user_id: str, events: list):
+    """Emit [event, payload] pairs to a user's local sessions in one frame.
+
+    Slow sessions get the events through their outbound queues instead.
+    """
+    sids = client_manager.user_sessions.get(user_id, set())
+    skip = set()
+    for event, payload in events:
+        skip.update(outbound_queues.divert(sids, event, payload))
+
+    frame = events[0] if len(events) == 1 else ["batch", events]
+    for sid in list(sids):
+        if sid not in skip:
+            await sio.emit(*frame, to=sid)
+
+
+# Notifications and unread counts, batched per user per tick
+user_event_batcher = UserEventBatcher(emit_user_events)
+
+# Channel memberships used to subscribe sockets to their rooms on connect
+membership_cache = MembershipCache(is_active=lambda user_id: user_id in client_manager.user_sessions)
+
+
+# Sequenced recent events per channel, replayed to reconnecting clients
+replay_buffers = ReplayBuffers(
+    is_active=lambda channel_id: client_manager.has_local_subscribers(f"channel:{channel_id}")
+)
+
+
+async def enter_channels(sid: str, channel_ids: list):
+    """Add a local socket to several channel rooms with one shared-state round trip."""
+    for channel_id in channel_ids:
+        await sio.enter_room(sid, f"channel:{channel_id}")
+        replay_buffers.mark_joined(sid, channel_id)
+    await client_manager.join_rooms(sid, [f"channel:{channel_id}" for channel_id in channel_ids])
+
+
+async def leave_channel_room(sid: str, channel_id: str):
+    """Remove a local socket from a channel room."""
+    await sio.leave_room(sid, f"channel:{channel_id}")
+    await client_manager.leave_room(sid, f"channel:{channel_id}")
+    replay_buffers.forget(sid, channel_id)
+
+
+async def emit_to_channel(channel_id: str, event: str, payload: dict):
+    """Sequence a channel event for replay and emit it to the channel's local sockets."""
+    stamped = replay_buffers.stamp(channel_id, event, payload)
+    await emit_to_room(f"channel:{channel_id}", event, stamped)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     logger.info("🚀 Starting WebSocket service...")
 
-    # Start Kafka consumer
-    await kafka_consumer.start()
+    # Join the cluster before consuming so presence and relays are ready
+    await client_manager.start()
+    client_manager.on_broadcast(handle_broadcast)
 
-    # Register Kafka handlers
-    kafka_consumer.register_handler(settings.kafka_messages_topic, handle_kafka_message)
+    # Register Kafka handlers. Channel events are only decoded and emitted
+    # when a socket on this node is in the channel's room, or was recently
+    # enough for its replay buffer to be kept.
+    kafka_consumer.set_subscription_filter(
+        lambda channel_id: client_manager.has_local_subscribers(f"channel:{channel_id}")
+        or channel_id in replay_buffers.buffers
+    )
+    kafka_consumer.register_handler(
+        settings.kafka_messages_topic, handle_kafka_message, keyed_by_channel=True
+    )
     kafka_consumer.register_handler(settings.kafka_typing_topic, handle_kafka_typing)
     kafka_consumer.register_handler(
-        settings.kafka_user_status_topic, handle_kafka_user_status
+        settings.kafka_user_status_topic, handle_kafka_user_status, channel_scoped=False
     )
     kafka_consumer.register_handler(settings.kafka_reactions_topic, handle_kafka_reaction)
+    # Membership changes matter even for channels nobody here is watching yet
+    kafka_consumer.register_handler(
+        settings.kafka_channels_topic, handle_kafka_channel_event, channel_scoped=False
+    )
+    # Notifications are keyed by recipient and only decoded for users with a
+    # session on this node
+    kafka_consumer.set_session_filter(lambda user_id: user_id in client_manager.user_sessions)
+    kafka_consumer.register_handler(
+        settings.kafka_notifications_topic,
+        handle_kafka_notification,
+        channel_scoped=False,
+        keyed_by_user=True,
+    )
+
+    # Start Kafka consumer once every topic has a handler
+    await kafka_consumer.start()
+    typing_aggregator.start()
+    presence_engine.start()
+    membership_cache.start()
+    replay_buffers.start()
+    outbound_queues.start(lambda: client_manager.session_users.keys())
+    user_event_batcher.start()
+    if settings.emit_batching:
+        room_batcher.start()
 
     logger.info("✅ WebSocket service started successfully")
 
@@ -59,7 +240,15 @@ async def lifespan(app: FastAPI):
 
     # Cleanup
     logger.info("🛑 Shutting down WebSocket service...")
+    await typing_aggregator.stop()
+    await presence_engine.stop()
+    await membership_cache.stop()
+    await replay_buffers.stop()
+    await room_batcher.stop()
+    await user_event_batcher.stop()
+    await outbound_queues.stop()
     await kafka_consumer.stop()
+    await client_manager.stop()
 
 
 # Create FastAPI app
@@ -94,29 +283,17 @@ async def handle_kafka_message(data: dict):
             logger.info(f"📤 Broadcasting new message to channel: {channel_id}")
 
             # Broadcast to all users in the channel
-            await sio.emit(
-                "new_message",
-                message_data,
-                room=f"channel:{channel_id}",
-            )
+            await emit_to_channel(channel_id, "new_message", message_data)
 
         elif event_type == "message.updated" and channel_id:
-            await sio.emit(
-                "message_updated",
-                message_data,
-                room=f"channel:{channel_id}",
-            )
+            await emit_to_channel(channel_id, "message_updated", message_data)
 
         elif event_type == "message.deleted":
             message_id = message_data.get("id")
             channel_id = message_data.get("channel_id")
             if channel_id:
                 logger.info(f"📤 Broadcasting message deletion to channel: {channel_id}")
-                await sio.emit(
-                    "message_deleted",
-                    {"message_id": message_id},
-                    room=f"channel:{channel_id}",
-                )
+                await emit_to_channel(channel_id, "message_deleted", {"message_id": message_id})
 
     except Exception as e:
         logger.error(f"Error handling Kafka message: {e}")
@@ -127,17 +304,15 @@ async def handle_kafka_typing(data: dict):
     try:
         channel_id = data.get("channel_id")
         user_id = data.get("user_id")
-        is_typing = data.get("is_typing", False)
 
-        if channel_id:
-            await sio.emit(
-                "user_typing",
-                {
-                    "channel_id": channel_id,
-                    "user_id": user_id,
-                    "is_typing": is_typing,
-                },
-                room=f"channel:{channel_id}",
+        if channel_id and user_id:
+            # Folded into the channel's next typing snapshot
+            typing_aggregator.update(
+                str(channel_id),
+                str(user_id),
+                data.get("is_typing", False),
+                username=data.get("username"),
+                display_name=data.get("display_name"),
             )
 
     except Exception as e:
@@ -150,11 +325,9 @@ async def handle_kafka_user_status(data: dict):
         user_id = data.get("user_id")
         status = data.get("status")
 
-        # Broadcast to all connected users
-        await sio.emit(
-            "user_status_change",
-            {"user_id": user_id, "status": status},
-        )
+        # Delivered in presence diffs to sessions sharing a room with the user
+        if user_id and status:
+            await presence_engine.status_changed(str(user_id), status)
 
     except Exception as e:
         logger.error(f"Error handling user status: {e}")
@@ -170,23 +343,94 @@ async def handle_kafka_reaction(data: dict):
         if channel_id:
             if event_type == "reaction.added":
                 logger.info(f"📤 Broadcasting reaction added to channel: {channel_id}")
-                await sio.emit(
-                    "reaction_added",
-                    reaction_data,
-                    room=f"channel:{channel_id}",
-                )
+                await emit_to_channel(channel_id, "reaction_added", reaction_data)
             elif event_type == "reaction.removed":
                 logger.info(f"📤 Broadcasting reaction removed from channel: {channel_id}")
-                await sio.emit(
-                    "reaction_removed",
-                    reaction_data,
-                    room=f"channel:{channel_id}",
-                )
+                await emit_to_channel(channel_id, "reaction_removed", reaction_data)
 
     except Exception as e:
         logger.error(f"Error handling reaction: {e}")
 
 
+async def handle_kafka_channel_event(data: dict):
+    """Keep membership snapshots and local rooms in step with channel membership."""
+    try:
+        event_type = data.get("event_type")
+        channel_data = data.get("data", {})
+
+        if event_type in ("member.added", "member.joined"):
+            await add_member_to_room(channel_data["user_id"], channel_data["channel_id"])
+
+        elif event_type in ("member.removed", "member.left"):
+            channel_id = channel_data["channel_id"]
+            user_id = membership_cache.channel_removed(channel_data["user_id"], channel_id)
+            for sid in list(client_manager.user_sessions.get(user_id, ())):
+                await leave_channel_room(sid, channel_id)
+
+        elif event_type == "channel.created":
+            # DMs list both members; other channels start with their creator
+            for member_id in channel_data.get("user_ids") or [channel_data.get("creator_id")]:
+                await add_member_to_room(member_id, channel_data["id"])
+
+        elif event_type == "channel.deleted":
+            channel_id = channel_data["id"]
+            membership_cache.channel_deleted(channel_id)
+            for sid in list(client_manager.channel_rooms.get(f"channel:{channel_id}", ())):
+                await leave_channel_room(sid, channel_id)
+
+    except Exception as e:
+        logger.error(f"Error handling channel event: {e}")
+
+
+async def handle_kafka_notification(data: dict):
+    """Queue a notification or unread count for the recipient's local sessions."""
+    try:
+        event = NOTIFICATION_EVENTS.get(data.get("event_type"))
+        notification_data = data.get("data", {})
+        user_id = notification_data.get("recipient_id")
+
+        if event and user_id in client_manager.user_sessions:
+            await user_event_batcher.add(user_id, event, notification_data)
+
+    except Exception as e:
+        logger.error(f"Error handling notification: {e}")
+
+
+async def abandon_session(sid: str):
+    """Undo a connect that failed part way; a rejected session never disconnects."""
+    session_metadata.pop(sid, None)
+    try:
+        await presence_engine.session_closed(sid)
+    except Exception as e:
+        logger.error(f"Error releasing session {sid}: {e}")
+    replay_buffers.forget(sid)
+    outbound_queues.discard(sid)
+
+
+async def add_member_to_room(member_id: str, channel_id: str):
+    """Subscribe a new member's local sessions to the channel's room."""
+    user_id = membership_cache.channel_added(str(member_id), str(channel_id))
+    for sid in list(client_manager.user_sessions.get(user_id, ())):
+        await enter_channels(sid, [channel_id])
+
+
+async def handle_broadcast(event: str, data: dict, origin_node: str):
+    """Deliver a cluster broadcast to this node's sockets."""
+    if event == PRESENCE_EVENT:
+        presence_engine.receive(data["changes"])
+
+    elif event == TYPING_BROADCAST:
+        # Only nodes with sockets in the channel track its typers
+        if client_manager.has_local_subscribers(f"channel:{data['channel_id']}"):
+            typing_aggregator.update(
+                data["channel_id"],
+                data["user_id"],
+                data["is_typing"],
+                username=data.get("username"),
+                display_name=data.get("display_name"),
+            )
+
+
 # Socket.IO event handlers
 @sio.event
 async def connect(sid, environ, auth):
@@ -219,30 +463,33 @@ async def connect(sid, environ, auth):
                 "user_id": user_id,
                 "username": username,
                 "display_name": display_name,
-                "channels": set(),
+                "token": token,
             }
 
-            # Add to user sessions
-            if user_id not in user_sessions:
-                user_sessions[user_id] = set()
-            user_sessions[user_id].add(sid)
+            # Register the session; the user is announced online on the next
+            # presence tick if this is their first session anywhere
+            await presence_engine.session_opened(sid, user_id)
 
-            logger.info(f"✅ User {user_id} connected with session {sid}")
+            # Subscribe to every channel the user belongs to in one go
+            try:
+                snapshot = await membership_cache.get(user_id, token)
+                await enter_channels(sid, list(snapshot.channel_ids))
+            except Exception as e:
+                # The client can still join channels one by one
+                logger.warning(f"Could not load channel memberships for {user_id}: {e}")
 
-            # Broadcast that user is now online
-            await sio.emit(
-                "user_online",
-                {"user_id": user_id, "status": "online"},
-            )
+            logger.info(f"✅ User {user_id} connected with session {sid}")
 
             return True
 
         except Exception as e:
             logger.error(f"Error decoding token: {e}")
+            await abandon_session(sid)
             return False
 
     except Exception as e:
         logger.error(f"Connection error: {e}")
+        await abandon_session(sid)
         return False
 
 
@@ -250,33 +497,15 @@ async def connect(sid, environ, auth):
 async def disconnect(sid):
     """Handle client disconnection."""
     try:
-        metadata = session_metadata.get(sid)
+        metadata = session_metadata.pop(sid, None)
         if metadata:
             user_id = metadata["user_id"]
-            channels = metadata["channels"]
-
-            # Remove from user sessions
-            if user_id in user_sessions:
-                user_sessions[user_id].discard(sid)
-                # Check if user has no more active sessions
-                if not user_sessions[user_id]:
-                    del user_sessions[user_id]
-                    # Broadcast that user is now offline
-                    await sio.emit(
-                        "user_offline",
-                        {"user_id": user_id, "status": "offline"},
-                    )
-
-            # Remove from channel rooms
-            for channel_id in channels:
-                room_key = f"channel:{channel_id}"
-                if room_key in channel_rooms:
-                    channel_rooms[room_key].discard(sid)
-                    if not channel_rooms[room_key]:
-                        del channel_rooms[room_key]
-
-            # Clean up session metadata
-            del session_metadata[sid]
+
+            # Drop the session and its rooms; if this was the user's last
+            # session anywhere they are announced offline after a grace period
+            await presence_engine.session_closed(sid)
+            replay_buffers.forget(sid)
+            outbound_queues.discard(sid)
 
             logger.info(f"👋 User {user_id} disconnected (session {sid})")
 
@@ -286,7 +515,11 @@ async def disconnect(sid):
 
 @sio.event
 async def join_channel(sid, data):
-    """Handle user joining a channel."""
+    """Handle user joining a channel.
+
+    Member channels are joined automatically on connect, so this is only
+    needed to preview a public channel the user is not a member of.
+    """
     try:
         channel_id = data.get("channel_id")
         if not channel_id:
@@ -296,16 +529,14 @@ async def join_channel(sid, data):
         if not metadata:
             return {"error": "Session not found"}
 
-        room_key = f"channel:{channel_id}"
-
-        # Add to Socket.IO room
-        await sio.enter_room(sid, room_key)
+        if not membership_cache.is_member(metadata["user_id"], channel_id):
+            if not await membership_cache.can_preview(metadata["token"], channel_id):
+                logger.warning(
+                    f"User {metadata['user_id']} denied channel {channel_id} (session {sid})"
+                )
+                return {"error": "Not a member of this channel"}
 
-        # Track in our data structures
-        metadata["channels"].add(channel_id)
-        if room_key not in channel_rooms:
-            channel_rooms[room_key] = set()
-        channel_rooms[room_key].add(sid)
+        await enter_channels(sid, [channel_id])
 
         logger.info(
             f"User {metadata['user_id']} joined channel {channel_id} (session {sid})"
@@ -330,17 +561,11 @@ async def leave_channel(sid, data):
         if not metadata:
             return {"error": "Session not found"}
 
-        room_key = f"channel:{channel_id}"
+        # Members stay subscribed; only previews are left
+        if membership_cache.is_member(metadata["user_id"], channel_id):
+            return {"status": "member", "channel_id": channel_id}
 
-        # Remove from Socket.IO room
-        await sio.leave_room(sid, room_key)
-
-        # Remove from tracking
-        metadata["channels"].discard(channel_id)
-        if room_key in channel_rooms:
-            channel_rooms[room_key].discard(sid)
-            if not channel_rooms[room_key]:
-                del channel_rooms[room_key]
+        await leave_channel_room(sid, channel_id)
 
         logger.info(
             f"User {metadata['user_id']} left channel {channel_id} (session {sid})"
@@ -353,6 +578,43 @@ async def leave_channel(sid, data):
         return {"error": str(e)}
 
 
+@sio.event
+async def resume(sid, data):
+    """Replay channel events missed while disconnected.
+
+    ``data`` is {"channels": {channel_id: {"epoch", "seq"}}} with the last
+    cursor the client saw per channel. Missed events are re-emitted to this
+    session in order; channels that can't be replayed are returned in
+    ``refresh`` for the client to refetch.
+    """
+    try:
+        cursors = (data or {}).get("channels", {})
+        if sid not in session_metadata:
+            return {"error": "Session not found"}
+
+        replayed, refresh = 0, []
+        for channel_id, cursor in cursors.items():
+            # Only channels the session is subscribed to (members and previews)
+            if f"channel:{channel_id}" not in client_manager.rooms_of(sid):
+                continue
+            events = replay_buffers.missed(
+                sid, channel_id, cursor.get("epoch"), int(cursor.get("seq", 0))
+            )
+            if events is None:
+                refresh.append(channel_id)
+                continue
+            for event, payload in events:
+                await outbound_queues.emit_to(sid, event, payload)
+            replayed += len(events)
+
+        logger.info(f"Session {sid} resumed: {replayed} events replayed, {len(refresh)} to refresh")
+        return {"status": "resumed", "replayed": replayed, "refresh": refresh}
+
+    except Exception as e:
+        logger.error(f"Error resuming session: {e}")
+        return {"error": str(e)}
+
+
 @sio.event
 async def typing(sid, data):
     """Handle typing indicator."""
@@ -364,29 +626,54 @@ async def typing(sid, data):
         if not metadata:
             return {"error": "Session not found"}
 
-        user_id = metadata["user_id"]
-        username = metadata.get("username")
-        display_name = metadata.get("display_name")
-        room_key = f"channel:{channel_id}"
+        if not channel_id:
+            return {"error": "channel_id required"}
+
+        # Keystroke-rate "still typing" events are throttled per user; the
+        # aggregators on each node coalesce the rest into snapshots
+        if not typing_aggregator.accept(channel_id, metadata["user_id"], is_typing):
+            return
 
-        # Broadcast to others in the channel
-        await sio.emit(
-            "user_typing",
+        # Relay through the cluster so room members on other nodes see it too
+        await client_manager.broadcast(
+            TYPING_BROADCAST,
             {
                 "channel_id": channel_id,
-                "user_id": user_id,
-                "username": username,
-                "display_name": display_name,
+                "user_id": metadata["user_id"],
+                "username": metadata.get("username"),
+                "display_name": metadata.get("display_name"),
                 "is_typing": is_typing,
             },
-            room=room_key,
-            skip_sid=sid,  # Don't send back to sender
         )
 
     except Exception as e:
         logger.error(f"Error handling typing: {e}")
 
 
+@sio.event
+async def subscribe_presence(sid, data):
+    """Watch presence of specific users (e.g. the DM list) beyond shared channels."""
+    try:
+        user_ids = [str(user_id) for user_id in (data or {}).get("user_ids", [])]
+        if sid not in session_metadata:
+            return {"error": "Session not found"}
+
+        statuses = await presence_engine.subscribe(sid, user_ids)
+        return {"status": "subscribed", "users": statuses}
+
+    except Exception as e:
+        logger.error(f"Error subscribing to presence: {e}")
+        return {"error": str(e)}
+
+
+@sio.event
+async def unsubscribe_presence(sid, data):
+    """Stop watching presence of specific users."""
+    user_ids = [str(user_id) for user_id in (data or {}).get("user_ids", [])]
+    presence_engine.unsubscribe(sid, user_ids)
+    return {"status": "unsubscribed"}
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -394,17 +681,19 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "websocket",
-        "connected_users": len(user_sessions),
-        "active_channels": len(channel_rooms),
+        "node_id": client_manager.node_id,
+        "connected_users": len(client_manager.user_sessions),
+        "active_channels": len(client_manager.channel_rooms),
     }
 
 
 @app.get("/online-users")
 async def get_online_users():
-    """Get list of currently online user IDs."""
+    """Get list of currently online user IDs across all nodes."""
+    online_users = await client_manager.get_online_users()
     return {
-        "online_users": list(user_sessions.keys()),
-        "count": len(user_sessions),
+        "online_users": online_users,
+        "count": len(online_users),
     }
 
 
@@ -425,4 +714,5 @@ if __name__ == "__main__":
         port=settings.port,
         reload=settings.debug,
         log_level="debug" if settings.debug else "info",
+        ws_per_message_deflate=settings.ws_per_message_deflate,
     )
@@ -0,0 +1,481 @@
+"""Cluster-wide session, room and presence state for WebSocket nodes.
+
+Every node consumes every Kafka event and emits only to its own sockets
+(socket.io's default manager is node-local). What the nodes do need to share
+is kept behind a ClientManager:
+
+- presence: which users have at least one session on any node
+- room membership: which sessions (on which node) are in which room, and
+  which rooms each user is in
+- broadcasts: events that originate on one node rather than from Kafka, such
+  as typing or presence changes, which every node delivers to its sockets
+
+RedisClientManager backs this with Redis for production.
+InMemoryClientManager keeps the same semantics in-process so that several
+nodes can share one InMemoryStore in tests.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Broadcast carrying a batch of presence changes:
+# {"changes": [{"user_id", "status", "rooms"}]} (see services.presence)
+PRESENCE_EVENT = "presence"
+
+BroadcastHandler = Callable[[str, dict, str], Awaitable[None]]
+
+
+def presence_change(user_id: str, status: str, rooms: Iterable[str]) -> dict:
+    """One entry of a PRESENCE_EVENT batch."""
+    return {"user_id": user_id, "status": status, "rooms": sorted(rooms)}
+
+
+class ClientManager(ABC):
+    """Local session/room index plus the shared state every node agrees on.
+
+    Subclasses implement the ``_store_*`` and ``_publish`` hooks; the local
+    bookkeeping lives here. Presence transitions are reported to the caller
+    (see services.presence), which decides when and to whom to announce them.
+    """
+
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        # Local state: {user_id: set of sids}, {room: set of sids}
+        self.user_sessions: Dict[str, Set[str]] = {}
+        self.channel_rooms: Dict[str, Set[str]] = {}
+        self.session_users: Dict[str, str] = {}
+        self.session_rooms: Dict[str, Set[str]] = {}
+        self._handlers: List[BroadcastHandler] = []
+
+    @abstractmethod
+    async def start(self):
+        """Connect to the shared store."""
+
+    @abstractmethod
+    async def stop(self):
+        """Release shared state owned by this node and disconnect."""
+
+    def on_broadcast(self, handler: BroadcastHandler):
+        """Register ``handler(event, data, origin_node)`` for cluster broadcasts."""
+        self._handlers.append(handler)
+
+    async def broadcast(self, event: str, data: dict):
+        """Deliver an event to every node, including this one."""
+        await self._publish(json.dumps({"event": event, "data": data, "node": self.node_id}))
+
+    async def _dispatch(self, raw: str):
+        """Hand a published broadcast to the registered handlers."""
+        message = json.loads(raw)
+        for handler in self._handlers:
+            try:
+                await handler(message["event"], message["data"], message["node"])
+            except Exception as e:
+                logger.error(f"Error handling broadcast {message['event']}: {e}")
+
+    # ------------------------------------------------------------------
+    # Sessions and rooms
+    # ------------------------------------------------------------------
+
+    async def add_session(self, sid: str, user_id: str) -> bool:
+        """Register a connected session; returns True if it is the user's first anywhere."""
+        self.session_users[sid] = user_id
+        self.session_rooms[sid] = set()
+        self.user_sessions.setdefault(user_id, set()).add(sid)
+        return await self._store_add_session(sid, user_id) == 1
+
+    async def remove_session(self, sid: str) -> Tuple[Optional[str], bool]:
+        """Forget a session; returns (user_id, True if it was the user's last anywhere)."""
+        user_id = self.session_users.pop(sid, None)
+        if user_id is None:
+            return None, False
+
+        rooms = self.session_rooms.pop(sid, set())
+        for room in rooms:
+            self._discard_local(room, sid)
+        local = self.user_sessions.get(user_id)
+        if local is not None:
+            local.discard(sid)
+            if not local:
+                del self.user_sessions[user_id]
+
+        return user_id, await self._store_remove_session(sid, user_id, rooms) == 0
+
+    async def join_room(self, sid: str, room: str):
+        """Record that a local session entered a room."""
+        await self.join_rooms(sid, [room])
+
+    async def join_rooms(self, sid: str, rooms: Iterable[str]):
+        """Record that a local session entered several rooms, in one store round trip."""
+        if sid not in self.session_rooms:
+            return
+        joined = [room for room in dict.fromkeys(rooms) if room not in self.session_rooms[sid]]
+        if not joined:
+            return
+        for room in joined:
+            self.session_rooms[sid].add(room)
+            self.channel_rooms.setdefault(room, set()).add(sid)
+        await self._store_join(sid, self.session_users[sid], joined)
+
+    async def leave_room(self, sid: str, room: str):
+        """Record that a local session left a room."""
+        if room not in self.session_rooms.get(sid, set()):
+            return
+        self.session_rooms[sid].discard(room)
+        self._discard_local(room, sid)
+        await self._store_leave(sid, self.session_users[sid], room)
+
+    def _discard_local(self, room: str, sid: str):
+        members = self.channel_rooms.get(room)
+        if members is not None:
+            members.discard(sid)
+            if not members:
+                del self.channel_rooms[room]
+
+    def has_local_subscribers(self, room: str) -> bool:
+        """Whether any socket on this node is in ``room``."""
+        return room in self.channel_rooms
+
+    def rooms_of(self, sid: str) -> Set[str]:
+        """Rooms a local session is in."""
+        return self.session_rooms.get(sid, set())
+
+    # ------------------------------------------------------------------
+    # Cluster-wide queries
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def get_online_users(self) -> List[str]:
+        """Users with at least one session on any node."""
+
+    @abstractmethod
+    async def is_online(self, user_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def online_status(self, user_ids: List[str]) -> Dict[str, bool]:
+        """Online flag for each of ``user_ids`` in one round trip."""
+
+    @abstractmethod
+    async def room_size(self, room: str) -> int:
+        """Sessions in ``room`` across all nodes."""
+
+    @abstractmethod
+    async def user_rooms(self, user_id: str) -> Set[str]:
+        """Rooms any of the user's sessions, on any node, is in."""
+
+    # ------------------------------------------------------------------
+    # Storage hooks
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def _store_add_session(self, sid: str, user_id: str) -> int:
+        """Persist a session; returns the user's session count across nodes."""
+
+    @abstractmethod
+    async def _store_remove_session(self, sid: str, user_id: str, rooms: Set[str]) -> int:
+        """Remove a session and its rooms; returns the user's remaining session count."""
+
+    @abstractmethod
+    async def _store_join(self, sid: str, user_id: str, rooms: List[str]):
+        ...
+
+    @abstractmethod
+    async def _store_leave(self, sid: str, user_id: str, room: str):
+        ...
+
+    @abstractmethod
+    async def _publish(self, raw: str):
+        ...
+
+
+# ============================================================================
+# In-memory backend
+# ============================================================================
+
+
+class InMemoryStore:
+    """Shared state for InMemoryClientManager nodes living in one process."""
+
+    def __init__(self):
+        self.presence: Dict[str, int] = {}
+        self.rooms: Dict[str, Set[str]] = {}
+        self.user_rooms: Dict[str, Dict[str, int]] = {}
+        self.nodes: List[InMemoryClientManager] = []
+
+
+class InMemoryClientManager(ClientManager):
+    """ClientManager for a single node, or several nodes in one process (tests)."""
+
+    def __init__(self, node_id: str, store: Optional[InMemoryStore] = None):
+        super().__init__(node_id)
+        self.store = store or InMemoryStore()
+
+    async def start(self):
+        self.store.nodes.append(self)
+
+    async def stop(self):
+        for sid in list(self.session_users):
+            await self.remove_session(sid)
+        if self in self.store.nodes:
+            self.store.nodes.remove(self)
+
+    async def get_online_users(self) -> List[str]:
+        return list(self.store.presence)
+
+    async def is_online(self, user_id: str) -> bool:
+        return user_id in self.store.presence
+
+    async def online_status(self, user_ids: List[str]) -> Dict[str, bool]:
+        return {user_id: user_id in self.store.presence for user_id in user_ids}
+
+    async def room_size(self, room: str) -> int:
+        return len(self.store.rooms.get(room, ()))
+
+    async def user_rooms(self, user_id: str) -> Set[str]:
+        return set(self.store.user_rooms.get(user_id, ()))
+
+    async def _store_add_session(self, sid: str, user_id: str) -> int:
+        self.store.presence[user_id] = self.store.presence.get(user_id, 0) + 1
+        return self.store.presence[user_id]
+
+    async def _store_remove_session(self, sid: str, user_id: str, rooms: Set[str]) -> int:
+        for room in rooms:
+            await self._store_leave(sid, user_id, room)
+        remaining = self.store.presence.get(user_id, 0) - 1
+        if remaining > 0:
+            self.store.presence[user_id] = remaining
+        else:
+            self.store.presence.pop(user_id, None)
+        return max(remaining, 0)
+
+    async def _store_join(self, sid: str, user_id: str, rooms: List[str]):
+        counts = self.store.user_rooms.setdefault(user_id, {})
+        for room in rooms:
+            self.store.rooms.setdefault(room, set()).add(f"{self.node_id}:{sid}")
+            counts[room] = counts.get(room, 0) + 1
+
+    async def _store_leave(self, sid: str, user_id: str, room: str):
+        members = self.store.rooms.get(room)
+        if members is not None:
+            members.discard(f"{self.node_id}:{sid}")
+            if not members:
+                del self.store.rooms[room]
+        counts = self.store.user_rooms.get(user_id, {})
+        if counts.get(room, 0) > 1:
+            counts[room] -= 1
+        else:
+            counts.pop(room, None)
+            if not counts:
+                self.store.user_rooms.pop(user_id, None)
+
+    async def _publish(self, raw: str):
+        for node in list(self.store.nodes):
+            await node._dispatch(raw)
+
+
+# ============================================================================
+# Redis backend
+# ============================================================================
+
+# Decrement a hash field, dropping it when it reaches zero
+_DECREMENT_FIELD = """
+local remaining = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+if remaining <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return 0
+end
+return remaining
+"""
+
+
+class RedisClientManager(ClientManager):
+    """ClientManager sharing state between nodes through Redis.
+
+    Keys (prefixed with ``settings.redis_key_prefix``):
+        presence                 hash user_id -> session count
+        room:{room}              set of "node:sid"
+        user:{user_id}:rooms     hash room -> sessions of the user in it
+        node:{node}:sessions     hash sid -> user_id
+        session:{node}:{sid}     set of rooms the session is in
+        nodes                    hash node_id -> last heartbeat (epoch seconds)
+        broadcast                pub/sub channel
+
+    Nodes heartbeat into ``nodes``; a node whose heartbeat is older than
+    ``settings.node_ttl_seconds`` is reaped by whichever node claims it first,
+    releasing its sessions, rooms and presence.
+    """
+
+    def __init__(self, node_id: str, redis_url: str, prefix: str):
+        super().__init__(node_id)
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.redis = None
+        self._pubsub = None
+        self._tasks: List[asyncio.Task] = []
+        self._decrement = None
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
+        await self.redis.ping()
+        self._decrement = self.redis.register_script(_DECREMENT_FIELD)
+
+        await self._heartbeat()
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self._key("broadcast"))
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        logger.info(f"✅ Redis client manager started (node {self.node_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._pubsub:
+            await self._pubsub.aclose()
+        if self.redis:
+            changes = await self._purge_node(self.node_id)
+            await self.redis.hdel(self._key("nodes"), self.node_id)
+            if changes:
+                await self.broadcast(PRESENCE_EVENT, {"changes": changes})
+            await self.redis.aclose()
+        logger.info("Redis client manager stopped")
+
+    async def get_online_users(self) -> List[str]:
+        return await self.redis.hkeys(self._key("presence"))
+
+    async def is_online(self, user_id: str) -> bool:
+        return bool(await self.redis.hexists(self._key("presence"), user_id))
+
+    async def online_status(self, user_ids: List[str]) -> Dict[str, bool]:
+        if not user_ids:
+            return {}
+        counts = await self.redis.hmget(self._key("presence"), user_ids)
+        return {
+            user_id: count is not None for user_id, count in zip(user_ids, counts, strict=True)
+        }
+
+    async def room_size(self, room: str) -> int:
+        return await self.redis.scard(self._key("room", room))
+
+    async def user_rooms(self, user_id: str) -> Set[str]:
+        return set(await self.redis.hkeys(self._key("user", user_id, "rooms")))
+
+    async def _store_add_session(self, sid: str, user_id: str) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("node", self.node_id, "sessions"), sid, user_id)
+            pipe.hincrby(self._key("presence"), user_id, 1)
+            _, sessions = await pipe.execute()
+        return sessions
+
+    async def _store_remove_session(self, sid: str, user_id: str, rooms: Set[str]) -> int:
+        await self._release_session(self.node_id, sid, user_id, rooms)
+        return await self._decrement(keys=[self._key("presence")], args=[user_id])
+
+    async def _release_session(self, node_id: str, sid: str, user_id: str, rooms: Set[str]):
+        """Remove a session from its rooms and its node's session index."""
+        member = f"{node_id}:{sid}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for room in rooms:
+                pipe.srem(self._key("room", room), member)
+            pipe.delete(self._key("session", node_id, sid))
+            pipe.hdel(self._key("node", node_id, "sessions"), sid)
+            await pipe.execute()
+        for room in rooms:
+            await self._decrement(keys=[self._key("user", user_id, "rooms")], args=[room])
+
+    async def _store_join(self, sid: str, user_id: str, rooms: List[str]):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for room in rooms:
+                pipe.sadd(self._key("room", room), f"{self.node_id}:{sid}")
+                pipe.hincrby(self._key("user", user_id, "rooms"), room, 1)
+            pipe.sadd(self._key("session", self.node_id, sid), *rooms)
+            await pipe.execute()
+
+    async def _store_leave(self, sid: str, user_id: str, room: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.srem(self._key("room", room), f"{self.node_id}:{sid}")
+            pipe.srem(self._key("session", self.node_id, sid), room)
+            await pipe.execute()
+        await self._decrement(keys=[self._key("user", user_id, "rooms")], args=[room])
+
+    async def _publish(self, raw: str):
+        await self.redis.publish(self._key("broadcast"), raw)
+
+    async def _listen(self):
+        """Dispatch broadcasts published by any node (including this one)."""
+        try:
+            async for message in self._pubsub.listen():
+                if message["type"] == "message":
+                    await self._dispatch(message["data"])
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Redis broadcast listener stopped: {e}")
+
+    async def _heartbeat(self):
+        await self.redis.hset(self._key("nodes"), self.node_id, int(time.time()))
+
+    async def _heartbeat_loop(self):
+        """Refresh this node's heartbeat and reap nodes that stopped beating."""
+        while True:
+            try:
+                await asyncio.sleep(settings.node_heartbeat_seconds)
+                await self._heartbeat()
+                await self._reap_dead_nodes()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Client manager heartbeat failed: {e}")
+
+    async def _reap_dead_nodes(self):
+        cutoff = time.time() - settings.node_ttl_seconds
+        for node_id, beat in (await self.redis.hgetall(self._key("nodes"))).items():
+            if node_id == self.node_id or float(beat) >= cutoff:
+                continue
+            # HDEL is the claim: only one live node gets 1 back and reaps
+            if not await self.redis.hdel(self._key("nodes"), node_id):
+                continue
+            changes = await self._purge_node(node_id)
+            logger.warning(f"Reaped dead websocket node {node_id} ({len(changes)} users offline)")
+            if changes:
+                # The node is long gone, so there is no grace period to honour
+                await self.broadcast(PRESENCE_EVENT, {"changes": changes})
+
+    async def _purge_node(self, node_id: str) -> List[dict]:
+        """Drop every session a node registered; returns offline presence changes."""
+        sessions = await self.redis.hgetall(self._key("node", node_id, "sessions"))
+        rooms_by_user: Dict[str, Set[str]] = {}
+        offline: Set[str] = set()
+        for sid, user_id in sessions.items():
+            rooms = await self.redis.smembers(self._key("session", node_id, sid))
+            rooms_by_user.setdefault(user_id, set()).update(rooms)
+            await self._release_session(node_id, sid, user_id, rooms)
+            if await self._decrement(keys=[self._key("presence")], args=[user_id]) == 0:
+                offline.add(user_id)
+        await self.redis.delete(self._key("node", node_id, "sessions"))
+        return [presence_change(user_id, "offline", rooms_by_user[user_id]) for user_id in offline]
+
+
+def create_client_manager() -> ClientManager:
+    """Build the manager selected by ``settings.client_manager``."""
+    if settings.client_manager == "redis":
+        return RedisClientManager(settings.node_id, settings.redis_url, settings.redis_key_prefix)
+    return InMemoryClientManager(settings.node_id)
+
+
+# Global instance
+client_manager = create_client_manager()
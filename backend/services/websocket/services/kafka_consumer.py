@@ -1,16 +1,102 @@
 """Kafka consumer service for WebSocket events."""
 
 import asyncio
-import json
 import logging
-from typing import Callable
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Set
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from prometheus_client import Counter, Gauge, Histogram
 
 from config import settings
+from shared.events.envelope import decode_event as decode_envelope
 
 logger = logging.getLogger(__name__)
 
+# Header producers set on channel-scoped events (see message/reactions producers)
+CHANNEL_HEADER = "channel_id"
+
+EVENTS_ROUTED = Counter(
+    "websocket_events_routed_total",
+    "Kafka events handed to a handler because a local socket subscribes",
+    ["topic"],
+)
+EVENTS_DROPPED = Counter(
+    "websocket_events_dropped_total",
+    "Kafka events dropped because no local socket subscribes to the channel or user",
+    ["topic", "stage"],  # stage: before_decode (header/key) or after_decode (payload)
+)
+DISPATCH_QUEUE_DEPTH = Gauge(
+    "websocket_dispatch_queue_depth",
+    "Events waiting in each dispatch worker queue",
+    ["worker"],
+)
+DISPATCH_SECONDS = Histogram(
+    "websocket_dispatch_seconds",
+    "Time a handler takes to process one event",
+    ["topic"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CONSUMER_LAG = Gauge(
+    "websocket_consumer_lag",
+    "Records between the last consumed offset and the partition high watermark",
+    ["topic", "partition"],
+)
+PARTITIONS_PAUSED = Counter(
+    "websocket_partitions_paused_total",
+    "Times a partition was paused because a dispatch queue was full",
+)
+
+
+def decode_event(raw: bytes) -> dict:
+    """Deserialize a Kafka event value, JSON or msgpack (see shared.events.envelope)."""
+    return decode_envelope(raw).as_dict()
+
+
+def payload_channel(event: dict) -> Optional[str]:
+    """Channel an already decoded event belongs to, if any."""
+    data = event.get("data")
+    channel_id = event.get("channel_id")
+    if not channel_id and isinstance(data, dict):
+        channel_id = data.get("channel_id")
+    return str(channel_id) if channel_id else None
+
+
+class TopicRoute:
+    """How a topic's events map to channels or users.
+
+    Args:
+        handler: Coroutine called with the decoded event
+        channel_scoped: Events target one channel and can be dropped when no
+            local socket is in it; False for global events (user status)
+        keyed_by_channel: The Kafka key is the channel id, so events without
+            a channel header can still be routed before decoding
+        keyed_by_user: Events target one user, whose id (the JWT subject) is
+            the Kafka key; they are dropped when the user has no local session
+    """
+
+    def __init__(
+        self,
+        handler: Callable,
+        channel_scoped: bool,
+        keyed_by_channel: bool,
+        keyed_by_user: bool = False,
+    ):
+        self.handler = handler
+        self.channel_scoped = channel_scoped
+        self.keyed_by_channel = keyed_by_channel
+        self.keyed_by_user = keyed_by_user
+
+    def record_channel(self, record) -> Optional[str]:
+        """Channel id from the record's header or key, without decoding the value."""
+        for name, value in record.headers or ():
+            if name == CHANNEL_HEADER:
+                return value.decode("utf-8")
+        if self.keyed_by_channel and record.key:
+            return record.key.decode("utf-8")
+        return None
+
 
 class KafkaConsumerService:
     """Service for consuming Kafka messages and broadcasting to WebSocket clients."""
@@ -19,29 +105,40 @@ class KafkaConsumerService:
         """Initialize the Kafka consumer service."""
         self.consumer = None
         self.running = False
-        self.handlers = {}
+        self.routes: Dict[str, TopicRoute] = {}
+        self.queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._task: Optional[asyncio.Task] = None
+        self._paused: Set[TopicPartition] = set()
+        # Whether any socket on this node listens to a channel; defaults to
+        # routing everything until the app wires in its subscription index
+        self.is_subscribed: Callable[[str], bool] = lambda channel_id: True
+        # Whether a user has a session on this node, for user-keyed topics
+        self.has_session: Callable[[str], bool] = lambda user_id: True
 
     async def start(self):
         """Start the Kafka consumer."""
         try:
             self.consumer = AIOKafkaConsumer(
-                settings.kafka_messages_topic,
-                settings.kafka_typing_topic,
-                settings.kafka_user_status_topic,
-                settings.kafka_reactions_topic,
+                # Every topic a handler was registered for
+                *self.routes,
                 bootstrap_servers=settings.kafka_bootstrap_servers,
-                group_id="websocket-service",
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+                # No consumer group: every node must see every partition to
+                # reach its own sockets. A shared group would split the
+                # partitions and clients on other nodes would miss events.
+                group_id=None,
                 auto_offset_reset="latest",
-                enable_auto_commit=True,
+                # No value_deserializer: values stay bytes so that events
+                # nobody here wants are dropped without being decoded
             )
 
             await self.consumer.start()
             logger.info("✅ Kafka consumer started successfully")
             self.running = True
 
-            # Start consuming messages
-            asyncio.create_task(self._consume_messages())
+            # Start dispatch workers, then consume messages
+            self.start_workers()
+            self._task = asyncio.create_task(self._consume_messages())
 
         except Exception as e:
             logger.error(f"❌ Failed to start Kafka consumer: {e}")
@@ -50,30 +147,169 @@ class KafkaConsumerService:
     async def stop(self):
         """Stop the Kafka consumer."""
         self.running = False
+        for task in [self._task, *self._workers]:
+            if task:
+                task.cancel()
+        self._workers = []
         if self.consumer:
             await self.consumer.stop()
             logger.info("Kafka consumer stopped")
 
-    def register_handler(self, topic: str, handler: Callable):
+    def register_handler(
+        self,
+        topic: str,
+        handler: Callable,
+        channel_scoped: bool = True,
+        keyed_by_channel: bool = False,
+        keyed_by_user: bool = False,
+    ):
         """Register a handler for a specific topic."""
-        self.handlers[topic] = handler
+        self.routes[topic] = TopicRoute(handler, channel_scoped, keyed_by_channel, keyed_by_user)
         logger.info(f"Registered handler for topic: {topic}")
 
+    def set_subscription_filter(self, is_subscribed: Callable[[str], bool]):
+        """Set the predicate deciding whether a channel has local subscribers."""
+        self.is_subscribed = is_subscribed
+
+    def set_session_filter(self, has_session: Callable[[str], bool]):
+        """Set the predicate deciding whether a user has local sessions."""
+        self.has_session = has_session
+
+    def route(self, record) -> Optional[dict]:
+        """Decode a record if a local socket wants it; None means drop it.
+
+        The channel is taken from the header or key when present so that
+        events for channels nobody on this node watches are never decoded;
+        likewise events for users without a session here on user-keyed topics.
+        """
+        topic = record.topic
+        route = self.routes.get(topic)
+        if route is None:
+            return None
+
+        if route.keyed_by_user and record.key:
+            if not self.has_session(record.key.decode("utf-8")):
+                EVENTS_DROPPED.labels(topic=topic, stage="before_decode").inc()
+                return None
+
+        channel_id = None
+        if route.channel_scoped:
+            channel_id = route.record_channel(record)
+            if channel_id is not None and not self.is_subscribed(channel_id):
+                EVENTS_DROPPED.labels(topic=topic, stage="before_decode").inc()
+                return None
+
+        event = decode_event(record.value)
+
+        if route.channel_scoped and channel_id is None:
+            # Producers that don't set the header: check after decoding, still
+            # skipping the emit
+            channel_id = payload_channel(event)
+            if channel_id is not None and not self.is_subscribed(channel_id):
+                EVENTS_DROPPED.labels(topic=topic, stage="after_decode").inc()
+                return None
+
+        EVENTS_ROUTED.labels(topic=topic).inc()
+        return event
+
+    def ordering_key(self, record, event: dict) -> str:
+        """Key events must stay ordered by: the channel, else the Kafka key."""
+        route = self.routes[record.topic]
+        channel_id = route.record_channel(record) or payload_channel(event)
+        if channel_id:
+            return channel_id
+        if record.key:
+            return record.key.decode("utf-8")
+        return f"{record.topic}:{record.partition}"
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def start_workers(self):
+        """Create the bounded worker queues and their worker tasks."""
+        self.queues = [
+            asyncio.Queue(maxsize=settings.dispatch_queue_size)
+            for _ in range(settings.dispatch_workers)
+        ]
+        self._workers = [
+            asyncio.create_task(self._worker(index, queue))
+            for index, queue in enumerate(self.queues)
+        ]
+
+    async def _worker(self, index: int, queue: asyncio.Queue):
+        """Run handlers for one queue in arrival order."""
+        depth = DISPATCH_QUEUE_DEPTH.labels(worker=str(index))
+        while True:
+            topic, event = await queue.get()
+            depth.set(queue.qsize())
+            start = time.perf_counter()
+            try:
+                await self.routes[topic].handler(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling message from {topic}: {e}")
+            finally:
+                DISPATCH_SECONDS.labels(topic=topic).observe(time.perf_counter() - start)
+                queue.task_done()
+
+    async def dispatch(self, tp: TopicPartition, records: list):
+        """Route a partition's records onto worker queues.
+
+        Events with the same ordering key always land on the same queue.
+        When that queue is full the partition is paused and rewound to the
+        record, which is fetched again once the queues drain; the rest of the
+        partition's records are left for then, so the poll loop keeps serving
+        the other partitions instead of waiting on one hot channel.
+        """
+        for record in records:
+            try:
+                event = self.route(record)
+            except ValueError as e:
+                logger.error(f"Undecodable event on {record.topic}: {e}")
+                continue
+            if event is None:
+                continue
+
+            key = self.ordering_key(record, event)
+            index = zlib.crc32(key.encode("utf-8")) % len(self.queues)
+            queue = self.queues[index]
+            if queue.full() and self.consumer:
+                self.consumer.seek(tp, record.offset)
+                self.consumer.pause(tp)
+                self._paused.add(tp)
+                PARTITIONS_PAUSED.inc()
+                logger.warning(f"Dispatch queue {index} full, pausing {tp.topic}[{tp.partition}]")
+                return
+            await queue.put((record.topic, event))
+            DISPATCH_QUEUE_DEPTH.labels(worker=str(index)).set(queue.qsize())
+
+    def _resume_drained(self):
+        """Resume paused partitions once every queue is at most half full."""
+        if self._paused and all(q.qsize() <= q.maxsize // 2 for q in self.queues):
+            self.consumer.resume(*self._paused)
+            logger.info(f"Resumed {len(self._paused)} paused partitions")
+            self._paused.clear()
+
+    def _record_lag(self, tp: TopicPartition, records: list):
+        highwater = self.consumer.highwater(tp)
+        if highwater is not None:
+            lag = highwater - (records[-1].offset + 1)
+            CONSUMER_LAG.labels(topic=tp.topic, partition=str(tp.partition)).set(lag)
+
     async def _consume_messages(self):
-        """Consume messages from Kafka and call registered handlers."""
+        """Poll Kafka in batches and hand records to the dispatch workers."""
         try:
-            async for message in self.consumer:
-                topic = message.topic
-                data = message.value
-
-                logger.debug(f"📨 Received message from topic {topic}: {data}")
-
-                # Call the registered handler for this topic
-                if topic in self.handlers:
-                    try:
-                        await self.handlers[topic](data)
-                    except Exception as e:
-                        logger.error(f"Error handling message from {topic}: {e}")
+            while self.running:
+                batches = await self.consumer.getmany(
+                    timeout_ms=settings.kafka_poll_timeout_ms,
+                    max_records=settings.kafka_max_batch,
+                )
+                for tp, records in batches.items():
+                    await self.dispatch(tp, records)
+                    self._record_lag(tp, records)
+                self._resume_drained()
 
         except asyncio.CancelledError:
             logger.info("Kafka consumer task cancelled")
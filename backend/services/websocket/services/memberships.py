@@ -0,0 +1,204 @@
+"""Cached channel membership snapshots.
+
+On connect a client is subscribed to the room of every channel it belongs
+to, so it no longer sends one ``join_channel`` per channel. The channel IDs
+come from the channel service (one indexed lookup per user) and are cached
+per node: a reconnect storm after a deploy or network blip costs at most one
+fetch per user, and concurrent connects of the same user share it.
+
+Snapshots are kept current by the membership events on the ``channels``
+topic, which every node consumes, so the TTL is only a safety net for events
+missed while the consumer was down. Snapshots of users without a session on
+this node are dropped once they are older than the TTL.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import aiohttp
+from prometheus_client import Counter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ChannelType.public as the channel service serializes it (the websocket image
+# does not ship shared.database)
+PUBLIC_CHANNEL = "PUBLIC"
+
+MEMBERSHIP_LOOKUPS = Counter(
+    "websocket_membership_lookups_total",
+    "Membership snapshot lookups on connect",
+    ["result"],  # hit, miss, error
+)
+MEMBERSHIP_UPDATES = Counter(
+    "websocket_membership_updates_total",
+    "Cached snapshots updated from channel membership events",
+    ["event"],
+)
+
+# Coroutine ``fetch(token)`` returning {"user_id": ..., "channel_ids": [...]}
+FetchSnapshot = Callable[[str], Awaitable[dict]]
+
+
+@dataclass
+class MembershipSnapshot:
+    """The channels a user belongs to."""
+
+    member_id: str  # users.id in the database; membership events carry this
+    channel_ids: Set[str]
+    fetched_at: float
+
+
+class MembershipCache:
+    """Per-node cache of membership snapshots, keyed by the JWT subject.
+
+    Args:
+        fetch: Coroutine loading a snapshot with the user's token; defaults to
+            the channel service's ``GET /channels/memberships/me``
+        ttl_seconds: Age after which a snapshot is refetched on connect
+        is_active: Whether a user has a session on this node (their snapshot
+            is then kept regardless of age)
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[FetchSnapshot] = None,
+        ttl_seconds: float = settings.membership_cache_ttl_seconds,
+        is_active: Callable[[str], bool] = lambda user_id: False,
+    ):
+        self.fetch = fetch or self._fetch_from_channel_service
+        self.ttl_seconds = ttl_seconds
+        self.is_active = is_active
+        self._snapshots: Dict[str, MembershipSnapshot] = {}
+        self._users_by_member: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    async def get(self, user_id: str, token: str, now: Optional[float] = None) -> MembershipSnapshot:
+        """The user's snapshot, fetched if missing or older than the TTL."""
+        now = time.monotonic() if now is None else now
+        cached = self._snapshots.get(user_id)
+        if cached is not None and now - cached.fetched_at < self.ttl_seconds:
+            MEMBERSHIP_LOOKUPS.labels(result="hit").inc()
+            return cached
+
+        # Several tabs reconnecting at once share one fetch
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load(user_id, token, now))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        try:
+            snapshot = await asyncio.shield(task)
+        except Exception:
+            MEMBERSHIP_LOOKUPS.labels(result="error").inc()
+            raise
+        MEMBERSHIP_LOOKUPS.labels(result="miss").inc()
+        return snapshot
+
+    async def _load(self, user_id: str, token: str, now: float) -> MembershipSnapshot:
+        data = await self.fetch(token)
+        snapshot = MembershipSnapshot(
+            member_id=str(data["user_id"]),
+            channel_ids={str(channel_id) for channel_id in data["channel_ids"]},
+            fetched_at=now,
+        )
+        self._snapshots[user_id] = snapshot
+        self._users_by_member[snapshot.member_id] = user_id
+        return snapshot
+
+    def is_member(self, user_id: str, channel_id: str) -> bool:
+        """Whether a cached snapshot lists the channel."""
+        snapshot = self._snapshots.get(user_id)
+        return snapshot is not None and channel_id in snapshot.channel_ids
+
+    # ------------------------------------------------------------------
+    # Membership events
+    # ------------------------------------------------------------------
+
+    def channel_added(self, member_id: str, channel_id: str) -> Optional[str]:
+        """Record a new membership; returns the user whose snapshot changed."""
+        user_id = self._users_by_member.get(member_id)
+        if user_id is None:
+            return None
+        self._snapshots[user_id].channel_ids.add(channel_id)
+        MEMBERSHIP_UPDATES.labels(event="added").inc()
+        return user_id
+
+    def channel_removed(self, member_id: str, channel_id: str) -> Optional[str]:
+        """Record a membership ending; returns the user whose snapshot changed."""
+        user_id = self._users_by_member.get(member_id)
+        if user_id is None:
+            return None
+        self._snapshots[user_id].channel_ids.discard(channel_id)
+        MEMBERSHIP_UPDATES.labels(event="removed").inc()
+        return user_id
+
+    def channel_deleted(self, channel_id: str):
+        """Drop a deleted channel from every snapshot."""
+        for snapshot in self._snapshots.values():
+            snapshot.channel_ids.discard(channel_id)
+        MEMBERSHIP_UPDATES.labels(event="deleted").inc()
+
+    def prune(self, now: Optional[float] = None):
+        """Drop expired snapshots of users without a session on this node."""
+        now = time.monotonic() if now is None else now
+        for user_id, snapshot in list(self._snapshots.items()):
+            if now - snapshot.fetched_at >= self.ttl_seconds and not self.is_active(user_id):
+                del self._snapshots[user_id]
+                self._users_by_member.pop(snapshot.member_id, None)
+
+    # ------------------------------------------------------------------
+    # Channel service
+    # ------------------------------------------------------------------
+
+    async def _get_json(self, token: str, path: str) -> dict:
+        if self._http is None:
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=settings.channel_service_timeout_seconds)
+            )
+        async with self._http.get(
+            f"{settings.channel_service_url}{path}",
+            headers={"Authorization": f"Bearer {token}"},
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _fetch_from_channel_service(self, token: str) -> dict:
+        return await self._get_json(token, "/channels/memberships/me")
+
+    async def can_preview(self, token: str, channel_id: str) -> bool:
+        """Whether a non-member may watch a channel: only public channels qualify."""
+        channel = await self._get_json(token, f"/channels/{channel_id}")
+        return bool(channel.get("is_member")) or channel.get("channel_type") == PUBLIC_CHANNEL
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ttl_seconds)
+            self.prune()
+
+    def start(self):
+        """Start periodic pruning of expired snapshots."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop pruning and close the HTTP session."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._http:
+            await self._http.close()
+            self._http = None
@@ -0,0 +1,238 @@
+"""Per-session outbound queues with backpressure for slow clients.
+
+socket.io hands every emit straight to the session's engine.io queue, which
+is unbounded: a client on a slow link just accumulates packets in memory.
+The OutboundQueues watch each local session's transport backlog. A session
+whose backlog passes ``outbound_slow_backlog`` is marked slow, and its events
+are diverted from room emits (``skip_sid``) into a bounded queue of its own.
+That queue is fed to the transport only as fast as the client drains it.
+
+While queued, events are coalesced per type:
+
+- ``typing_snapshot``: only the latest snapshot per channel is kept
+- ``presence_diff``: pending diffs are merged, the latest status per user wins
+- ``unread_count_changed``: only the latest count is kept
+- everything else (messages, reactions, ...) is kept in order and never dropped
+
+A session still behind after ``outbound_max_lag_seconds``, or whose queue
+overflows ``outbound_max_depth``, has its backlog dropped and is sent a
+``resync`` hint and disconnected. The client then reconnects and catches up
+through the replay buffers (see services.replay) or a refetch, instead of
+holding the node's memory.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Awaitable,
+    Callable,
+    Collection,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = Histogram(
+    "websocket_session_queue_depth",
+    "Per-session outbound depth sampled every check (transport backlog plus queued events)",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+SLOW_SESSIONS = Gauge(
+    "websocket_slow_sessions",
+    "Sessions currently served from a bounded outbound queue",
+)
+COALESCED_EVENTS = Counter(
+    "websocket_coalesced_events_total",
+    "Queued events replaced or merged by a newer one",
+    ["event"],
+)
+SLOW_DISCONNECTS = Counter(
+    "websocket_slow_disconnects_total",
+    "Sessions disconnected with a resync hint for falling behind",
+    ["reason"],  # lag, depth
+)
+
+Send = Callable[[str, str, dict], Awaitable[None]]
+# Coroutine ``disconnect(sid, hint)`` dropping the backlog, sending the hint and closing
+Disconnect = Callable[[str, dict], Awaitable[None]]
+
+
+def _merge_presence(queued: dict, newer: dict) -> dict:
+    return {"users": {**queued["users"], **newer["users"]}}
+
+
+def _replace(queued: dict, newer: dict) -> dict:
+    return newer
+
+
+# event -> (coalescing key of a payload, how a newer payload folds into a queued one)
+COALESCE_POLICIES: Dict[str, Tuple[Callable[[dict], str], Callable[[dict, dict], dict]]] = {
+    "typing_snapshot": (lambda payload: payload["channel_id"], _replace),
+    "presence_diff": (lambda payload: "", _merge_presence),
+    "unread_count_changed": (lambda payload: "", _replace),
+}
+
+
+class SessionQueue:
+    """Events waiting for one slow session, coalesced per COALESCE_POLICIES."""
+
+    def __init__(self, since: float):
+        self.since = since
+        self.entries: Deque[List] = deque()  # [event, payload]
+        self._coalescable: Dict[Tuple[str, str], List] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, event: str, payload: dict):
+        policy = COALESCE_POLICIES.get(event)
+        if policy is None:
+            self.entries.append([event, payload])
+            return
+        key_of, fold = policy
+        key = (event, key_of(payload))
+        queued = self._coalescable.get(key)
+        if queued is not None:
+            queued[1] = fold(queued[1], payload)
+            COALESCED_EVENTS.labels(event=event).inc()
+            return
+        entry = [event, payload]
+        self._coalescable[key] = entry
+        self.entries.append(entry)
+
+    def get(self) -> Tuple[str, dict]:
+        event, payload = self.entries.popleft()
+        policy = COALESCE_POLICIES.get(event)
+        if policy is not None:
+            self._coalescable.pop((event, policy[0](payload)), None)
+        return event, payload
+
+
+class OutboundQueues:
+    """Backpressure for the sessions on this node.
+
+    Args:
+        send: Coroutine ``send(sid, event, payload)`` emitting to one session
+        backlog: Packets waiting in a session's transport
+        disconnect: Coroutine evicting a session with a resync hint
+        slow_backlog: Transport backlog at which a session is marked slow
+        max_depth: Queued events at which a slow session is disconnected
+        max_lag_seconds: How long a session may stay slow before it is disconnected
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        backlog: Callable[[str], int],
+        disconnect: Disconnect,
+        slow_backlog: int = settings.outbound_slow_backlog,
+        max_depth: int = settings.outbound_max_depth,
+        max_lag_seconds: float = settings.outbound_max_lag_seconds,
+    ):
+        self.send = send
+        self.backlog = backlog
+        self.disconnect = disconnect
+        self.slow_backlog = slow_backlog
+        self.max_depth = max_depth
+        self.max_lag_seconds = max_lag_seconds
+        self.slow: Dict[str, SessionQueue] = {}
+        self._overflowed: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def divert(self, sids: Collection[str], event: str, payload: dict) -> List[str]:
+        """Queue an event for the slow sessions among ``sids``; returns them to skip."""
+        if not self.slow:
+            return []
+        # Scan whichever side is smaller: usually a handful of slow sessions
+        if len(self.slow) < len(sids):
+            diverted = [sid for sid in self.slow if sid in sids]
+        else:
+            diverted = [sid for sid in sids if sid in self.slow]
+        for sid in diverted:
+            queue = self.slow[sid]
+            if len(queue) < self.max_depth:
+                queue.put(event, payload)
+            else:
+                # Evicted on the next check; it resyncs rather than grow further
+                self._overflowed.add(sid)
+        return diverted
+
+    async def emit_to(self, sid: str, event: str, payload: dict):
+        """Emit to one session, through its queue if it is slow."""
+        if not self.divert({sid}, event, payload):
+            await self.send(sid, event, payload)
+
+    def discard(self, sid: str):
+        """Forget a disconnected session."""
+        self._overflowed.discard(sid)
+        if self.slow.pop(sid, None) is not None:
+            SLOW_SESSIONS.set(len(self.slow))
+
+    async def check(self, sids: Iterable[str], now: Optional[float] = None):
+        """Sample depths, mark slow sessions, drain queues and evict stragglers."""
+        now = time.monotonic() if now is None else now
+        evicted = set(self._overflowed)
+        for sid in evicted:
+            await self._evict(sid, "depth")
+
+        for sid in list(sids):
+            if sid in evicted:
+                continue
+            backlog = self.backlog(sid)
+            queue = self.slow.get(sid)
+            QUEUE_DEPTH.observe(backlog + (len(queue) if queue is not None else 0))
+
+            if queue is None:
+                if backlog >= self.slow_backlog:
+                    self.slow[sid] = SessionQueue(since=now)
+                continue
+
+            # Refill the transport up to the threshold, then see if it caught up
+            while queue and backlog < self.slow_backlog:
+                event, payload = queue.get()
+                await self.send(sid, event, payload)
+                backlog += 1
+            if not queue and self.backlog(sid) < self.slow_backlog:
+                del self.slow[sid]
+            elif now - queue.since >= self.max_lag_seconds:
+                await self._evict(sid, "lag")
+        SLOW_SESSIONS.set(len(self.slow))
+
+    async def _evict(self, sid: str, reason: str):
+        logger.warning(f"🐢 Disconnecting slow session {sid} ({reason}), client should resync")
+        SLOW_DISCONNECTS.labels(reason=reason).inc()
+        self.discard(sid)
+        try:
+            await self.disconnect(sid, {"reason": "slow_consumer"})
+        except Exception as e:
+            logger.error(f"Error disconnecting slow session {sid}: {e}")
+
+    async def _run(self, sessions: Callable[[], Iterable[str]]):
+        while True:
+            await asyncio.sleep(settings.outbound_check_interval_seconds)
+            try:
+                await self.check(sessions())
+            except Exception as e:
+                logger.error(f"Outbound queue check failed: {e}")
+
+    def start(self, sessions: Callable[[], Iterable[str]]):
+        """Start checking the sessions returned by ``sessions()``."""
+        self._task = asyncio.create_task(self._run(sessions))
+
+    async def stop(self):
+        """Stop checking."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
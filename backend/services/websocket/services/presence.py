@@ -0,0 +1,221 @@
+"""Scoped, debounced presence.
+
+Presence used to be emitted to every connected socket on every connect and
+disconnect. The PresenceEngine instead:
+
+- debounces: a user whose last session closes is only announced offline
+  after ``presence_grace_seconds``, so a reconnect within the grace period
+  (page reload, network blip, deploy) produces no events at all
+- scopes: a change is delivered only to sessions that share a room (channel
+  or DM) with the user, plus sessions that explicitly subscribed to them
+- batches: each node publishes its changes once per tick, and each session
+  receives at most one ``presence_diff`` per tick with the latest status of
+  every user that changed
+
+Transitions are detected on the node owning the session; every node then
+resolves the audience among its own sockets.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+from config import settings
+from services.client_manager import PRESENCE_EVENT, ClientManager, presence_change
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_CHANGES = Counter(
+    "websocket_presence_changes_total",
+    "Presence changes announced to the cluster",
+    ["status"],
+)
+PRESENCE_FLAPS = Counter(
+    "websocket_presence_flaps_total",
+    "Offline transitions cancelled by a reconnect within the grace period",
+)
+PRESENCE_DIFFS = Counter(
+    "websocket_presence_diffs_total",
+    "presence_diff emits to individual sessions",
+)
+
+EmitDiff = Callable[[str, dict], Awaitable[None]]
+
+
+class PresenceEngine:
+    """Presence transitions, audiences and per-session diff batching.
+
+    Args:
+        manager: Cluster client manager holding sessions and rooms
+        emit: Coroutine ``emit(sid, diff)`` sending a presence_diff to one socket
+        grace_seconds: Delay before announcing a user offline
+        interval_seconds: Tick at which changes are published and diffs sent
+    """
+
+    def __init__(
+        self,
+        manager: ClientManager,
+        emit: EmitDiff,
+        grace_seconds: float = settings.presence_grace_seconds,
+        interval_seconds: float = settings.presence_interval_seconds,
+    ):
+        self.manager = manager
+        self.emit = emit
+        self.grace_seconds = grace_seconds
+        self.interval_seconds = interval_seconds
+        # Origin side: transitions of users whose sessions live on this node
+        self._pending_online: Set[str] = set()
+        self._pending_offline: Dict[str, Tuple[float, Set[str]]] = {}
+        # Delivery side: explicit subscriptions and per-session diffs
+        self._watchers: Dict[str, Set[str]] = {}
+        self._subscriptions: Dict[str, Set[str]] = {}
+        self._outbox: Dict[str, Dict[str, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Sessions (origin side)
+    # ------------------------------------------------------------------
+
+    async def session_opened(self, sid: str, user_id: str):
+        """Register a session and queue an online change if the user was offline."""
+        first_session = await self.manager.add_session(sid, user_id)
+        if user_id in self._pending_offline:
+            # Reconnected within the grace period: nobody was told they left
+            del self._pending_offline[user_id]
+            PRESENCE_FLAPS.inc()
+        elif first_session:
+            self._pending_online.add(user_id)
+
+    async def session_closed(self, sid: str, now: Optional[float] = None) -> Optional[str]:
+        """Drop a session; its user is announced offline after the grace period."""
+        now = time.monotonic() if now is None else now
+        rooms = set(self.manager.rooms_of(sid))
+        user_id, last_session = await self.manager.remove_session(sid)
+        self.unsubscribe(sid)
+        self._outbox.pop(sid, None)
+
+        if user_id and last_session:
+            if user_id in self._pending_online:
+                # Came and went within one tick; never announced either way
+                self._pending_online.discard(user_id)
+            else:
+                self._pending_offline[user_id] = (now + self.grace_seconds, rooms)
+        return user_id
+
+    async def publish_due(self, now: Optional[float] = None):
+        """Announce this node's pending transitions to the cluster in one broadcast."""
+        now = time.monotonic() if now is None else now
+        changes = []
+
+        pending, self._pending_online = self._pending_online, set()
+        for user_id in pending:
+            # Resolved at publish time so rooms joined right after connecting count
+            rooms = await self.manager.user_rooms(user_id)
+            changes.append(presence_change(user_id, "online", rooms))
+
+        due = [user_id for user_id, (at, _) in self._pending_offline.items() if at <= now]
+        if due:
+            online = await self.manager.online_status(due)
+            for user_id in due:
+                _, rooms = self._pending_offline.pop(user_id)
+                # Reconnected on another node within the grace period
+                if not online[user_id]:
+                    changes.append(presence_change(user_id, "offline", rooms))
+
+        if changes:
+            for change in changes:
+                PRESENCE_CHANGES.labels(status=change["status"]).inc()
+            await self.manager.broadcast(PRESENCE_EVENT, {"changes": changes})
+
+    # ------------------------------------------------------------------
+    # Delivery (every node)
+    # ------------------------------------------------------------------
+
+    def receive(self, changes: Iterable[dict]):
+        """Queue changes for the local sessions that should see them."""
+        for change in changes:
+            user_id = change["user_id"]
+            audience = set(self._watchers.get(user_id, ()))
+            for room in change["rooms"]:
+                audience.update(self.manager.channel_rooms.get(room, ()))
+            for sid in audience:
+                if self.manager.session_users.get(sid) != user_id:
+                    # Later changes in the same tick overwrite earlier ones
+                    self._outbox.setdefault(sid, {})[user_id] = change["status"]
+
+    async def status_changed(self, user_id: str, status: str):
+        """Deliver a status change (away, busy, ...) published on Kafka.
+
+        Every node consumes the event, so each only resolves its own audience.
+        """
+        rooms = await self.manager.user_rooms(user_id)
+        self.receive([presence_change(user_id, status, rooms)])
+
+    async def flush_diffs(self):
+        """Send each session one presence_diff with everything that changed."""
+        outbox, self._outbox = self._outbox, {}
+        for sid, users in outbox.items():
+            try:
+                await self.emit(sid, {"users": users})
+                PRESENCE_DIFFS.inc()
+            except Exception as e:
+                logger.error(f"Error emitting presence diff to {sid}: {e}")
+
+    # ------------------------------------------------------------------
+    # Explicit subscriptions
+    # ------------------------------------------------------------------
+
+    async def subscribe(self, sid: str, user_ids: List[str]) -> Dict[str, str]:
+        """Watch users regardless of shared rooms; returns their current status."""
+        current = self._subscriptions.setdefault(sid, set())
+        capacity = settings.presence_max_subscriptions - len(current)
+        added = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in current]
+        for user_id in added[:capacity]:
+            current.add(user_id)
+            self._watchers.setdefault(user_id, set()).add(sid)
+
+        online = await self.manager.online_status([u for u in user_ids if u in current])
+        return {user_id: "online" if flag else "offline" for user_id, flag in online.items()}
+
+    def unsubscribe(self, sid: str, user_ids: Optional[List[str]] = None):
+        """Stop watching some (or, by default, all) users."""
+        current = self._subscriptions.get(sid, set())
+        for user_id in list(current) if user_ids is None else user_ids:
+            current.discard(user_id)
+            watchers = self._watchers.get(user_id)
+            if watchers is not None:
+                watchers.discard(sid)
+                if not watchers:
+                    del self._watchers[user_id]
+        if not current:
+            self._subscriptions.pop(sid, None)
+
+    # ------------------------------------------------------------------
+    # Tick
+    # ------------------------------------------------------------------
+
+    async def flush(self):
+        """Publish due transitions, then send queued diffs."""
+        await self.publish_due()
+        await self.flush_diffs()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Presence tick failed: {e}")
+
+    def start(self):
+        """Start the presence tick."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the presence tick."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,163 @@
+"""Per-channel sequence numbers and replay buffers for reconnect catch-up.
+
+Every channel event a node emits (new, updated and deleted messages,
+reactions) is stamped with the channel's ``epoch`` and a ``seq`` that grows
+by one per event, and kept in a bounded ring buffer. A reconnecting client
+sends the last cursor it saw per channel and receives only the events it
+missed, instead of refetching every open channel over REST. When the gap can
+no longer be filled, because the buffer wrapped, the buffer was recreated
+(new epoch) or the cursor came from another node, the channel is reported
+for a full refresh.
+
+Each session remembers the channel head at the moment it (re)joined the
+room. Events after that were delivered live, so a replay covers exactly the
+cursor up to that head and never duplicates them.
+
+Buffers outlive their last local subscriber by ``replay_retention_seconds``
+so that clients dropping off a node can still catch up when they return.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_EVENTS = Counter(
+    "websocket_replayed_events_total",
+    "Channel events replayed to reconnecting sessions",
+)
+REPLAY_REFRESHES = Counter(
+    "websocket_replay_refreshes_total",
+    "Channels a reconnecting session was told to refetch",
+    ["reason"],  # epoch, gap
+)
+REPLAY_BUFFERS = Gauge(
+    "websocket_replay_buffers",
+    "Channels with a replay buffer on this node",
+)
+
+# (socket.io event name, stamped payload)
+BufferedEvent = Tuple[str, dict]
+
+
+@dataclass
+class ChannelBuffer:
+    """The most recent events of one channel."""
+
+    epoch: str
+    capacity: int
+    seq: int = 0
+    events: Deque[Tuple[int, BufferedEvent]] = field(default_factory=deque)
+    last_active: float = 0.0
+
+    def append(self, event: str, payload: dict) -> dict:
+        self.seq += 1
+        stamped = {**payload, "epoch": self.epoch, "seq": self.seq}
+        self.events.append((self.seq, (event, stamped)))
+        if len(self.events) > self.capacity:
+            self.events.popleft()
+        return stamped
+
+    def between(self, after: int, until: int) -> Optional[List[BufferedEvent]]:
+        """Events with ``after < seq <= until``; None if some were already evicted."""
+        oldest = self.events[0][0] if self.events else self.seq + 1
+        if after + 1 < oldest and after < until:
+            return None
+        return [event for seq, event in self.events if after < seq <= until]
+
+
+class ReplayBuffers:
+    """Replay buffers for the channels this node emits to.
+
+    Args:
+        capacity: Events kept per channel
+        retention_seconds: How long a buffer outlives the channel's last
+            local subscriber
+        is_active: Whether a channel still has local subscribers
+    """
+
+    def __init__(
+        self,
+        capacity: int = settings.replay_buffer_size,
+        retention_seconds: float = settings.replay_retention_seconds,
+        is_active: Callable[[str], bool] = lambda channel_id: False,
+    ):
+        self.capacity = capacity
+        self.retention_seconds = retention_seconds
+        self.is_active = is_active
+        self.buffers: Dict[str, ChannelBuffer] = {}
+        self._joined_at: Dict[str, Dict[str, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _buffer(self, channel_id: str, now: float) -> ChannelBuffer:
+        buffer = self.buffers.get(channel_id)
+        if buffer is None:
+            buffer = ChannelBuffer(uuid.uuid4().hex[:12], self.capacity, last_active=now)
+            self.buffers[channel_id] = buffer
+            REPLAY_BUFFERS.set(len(self.buffers))
+        return buffer
+
+    def stamp(self, channel_id: str, event: str, payload: dict, now: Optional[float] = None) -> dict:
+        """Sequence an event for a channel and keep it for replay."""
+        now = time.monotonic() if now is None else now
+        return self._buffer(channel_id, now).append(event, {**payload, "channel_id": channel_id})
+
+    def mark_joined(self, sid: str, channel_id: str, now: Optional[float] = None):
+        """Record the channel head when a session enters its room."""
+        now = time.monotonic() if now is None else now
+        self._joined_at.setdefault(sid, {})[channel_id] = self._buffer(channel_id, now).seq
+
+    def forget(self, sid: str, channel_id: Optional[str] = None):
+        """Drop a session's join heads (all of them by default)."""
+        if channel_id is None:
+            self._joined_at.pop(sid, None)
+        else:
+            self._joined_at.get(sid, {}).pop(channel_id, None)
+
+    def missed(self, sid: str, channel_id: str, epoch: str, seq: int) -> Optional[List[BufferedEvent]]:
+        """Events a session missed before rejoining; None means refetch the channel."""
+        buffer = self.buffers.get(channel_id)
+        joined_at = self._joined_at.get(sid, {}).get(channel_id)
+        if buffer is None or joined_at is None or buffer.epoch != epoch:
+            REPLAY_REFRESHES.labels(reason="epoch").inc()
+            return None
+        events = buffer.between(seq, joined_at)
+        if events is None:
+            REPLAY_REFRESHES.labels(reason="gap").inc()
+            return None
+        REPLAYED_EVENTS.inc(len(events))
+        return events
+
+    def prune(self, now: Optional[float] = None):
+        """Drop buffers whose channel has had no local subscriber for the retention period."""
+        now = time.monotonic() if now is None else now
+        for channel_id, buffer in list(self.buffers.items()):
+            if self.is_active(channel_id):
+                buffer.last_active = now
+            elif now - buffer.last_active >= self.retention_seconds:
+                del self.buffers[channel_id]
+        REPLAY_BUFFERS.set(len(self.buffers))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.replay_prune_interval_seconds)
+            self.prune()
+
+    def start(self):
+        """Start periodic pruning of idle buffers."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop pruning."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,179 @@
+"""Coalesced typing indicators.
+
+Clients send ``typing`` on every keystroke. Instead of fanning each one out to
+the room, every node keeps the set of users typing in each channel it has
+sockets for and, once per tick, emits a single ``typing_snapshot`` with the
+full "who is typing" list for channels whose set changed. Typers that stop
+refreshing expire after a TTL, so a client that disconnects mid-sentence
+doesn't leave a stuck indicator.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TYPING_THROTTLED = Counter(
+    "websocket_typing_throttled_total",
+    "Client typing events dropped by the per-user throttle",
+)
+TYPING_SNAPSHOTS = Counter(
+    "websocket_typing_snapshots_total",
+    "typing_snapshot emits (one per changed channel per tick)",
+)
+
+EmitSnapshot = Callable[[str, dict], Awaitable[None]]
+
+
+@dataclass
+class Typer:
+    """A user currently typing in a channel."""
+
+    user_id: str
+    username: Optional[str]
+    display_name: Optional[str]
+    expires_at: float
+
+
+class TypingAggregator:
+    """Per-channel typing state with throttling, coalescing and expiry.
+
+    Args:
+        emit: Coroutine ``emit(channel_id, snapshot)`` delivering a snapshot
+            to the channel's local sockets
+        throttle_seconds: Minimum gap between relayed "is typing" events per
+            user and channel
+        ttl_seconds: How long a typer stays listed without a refresh
+        interval_seconds: Snapshot tick
+    """
+
+    def __init__(
+        self,
+        emit: EmitSnapshot,
+        throttle_seconds: float = settings.typing_throttle_seconds,
+        ttl_seconds: float = settings.typing_ttl_seconds,
+        interval_seconds: float = settings.typing_snapshot_interval_seconds,
+    ):
+        self.emit = emit
+        self.throttle_seconds = throttle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.channels: Dict[str, Dict[str, Typer]] = {}
+        self.dirty: Set[str] = set()
+        self._last_accepted: Dict[Tuple[str, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def accept(
+        self, channel_id: str, user_id: str, is_typing: bool, now: Optional[float] = None
+    ) -> bool:
+        """Throttle a client event before it is relayed; stops always pass."""
+        now = time.monotonic() if now is None else now
+        key = (channel_id, user_id)
+        if not is_typing:
+            self._last_accepted.pop(key, None)
+            return True
+        last = self._last_accepted.get(key)
+        if last is not None and now - last < self.throttle_seconds:
+            TYPING_THROTTLED.inc()
+            return False
+        self._last_accepted[key] = now
+        return True
+
+    def update(
+        self,
+        channel_id: str,
+        user_id: str,
+        is_typing: bool,
+        username: Optional[str] = None,
+        display_name: Optional[str] = None,
+        now: Optional[float] = None,
+    ):
+        """Apply a typing event; the channel is re-emitted only if its typer set changed."""
+        now = time.monotonic() if now is None else now
+        typers = self.channels.setdefault(channel_id, {})
+
+        if is_typing:
+            typer = typers.get(user_id)
+            if typer is None:
+                typers[user_id] = Typer(user_id, username, display_name, now + self.ttl_seconds)
+                self.dirty.add(channel_id)
+            else:
+                typer.expires_at = now + self.ttl_seconds
+        elif typers.pop(user_id, None) is not None:
+            self.dirty.add(channel_id)
+
+        if not typers:
+            del self.channels[channel_id]
+
+    def expire(self, now: Optional[float] = None):
+        """Drop typers whose TTL passed without a refresh."""
+        now = time.monotonic() if now is None else now
+        for channel_id in list(self.channels):
+            typers = self.channels[channel_id]
+            stale = [user_id for user_id, typer in typers.items() if typer.expires_at <= now]
+            for user_id in stale:
+                del typers[user_id]
+            if stale:
+                self.dirty.add(channel_id)
+            if not typers:
+                del self.channels[channel_id]
+
+        cutoff = now - self.ttl_seconds
+        for key in [key for key, at in self._last_accepted.items() if at < cutoff]:
+            del self._last_accepted[key]
+
+    def snapshots(self) -> List[Tuple[str, dict]]:
+        """Snapshots for every changed channel, clearing the changed set."""
+        result = []
+        for channel_id in self.dirty:
+            typers = self.channels.get(channel_id, {})
+            result.append(
+                (
+                    channel_id,
+                    {
+                        "channel_id": channel_id,
+                        "typers": [
+                            {
+                                "user_id": typer.user_id,
+                                "username": typer.username,
+                                "display_name": typer.display_name,
+                            }
+                            for typer in typers.values()
+                        ],
+                    },
+                )
+            )
+        self.dirty.clear()
+        return result
+
+    async def flush(self):
+        """Expire stale typers and emit one snapshot per changed channel."""
+        self.expire()
+        for channel_id, snapshot in self.snapshots():
+            try:
+                await self.emit(channel_id, snapshot)
+                TYPING_SNAPSHOTS.inc()
+            except Exception as e:
+                logger.error(f"Error emitting typing snapshot for {channel_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.flush()
+
+    def start(self):
+        """Start the snapshot tick."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the snapshot tick."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
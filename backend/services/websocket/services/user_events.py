@@ -0,0 +1,53 @@
+"""Notifications pushed to a user's sessions.
+
+The notifications service publishes ``notification.created`` and
+``unread_count.changed`` on the notifications topic, keyed by the recipient's
+JWT subject, so clients no longer poll for them. Events for users without a
+session on this node are dropped before decoding (see
+``TopicRoute.keyed_by_user``); the rest are accumulated per user and
+delivered to each of the user's sessions once per tick, as a single event or
+a ``batch`` frame like room emits.
+
+Only the latest unread count of a tick is worth sending: a burst of
+notifications costs each session one frame with the new notifications and
+one count.
+"""
+
+from config import settings
+from services.batching import EmitBatch, RoomBatcher
+
+# Notification event types -> client event names
+NOTIFICATION_EVENTS = {
+    "notification.created": "notification_created",
+    "unread_count.changed": "unread_count_changed",
+}
+
+# Client events of which only the latest pending one is delivered
+LATEST_ONLY = {"unread_count_changed"}
+
+
+class UserEventBatcher(RoomBatcher):
+    """Accumulates events per user, keeping only the latest of LATEST_ONLY events.
+
+    Args:
+        emit: Coroutine ``emit(user_id, events)`` delivering a user's batch
+        interval_seconds: Tick between flushes
+        max_events: Pending events at which a user is flushed early
+    """
+
+    def __init__(
+        self,
+        emit: EmitBatch,
+        interval_seconds: float = settings.notification_batch_interval_seconds,
+        max_events: int = settings.emit_batch_max_events,
+    ):
+        super().__init__(emit, interval_seconds, max_events)
+
+    async def add(self, user_id: str, event: str, payload: dict):
+        """Queue an event for the user's next frame."""
+        if event in LATEST_ONLY and user_id in self.pending:
+            # Superseded: the newer one goes at the end, after the notifications it counts
+            self.pending[user_id] = [
+                pending for pending in self.pending[user_id] if pending[0] != event
+            ]
+        await super().add(user_id, event, payload)
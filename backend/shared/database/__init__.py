@@ -5,14 +5,27 @@ This package provides:
 - Database session management
 - Common models used across services
 - Timestamp mixins
+- SQLAlchemy query and connection pool instrumentation
+- Per-endpoint query budgets
 """
 
 from shared.database.base import Base, TimestampMixin, close_db, get_db, init_db
+from shared.database.instrumentation import (
+    DatabaseMetricsMiddleware,
+    QueryBudgetExceeded,
+    QueryStats,
+    count_queries,
+    get_current_stats,
+    get_slow_query_samples,
+    instrument_engine,
+    query_budget,
+)
 from shared.database.models import (
     AuditLog,
     Channel,
     ChannelMember,
     ChannelType,
+    EventOutbox,
     File,
     Message,
     MessageAttachment,
@@ -36,6 +49,16 @@ __all__ = [
     "init_db",
     "get_db",
     "close_db",
+    # Instrumentation
+    "DatabaseMetricsMiddleware",
+    "QueryStats",
+    "instrument_engine",
+    "get_current_stats",
+    "get_slow_query_samples",
+    # Query budgets
+    "query_budget",
+    "count_queries",
+    "QueryBudgetExceeded",
     # Enums
     "UserStatus",
     "UserRole",
@@ -62,4 +85,6 @@ __all__ = [
     # Notification models
     "Notification",
     "NotificationPreference",
+    # Event models
+    "EventOutbox",
 ]
@@ -0,0 +1,398 @@
+"""SQLAlchemy instrumentation for Colink services.
+
+This module provides:
+- Engine event hooks that time every statement
+- Per-request query count and database time, labelled by route
+- Connection pool checkout wait time and saturation
+- Slow-query counting and a bounded buffer of recent slow-query samples
+- Per-endpoint query budgets and a query-counting context manager for tests
+
+All metrics are registered on the default Prometheus registry, so they are
+exported by the existing ``/metrics`` endpoint of every service.
+
+Usage:
+    init_db(settings.database_url)            # instruments the engine
+    app.add_middleware(DatabaseMetricsMiddleware)
+
+    @router.get("/channels")
+    @query_budget(5)                          # max statements per request
+    async def list_user_channels(...): ...
+"""
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from fastapi import Request, Response
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are counted and sampled (seconds)
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.5
+
+# Number of slow-query samples kept in memory
+SLOW_QUERY_SAMPLE_SIZE = 50
+
+# Maximum statement length stored in a slow-query sample
+MAX_SAMPLE_STATEMENT_LENGTH = 1000
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of individual SQL statements",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed per HTTP request",
+    ["method", "handler"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total time spent in SQL statements per HTTP request",
+    ["method", "handler"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "SQL statements slower than the slow-query threshold",
+    ["operation", "handler"],
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+DB_POOL_SATURATION = Histogram(
+    "db_pool_saturation_ratio",
+    "Fraction of pool capacity (pool_size + max_overflow) in use at checkout",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+DB_QUERY_BUDGET_EXCEEDED = Counter(
+    "db_query_budget_exceeded_total",
+    "Requests that executed more SQL statements than their declared budget",
+    ["method", "handler"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+)
+
+
+# ============================================================================
+# Per-request statistics
+# ============================================================================
+
+
+@dataclass
+class QueryStats:
+    """Database activity collected for a single unit of work (usually a request)."""
+
+    handler: str = "none"
+    count: int = 0
+    total_time: float = 0.0
+    pool_wait_time: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+    # Statement text is only kept when explicitly requested (e.g. by tests)
+    record_statements: bool = False
+
+    def record(self, statement: str, duration: float) -> None:
+        """Record a single executed statement."""
+        self.count += 1
+        self.total_time += duration
+        if self.record_statements:
+            self.statements.append(statement)
+
+
+# Statistics for the unit of work running in the current context
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+# Recent slow-query samples: {operation, handler, duration, statement}
+_slow_query_samples: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_SAMPLE_SIZE)
+
+
+def get_current_stats() -> Optional[QueryStats]:
+    """Return the statistics collector active in the current context, if any."""
+    return _current_stats.get()
+
+
+def get_slow_query_samples() -> List[Dict[str, Any]]:
+    """Return the most recent slow-query samples, newest last."""
+    return list(_slow_query_samples)
+
+
+def _resolve_route(request: Request) -> Any:
+    """Return the route matching the request, or None if unmatched.
+
+    Once the request is handled this is the route the router selected, which
+    also covers endpoints of included routers: FastAPI may wrap those in a
+    single application route without a path.
+    """
+    if request.scope.get("route") is not None:
+        return request.scope["route"]
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def _statement_operation(statement: str) -> str:
+    """Extract the SQL verb (SELECT, INSERT, ...) used as a low-cardinality label."""
+    parts = statement.lstrip().split(None, 1)
+    return parts[0].upper() if parts else "UNKNOWN"
+
+
+# ============================================================================
+# Engine and pool instrumentation
+# ============================================================================
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            DB_POOL_CHECKOUT_WAIT.observe(waited)
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.pool_wait_time += waited
+
+
+def instrument_engine(
+    engine: AsyncEngine | Engine,
+    slow_query_threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD,
+) -> None:
+    """Attach query timing and pool listeners to an engine.
+
+    Args:
+        engine: Engine created by create_async_engine (sync engines are
+            accepted as well)
+        slow_query_threshold: Statements slower than this (seconds) are counted
+            as slow and sampled
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_time")
+        if not start_times:
+            return
+        duration = time.perf_counter() - start_times.pop()
+        operation = _statement_operation(statement)
+
+        DB_QUERY_DURATION.labels(operation=operation).observe(duration)
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+
+        if duration >= slow_query_threshold:
+            handler = stats.handler if stats is not None else "none"
+            DB_SLOW_QUERIES.labels(operation=operation, handler=handler).inc()
+            _slow_query_samples.append(
+                {
+                    "operation": operation,
+                    "handler": handler,
+                    "duration": round(duration, 6),
+                    "statement": statement[:MAX_SAMPLE_STATEMENT_LENGTH],
+                }
+            )
+            logger.warning(
+                f"Slow query ({duration * 1000:.1f} ms) in {handler}: "
+                f"{statement[:200]}"
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+    pool = sync_engine.pool
+    capacity = None
+    if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        DB_POOL_CHECKED_OUT.set(checked_out)
+        if capacity:
+            DB_POOL_SATURATION.observe(min(checked_out / capacity, 1.0))
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        if hasattr(pool, "checkedout"):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+
+    logger.info(
+        f"Database instrumentation enabled (slow query threshold: "
+        f"{slow_query_threshold * 1000:.0f} ms)"
+    )
+
+
+# ============================================================================
+# Query budgets
+# ============================================================================
+
+# When enabled, requests over budget raise QueryBudgetExceeded (used by tests)
+_enforce_query_budgets = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block or endpoint executes more statements than its budget."""
+
+    def __init__(self, label: str, budget: int, stats: QueryStats):
+        self.label = label
+        self.budget = budget
+        self.stats = stats
+        super().__init__(format_query_report(label, budget, stats))
+
+
+def format_query_report(label: str, budget: int, stats: QueryStats) -> str:
+    """Build a human readable report of the statements executed by a block."""
+    lines = [f"{label} executed {stats.count} queries (budget: {budget})"]
+    for index, statement in enumerate(stats.statements, start=1):
+        lines.append(f"  {index:>3}. {' '.join(statement.split())}")
+    return "\n".join(lines)
+
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the maximum number of SQL statements an endpoint may execute.
+
+    The budget is read by DatabaseMetricsMiddleware, which counts violations in
+    ``db_query_budget_exceeded_total`` and, when enforcement is enabled (in
+    tests), fails the request with QueryBudgetExceeded.
+
+    The endpoint function itself is annotated, so the decorator may be placed
+    above or below the router decorator:
+
+        @router.get("/channels")
+        @query_budget(5)
+        async def list_user_channels(...): ...
+    """
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.query_budget = max_queries
+        return endpoint
+
+    return decorator
+
+
+def get_query_budget(endpoint: Any) -> Optional[int]:
+    """Return the query budget declared on an endpoint, if any."""
+    return getattr(endpoint, "query_budget", None)
+
+
+def set_query_budget_enforcement(enabled: bool) -> None:
+    """Enable or disable raising QueryBudgetExceeded for over-budget requests."""
+    global _enforce_query_budgets
+    _enforce_query_budgets = enabled
+
+
+@contextmanager
+def count_queries(budget: Optional[int] = None, label: str = "block") -> Iterator[QueryStats]:
+    """Count the statements executed inside the block.
+
+    Args:
+        budget: Optional maximum number of statements; exceeding it raises
+            QueryBudgetExceeded listing every statement executed
+        label: Name used in the failure report
+
+    Example:
+        with count_queries(budget=3) as stats:
+            await list_members(channel_id, db)
+        assert stats.count == 2
+    """
+    stats = QueryStats(handler=label, record_statements=True)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+    if budget is not None and stats.count > budget:
+        raise QueryBudgetExceeded(label, budget, stats)
+
+
+# ============================================================================
+# Request middleware
+# ============================================================================
+
+
+class DatabaseMetricsMiddleware(BaseHTTPMiddleware):
+    """Middleware that attributes database activity to the HTTP route.
+
+    Records the number of statements and total database time of each request
+    into histograms labelled by method and route template (the same
+    ``handler`` label used by prometheus_fastapi_instrumentator), and checks
+    the request against the endpoint's declared query budget.
+    """
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """Collect query statistics for the duration of the request."""
+        route = _resolve_route(request)
+        stats = QueryStats(
+            handler=getattr(route, "path", None) or "none",
+            record_statements=_enforce_query_budgets,
+        )
+        token = _current_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_stats.reset(token)
+
+        # Known for certain now that the router has selected it
+        route = _resolve_route(request)
+        stats.handler = getattr(route, "path", None) or "none"
+        DB_QUERIES_PER_REQUEST.labels(method=request.method, handler=stats.handler).observe(
+            stats.count
+        )
+        DB_TIME_PER_REQUEST.labels(method=request.method, handler=stats.handler).observe(
+            stats.total_time
+        )
+
+        budget = get_query_budget(getattr(route, "endpoint", None))
+        if budget is not None and stats.count > budget:
+            DB_QUERY_BUDGET_EXCEEDED.labels(method=request.method, handler=stats.handler).inc()
+            logger.warning(
+                f"{request.method} {stats.handler} executed {stats.count} queries "
+                f"(budget: {budget})"
+            )
+            if _enforce_query_budgets:
+                raise QueryBudgetExceeded(f"{request.method} {stats.handler}", budget, stats)
+
+        return response
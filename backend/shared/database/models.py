@@ -10,6 +10,7 @@ Models are organized by service domain:
 5. Reactions Service: Reaction
 6. Files Service: File
 7. Admin Service: AuditLog, Moderation
+8. Events: EventOutbox
 
 All models inherit from Base and use the TimestampMixin for automatic
 created_at/updated_at tracking.
@@ -21,18 +22,22 @@ from typing import Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     Enum,
     ForeignKey,
     Index,
     Integer,
+    SmallInteger,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
 
 from shared.database.base import Base, TimestampMixin
 
@@ -579,11 +584,20 @@ class Notification(Base, TimestampMixin):
     reference_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True))  # message_id, channel_id, etc.
     reference_type: Mapped[Optional[str]] = mapped_column(String(50))  # 'message', 'channel', etc.
 
-    # Who triggered this notification
+    # Who triggered this notification (the latest actor of an aggregate)
     actor_id: Mapped[Optional[UUID]] = mapped_column(
         PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL")
     )
 
+    # Coalescing: events sharing a group key ("reaction:<message_id>") within
+    # the coalescing window update one unread aggregate, counting its distinct
+    # actors (actor_ids holds them, actor_count is its length)
+    group_key: Mapped[Optional[str]] = mapped_column(String(100))
+    actor_ids: Mapped[Optional[list]] = mapped_column(ARRAY(PGUUID(as_uuid=True)))
+    actor_count: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1", nullable=False
+    )
+
     # Read status
     is_read: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
     read_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -599,6 +613,13 @@ class Notification(Base, TimestampMixin):
         Index("ix_notifications_user_id_is_read", "user_id", "is_read"),
         Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
         Index("ix_notifications_type", "type"),
+        # Open aggregates only: rows leave the index once read
+        Index(
+            "ix_notifications_user_id_group_key_unread",
+            "user_id",
+            "group_key",
+            postgresql_where=text("group_key IS NOT NULL AND NOT is_read"),
+        ),
     )
 
     def __repr__(self) -> str:
@@ -631,6 +652,40 @@ class NotificationPreference(Base, TimestampMixin):
         return f"<NotificationPreference(user_id={self.user_id})>"
 
 
+# ============================================================================
+# EVENTS
+# ============================================================================
+
+
+class EventOutbox(Base):
+    """Events written in the same transaction as the change they describe.
+
+    The outbox relay (shared.events.outbox) publishes them to Kafka in id
+    order per shard and deletes them once the broker acknowledged them.
+    """
+
+    __tablename__ = "event_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # Events with the same key share a shard, which one relay drains at a time
+    shard: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+
+    topic: Mapped[str] = mapped_column(String(100), nullable=False)
+    key: Mapped[Optional[str]] = mapped_column(String(255))
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (Index("ix_event_outbox_shard_id", "shard", "id"),)
+
+    def __repr__(self) -> str:
+        return f"<EventOutbox(id={self.id}, topic={self.topic}, event_type={self.event_type})>"
+
+
 # Export all models for Alembic
 __all__ = [
     "Base",
@@ -660,4 +715,6 @@ __all__ = [
     # Notification models
     "Notification",
     "NotificationPreference",
+    # Event models
+    "EventOutbox",
 ]
@@ -0,0 +1,40 @@
+"""Shared event publishing for Colink services.
+
+This package provides:
+- A fire-and-forget Kafka producer with batching, compression, idempotence
+  and a bounded buffer for broker outages
+- The channel_id header consumers route channel events by
+- A versioned event envelope with JSON and msgpack encodings
+- A local registry of event payload schemas
+
+The transactional outbox (shared.events.outbox) needs the database stack and
+is imported from its module directly.
+"""
+
+from shared.events.envelope import (
+    EventEnvelope,
+    decode_event,
+    encode_event,
+    make_envelope,
+)
+from shared.events.producer import (
+    CHANNEL_HEADER,
+    DeliveryCallback,
+    EventProducer,
+    channel_headers,
+)
+from shared.events.schemas import EventSchema, SchemaRegistry, registry
+
+__all__ = [
+    "CHANNEL_HEADER",
+    "DeliveryCallback",
+    "EventProducer",
+    "channel_headers",
+    "EventEnvelope",
+    "decode_event",
+    "encode_event",
+    "make_envelope",
+    "EventSchema",
+    "SchemaRegistry",
+    "registry",
+]
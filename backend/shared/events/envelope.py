@@ -0,0 +1,153 @@
+"""Typed envelope and wire encodings for inter-service events.
+
+Every event is an ``EventEnvelope``: its type, the schema version of its
+payload (see shared.events.schemas), when and by which service it was
+produced, and the payload itself. Two encodings exist:
+
+- ``json``: ``{"event_type", "data", "version", "occurred_at", "source"}``,
+  a superset of the legacy ``{"event_type", "data"}`` events, so consumers
+  that have not migrated keep working
+- ``msgpack``: the marker byte ``0xc1`` (never emitted by msgpack itself)
+  followed by a msgpack array ``[format, event_type, version, occurred_at,
+  source, data]``, smaller and cheaper to encode and decode
+
+``decode_event()`` reads both, plus legacy events without a version, so
+during the migration window producers can switch encodings (``EVENT_ENCODING``)
+one service at a time.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from shared.events.schemas import SchemaRegistry
+from shared.events.schemas import registry as default_registry
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with every service image
+    msgpack = None
+
+# First byte of msgpack-encoded envelopes; JSON envelopes always start with "{"
+MSGPACK_MARKER = b"\xc1"
+
+# Layout version of the msgpack array itself, bumped if fields are added
+ENVELOPE_FORMAT = 1
+
+ENCODINGS = ("json", "msgpack")
+
+# Encoding producers use unless told otherwise
+DEFAULT_ENCODING = os.getenv("EVENT_ENCODING", "json")
+
+
+@dataclass
+class EventEnvelope:
+    """An event with its schema version and provenance."""
+
+    event_type: Optional[str]
+    data: Dict[str, Any]
+    version: int = 1
+    occurred_at: Optional[int] = None  # epoch milliseconds
+    source: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The event as consumers used to receive it, plus the envelope fields."""
+        if self.event_type is None:
+            # Not an envelope (e.g. a user status update): the object as it was
+            return self.data
+        return {
+            "event_type": self.event_type,
+            "data": self.data,
+            "version": self.version,
+            "occurred_at": self.occurred_at,
+            "source": self.source,
+        }
+
+
+def make_envelope(
+    event_type: str,
+    data: Dict[str, Any],
+    source: Optional[str] = None,
+    registry: SchemaRegistry = default_registry,
+) -> EventEnvelope:
+    """Envelope a new event at its type's latest schema version."""
+    return EventEnvelope(
+        event_type=event_type,
+        data=data,
+        version=registry.latest_version(event_type),
+        occurred_at=int(time.time() * 1000),
+        source=source,
+    )
+
+
+def _default(value: Any) -> Any:
+    """Serialize the non-native values services put in payloads."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_event(envelope: EventEnvelope, encoding: str = DEFAULT_ENCODING) -> bytes:
+    """Serialize an envelope for Kafka."""
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return MSGPACK_MARKER + msgpack.packb(
+            [
+                ENVELOPE_FORMAT,
+                envelope.event_type,
+                envelope.version,
+                envelope.occurred_at,
+                envelope.source,
+                envelope.data,
+            ],
+            default=_default,
+        )
+    if encoding == "json":
+        return json.dumps(envelope.as_dict(), default=_default).encode("utf-8")
+    raise ValueError(f"Unknown event encoding: {encoding}")
+
+
+def decode_event(raw: bytes, registry: Optional[SchemaRegistry] = default_registry) -> EventEnvelope:
+    """Deserialize a Kafka event value in either encoding.
+
+    The payload is normalized through the schema registry so that canonical
+    field names are present; pass ``registry=None`` to skip that. JSON objects
+    that are not events come back with ``event_type`` None and the whole
+    object as ``data``.
+
+    Raises:
+        ValueError: If the value is neither a JSON nor a msgpack envelope
+    """
+    if raw[:1] == MSGPACK_MARKER:
+        if msgpack is None:
+            raise ValueError("msgpack event received but msgpack is not installed")
+        try:
+            _format, event_type, version, occurred_at, source, data = msgpack.unpackb(
+                raw[1:], raw=False
+            )
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError, TypeError) as e:
+            raise ValueError(f"Invalid msgpack event: {e}") from e
+        envelope = EventEnvelope(event_type, data, version, occurred_at, source)
+    else:
+        event = json.loads(raw)  # JSONDecodeError is a ValueError
+        if not isinstance(event, dict):
+            raise ValueError("Event is not an object")
+        if "event_type" not in event:
+            return EventEnvelope(event_type=None, data=event)
+        envelope = EventEnvelope(
+            event_type=event["event_type"],
+            data=event.get("data") or {},
+            version=event.get("version", 1),
+            occurred_at=event.get("occurred_at"),
+            source=event.get("source"),
+        )
+
+    if registry is not None and isinstance(envelope.data, dict):
+        schema = registry.get(envelope.event_type, envelope.version)
+        if schema is not None:
+            schema.normalize(envelope.data)
+    return envelope
@@ -0,0 +1,299 @@
+"""Transactional outbox for domain events.
+
+Routers used to commit and then publish to Kafka inline, so every request
+waited on the broker and an event was lost whenever the broker was down.
+Instead, ``add_outbox_event()`` writes the event to ``event_outbox`` in the
+same transaction as the change it describes: the event exists if and only
+if the change was committed. The ``OutboxRelay`` then publishes committed
+events in the background and deletes them once Kafka acknowledged them.
+
+Ordering: each row has a ``shard`` derived from its Kafka key, so all events
+of a channel (or message) share a shard. A relay worker drains a shard only
+while holding a transaction-scoped advisory lock on it, in id order, so two
+workers, or two replicas, never publish events of the same key out of order.
+Within that, rows are claimed with ``FOR UPDATE SKIP LOCKED`` so a claim
+never waits on another transaction. Shards are spread over the workers, and
+workers of other replicas take over a shard whenever its lock is free.
+
+Delivery is at least once: if publishing part of a batch fails, the batch
+is rolled back and retried, and events already acknowledged are sent again.
+
+Usage:
+    add_outbox_event(db, "messages", "message.created", data, key=channel_id)
+    await db.commit()                      # the relay is woken up on commit
+
+    outbox_relay = OutboxRelay(kafka_producer)
+    outbox_relay.start()                   # app startup, after the producer
+    await outbox_relay.stop()              # app shutdown, before the producer
+"""
+
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from shared.database import base as db_base
+from shared.database.models import EventOutbox
+from shared.events.producer import EventProducer
+
+logger = logging.getLogger(__name__)
+
+# Number of shards events are spread over; also the relay's unit of parallelism
+OUTBOX_SHARDS = 16
+
+# First key of the advisory locks taken on shards (the second is the shard)
+OUTBOX_LOCK_NAMESPACE = 0x0B0C
+
+# Relay defaults
+DEFAULT_RELAY_WORKERS = 4
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_POLL_INTERVAL = 1.0  # seconds; commits in this process wake the relay sooner
+DEFAULT_ACK_TIMEOUT = 10.0
+
+# Session.info flag set when a transaction wrote to the outbox
+_PENDING = "outbox_pending"
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+OUTBOX_RELAYED = Counter(
+    "outbox_relayed_events_total",
+    "Outbox events published to Kafka and deleted",
+    ["topic"],
+)
+
+OUTBOX_BATCH_SIZE = Histogram(
+    "outbox_relay_batch_size",
+    "Events relayed per shard batch",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+OUTBOX_LAG = Histogram(
+    "outbox_relay_lag_seconds",
+    "Time from an event's commit to its broker acknowledgement",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+OUTBOX_RELAY_FAILURES = Counter(
+    "outbox_relay_failures_total",
+    "Shard batches rolled back because publishing failed",
+)
+
+
+# ============================================================================
+# Writing events
+# ============================================================================
+
+
+def outbox_shard(topic: str, key: Optional[str]) -> int:
+    """Shard of an event: the same key always maps to the same shard."""
+    return zlib.crc32((key or topic).encode("utf-8")) % OUTBOX_SHARDS
+
+
+def add_outbox_event(
+    session: AsyncSession,
+    topic: str,
+    event_type: str,
+    data: Dict[str, Any],
+    key: Optional[str] = None,
+) -> EventOutbox:
+    """Stage an event in the caller's transaction; it is relayed once committed.
+
+    Args:
+        session: Session of the transaction making the change
+        topic: Kafka topic name
+        event_type: Type of event (e.g., 'message.created')
+        data: JSON-serializable event payload
+        key: Optional partition key (e.g., channel_id); also orders the events
+    """
+    row = EventOutbox(
+        shard=outbox_shard(topic, key),
+        topic=topic,
+        key=key,
+        event_type=event_type,
+        payload=data,
+    )
+    session.add(row)
+    session.info[_PENDING] = True
+    return row
+
+
+# Relays in this process, woken up when a transaction that wrote events commits
+_relays: List["OutboxRelay"] = []
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relays(session: Session):
+    if session.info.pop(_PENDING, False):
+        for relay in _relays:
+            relay.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session):
+    session.info.pop(_PENDING, None)
+
+
+# ============================================================================
+# Relay
+# ============================================================================
+
+
+class OutboxRelayError(Exception):
+    """A batch could not be handed to the producer."""
+
+
+class OutboxRelay:
+    """Publishes committed outbox events to Kafka.
+
+    Args:
+        producer: Producer the events are published with
+        session_factory: Creates sessions; the service's session factory by default
+        workers: Concurrent relay workers, each draining its own shards
+        batch_size: Events claimed per shard batch
+        poll_interval: Seconds an idle worker waits before checking again
+        ack_timeout: Seconds to wait for a batch's acknowledgements
+    """
+
+    def __init__(
+        self,
+        producer: EventProducer,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        workers: int = DEFAULT_RELAY_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        ack_timeout: float = DEFAULT_ACK_TIMEOUT,
+    ):
+        self.producer = producer
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.ack_timeout = ack_timeout
+        self._wakeups: List[asyncio.Event] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def _session(self) -> AsyncSession:
+        factory = self.session_factory or db_base.async_session_factory
+        if factory is None:
+            raise RuntimeError("Database not initialized. Call init_db() first.")
+        return factory()
+
+    def wake(self):
+        """Check the outbox now rather than at the next poll."""
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    async def relay_shard(self, shard: int) -> int:
+        """Publish and delete one batch of a shard's events; returns how many."""
+        async with self._session() as session, session.begin():
+            locked = await session.scalar(
+                select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_NAMESPACE, shard))
+            )
+            if not locked:
+                return 0  # another worker or replica is draining it
+
+            rows = (
+                await session.execute(
+                    select(
+                        EventOutbox.id,
+                        EventOutbox.topic,
+                        EventOutbox.key,
+                        EventOutbox.event_type,
+                        EventOutbox.payload,
+                        EventOutbox.created_at,
+                    )
+                    .where(EventOutbox.shard == shard)
+                    .order_by(EventOutbox.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                return 0
+
+            await self._publish(rows)
+            await session.execute(delete(EventOutbox).where(EventOutbox.id.in_([row.id for row in rows])))
+
+        OUTBOX_BATCH_SIZE.observe(len(rows))
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            OUTBOX_RELAYED.labels(topic=row.topic).inc()
+            OUTBOX_LAG.observe((now - row.created_at).total_seconds())
+        return len(rows)
+
+    async def _publish(self, rows: Sequence[Any]):
+        """Publish rows in order and wait until the broker acknowledged all of them."""
+        loop = asyncio.get_running_loop()
+        acks = []
+        for row in rows:
+            ack = loop.create_future()
+
+            def on_delivery(metadata, error, ack=ack):
+                if ack.done():
+                    return
+                if error is not None:
+                    ack.set_exception(error)
+                else:
+                    ack.set_result(metadata)
+
+            if not self.producer.publish(
+                row.topic, row.event_type, row.payload, key=row.key, on_delivery=on_delivery
+            ):
+                raise OutboxRelayError("Producer buffer is full")
+            acks.append(ack)
+        await asyncio.wait_for(asyncio.gather(*acks), self.ack_timeout)
+
+    async def _run(self, shards: List[int], wakeup: asyncio.Event):
+        while True:
+            # Commits during this pass set it again and skip the wait below
+            wakeup.clear()
+            full = False
+            if self.producer.connected:
+                for shard in shards:
+                    try:
+                        count = await self.relay_shard(shard)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        OUTBOX_RELAY_FAILURES.inc()
+                        logger.error(f"Outbox relay failed for shard {shard}, will retry: {e}")
+                        continue
+                    full = full or count >= self.batch_size
+            if full:
+                continue  # more is waiting, don't sleep
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+
+    def start(self):
+        """Start the relay workers."""
+        _relays.append(self)
+        for index in range(self.workers):
+            wakeup = asyncio.Event()
+            shards = [shard for shard in range(OUTBOX_SHARDS) if shard % self.workers == index]
+            self._wakeups.append(wakeup)
+            self._tasks.append(asyncio.create_task(self._run(shards, wakeup)))
+        logger.info(f"Outbox relay started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the relay workers; unpublished events stay in the outbox."""
+        if self in _relays:
+            _relays.remove(self)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks, self._wakeups = [], []
@@ -0,0 +1,374 @@
+"""Shared Kafka event producer for Colink services.
+
+Every service publishes events wrapped in an ``EventEnvelope`` (see
+shared.events.envelope), JSON or msgpack encoded. Request handlers must not
+wait on the broker, so ``publish()`` is fire-and-forget: the event is
+serialized and appended to a bounded in-memory buffer, and a background
+sender hands buffered events to the Kafka client, which batches them per
+partition (``linger_ms``, ``max_batch_size``) and compresses each batch.
+
+- Idempotence is on, so broker-side retries never duplicate or reorder events
+  of a partition.
+- While the broker is unreachable, events wait in the buffer, up to
+  ``buffer_size`` of them; beyond that new events are dropped and counted.
+  Events the client fails to deliver with a retriable error go back to the
+  front of the buffer, in the order they were sent, while there is room.
+- Delivery is reported through metrics and an optional ``on_delivery``
+  callback per event.
+- Events with a ``channel_id`` carry it as a Kafka header, so consumers
+  (websocket) can route them without decoding the value.
+
+Usage:
+    kafka_producer = EventProducer(settings.kafka_bootstrap_servers, client_id="message-service")
+
+    await kafka_producer.start()                       # app startup
+    kafka_producer.publish("messages", "message.created", data, key=channel_id)
+    await kafka_producer.stop()                        # app shutdown, flushes the buffer
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.errors import KafkaError, KafkaTimeoutError
+from prometheus_client import Counter, Gauge, Histogram
+
+from shared.events.envelope import DEFAULT_ENCODING, encode_event, make_envelope
+
+logger = logging.getLogger(__name__)
+
+# Header consumers (websocket) use to route channel events without decoding them
+CHANNEL_HEADER = "channel_id"
+
+# Producer tuning: wait a few milliseconds to fill larger, better compressed batches
+DEFAULT_LINGER_MS = 5
+DEFAULT_MAX_BATCH_SIZE = 64 * 1024
+DEFAULT_COMPRESSION = "lz4"
+
+# Events kept in memory while the broker is unreachable
+DEFAULT_BUFFER_SIZE = 10_000
+
+# Seconds between attempts to reach an unavailable broker
+RETRY_INTERVAL_SECONDS = 2.0
+
+# Seconds stop() waits for buffered events before dropping them
+DEFAULT_FLUSH_TIMEOUT = 5.0
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+KAFKA_PRODUCE_LATENCY = Histogram(
+    "kafka_produce_latency_seconds",
+    "Time from publish() to broker acknowledgement",
+    ["topic"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0),
+)
+
+KAFKA_PRODUCE_BATCH_SIZE = Histogram(
+    "kafka_produce_batch_events",
+    "Buffered events handed to the Kafka client per sender pass",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+KAFKA_PRODUCED_EVENTS = Counter(
+    "kafka_produced_events_total",
+    "Events acknowledged by the broker",
+    ["topic"],
+)
+
+KAFKA_PRODUCE_DROPPED = Counter(
+    "kafka_produce_dropped_total",
+    "Events that were not delivered",
+    ["topic", "reason"],  # buffer_full, rejected, delivery_failed, shutdown
+)
+
+KAFKA_PRODUCE_BUFFERED = Gauge(
+    "kafka_produce_buffered_events",
+    "Events waiting in the producer's in-memory buffer",
+)
+
+
+# ============================================================================
+# Producer
+# ============================================================================
+
+# Called once per event with the record metadata, or the error it failed with
+DeliveryCallback = Callable[[Optional[Any], Optional[BaseException]], None]
+
+
+def channel_headers(data: Dict[str, Any]) -> Optional[List[Tuple[str, bytes]]]:
+    """Kafka headers carrying the event's channel, if it has one."""
+    channel_id = data.get("channel_id")
+    return [(CHANNEL_HEADER, str(channel_id).encode("utf-8"))] if channel_id else None
+
+
+@dataclass
+class PendingEvent:
+    """A serialized event waiting to be handed to the Kafka client."""
+
+    topic: str
+    value: bytes
+    key: Optional[bytes]
+    headers: Optional[List[Tuple[str, bytes]]]
+    enqueued_at: float
+    on_delivery: Optional[DeliveryCallback] = None
+
+
+def _retriable(error: BaseException) -> bool:
+    """Whether a send may succeed if attempted again, e.g. once the broker is back."""
+    return isinstance(error, KafkaTimeoutError) or (
+        isinstance(error, KafkaError) and error.retriable
+    )
+
+
+class EventProducer:
+    """Fire-and-forget Kafka producer with a bounded buffer.
+
+    Args:
+        bootstrap_servers: Kafka bootstrap servers
+        client_id: Client id reported to the broker (the service name)
+        compression_type: lz4, zstd, gzip or None; falls back to none when the
+            codec library is not installed
+        linger_ms: How long the client waits to fill a batch
+        max_batch_size: Maximum bytes per partition batch
+        buffer_size: Events kept in memory while the broker is unreachable
+        enable_idempotence: Deduplicate broker-side retries (implies acks=all)
+        producer_factory: Builds the underlying client, AIOKafkaProducer by default
+        encoding: Event encoding, json or msgpack (EVENT_ENCODING by default)
+    """
+
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        client_id: Optional[str] = None,
+        compression_type: Optional[str] = DEFAULT_COMPRESSION,
+        linger_ms: int = DEFAULT_LINGER_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        enable_idempotence: bool = True,
+        producer_factory: Callable[..., Any] = AIOKafkaProducer,
+        encoding: str = DEFAULT_ENCODING,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.client_id = client_id
+        self.compression_type = compression_type
+        self.linger_ms = linger_ms
+        self.max_batch_size = max_batch_size
+        self.buffer_size = buffer_size
+        self.enable_idempotence = enable_idempotence
+        self.producer_factory = producer_factory
+        self.encoding = encoding
+        self.producer: Optional[Any] = None
+        self.buffer: Deque[PendingEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._requeued = 0  # failed deliveries at the front of the buffer
+
+    @property
+    def connected(self) -> bool:
+        """Whether the Kafka client is up, i.e. events are not just being buffered."""
+        return self.producer is not None
+
+    def publish(
+        self,
+        topic: str,
+        event_type: str,
+        data: Dict[str, Any],
+        key: Optional[str] = None,
+        on_delivery: Optional[DeliveryCallback] = None,
+    ) -> bool:
+        """Queue an event for delivery without waiting for the broker.
+
+        Args:
+            topic: Kafka topic name
+            event_type: Type of event (e.g., 'message.created')
+            data: Event payload
+            key: Optional partition key (e.g., channel_id)
+            on_delivery: Optional callback ``on_delivery(metadata, error)``
+
+        Returns:
+            False if the buffer is full and the event was dropped
+        """
+        if len(self.buffer) >= self.buffer_size:
+            KAFKA_PRODUCE_DROPPED.labels(topic=topic, reason="buffer_full").inc()
+            logger.warning(f"Kafka producer buffer full, dropping {event_type} event")
+            return False
+
+        envelope = make_envelope(event_type, data, source=self.client_id)
+        self.buffer.append(
+            PendingEvent(
+                topic=topic,
+                value=encode_event(envelope, self.encoding),
+                key=key.encode("utf-8") if key else None,
+                headers=channel_headers(data),
+                enqueued_at=time.monotonic(),
+                on_delivery=on_delivery,
+            )
+        )
+        KAFKA_PRODUCE_BUFFERED.set(len(self.buffer))
+        self._wakeup.set()
+        return True
+
+    def _compression(self) -> Optional[str]:
+        from aiokafka import codec
+
+        available = {
+            "gzip": codec.has_gzip,
+            "snappy": codec.has_snappy,
+            "lz4": codec.has_lz4,
+            "zstd": codec.has_zstd,
+        }
+        check = available.get(self.compression_type)
+        if check is not None and not check():
+            logger.warning(f"{self.compression_type} codec not installed, sending uncompressed")
+            return None
+        return self.compression_type
+
+    async def _connect(self) -> bool:
+        """Start the Kafka client; False if the broker is unreachable."""
+        producer = self.producer_factory(
+            bootstrap_servers=self.bootstrap_servers,
+            client_id=self.client_id,
+            compression_type=self._compression(),
+            linger_ms=self.linger_ms,
+            max_batch_size=self.max_batch_size,
+            enable_idempotence=self.enable_idempotence,
+        )
+        try:
+            await producer.start()
+        except Exception as e:
+            logger.error(f"Failed to start Kafka producer, buffering events: {e}")
+            try:
+                await producer.stop()
+            except Exception:
+                pass
+            return False
+        self.producer = producer
+        logger.info(f"Kafka producer started: {self.bootstrap_servers}")
+        return True
+
+    async def _drain(self) -> bool:
+        """Hand buffered events to the client; False if the broker is unavailable."""
+        sent = 0
+        try:
+            while self.buffer:
+                pending = self.buffer[0]
+                try:
+                    future = await self.producer.send(
+                        pending.topic,
+                        value=pending.value,
+                        key=pending.key,
+                        headers=pending.headers,
+                    )
+                except KafkaError as e:
+                    if _retriable(e):
+                        logger.warning(f"Kafka unavailable, {len(self.buffer)} events buffered: {e}")
+                        return False
+                    self._rejected(e)
+                    continue
+                except Exception as e:
+                    self._rejected(e)
+                    continue
+                self.buffer.popleft()
+                self._requeued = max(self._requeued - 1, 0)
+                future.add_done_callback(lambda f, pending=pending: self._delivered(pending, f))
+                sent += 1
+        finally:
+            if sent:
+                KAFKA_PRODUCE_BATCH_SIZE.observe(sent)
+            KAFKA_PRODUCE_BUFFERED.set(len(self.buffer))
+        return True
+
+    def _rejected(self, error: BaseException):
+        """Drop the head event, which the client will never accept."""
+        pending = self.buffer.popleft()
+        self._requeued = max(self._requeued - 1, 0)
+        logger.error(f"Kafka rejected event for {pending.topic}, dropping it: {error}")
+        KAFKA_PRODUCE_DROPPED.labels(topic=pending.topic, reason="rejected").inc()
+        self._notify(pending, None, error)
+
+    def _delivered(self, pending: PendingEvent, future: asyncio.Future):
+        error = future.exception() if not future.cancelled() else asyncio.CancelledError()
+        if error is None:
+            KAFKA_PRODUCE_LATENCY.labels(topic=pending.topic).observe(
+                time.monotonic() - pending.enqueued_at
+            )
+            KAFKA_PRODUCED_EVENTS.labels(topic=pending.topic).inc()
+            self._notify(pending, future.result(), None)
+        elif self._task is not None and _retriable(error) and len(self.buffer) < self.buffer_size:
+            # Back in front of what was never sent, behind earlier failures
+            logger.warning(f"Failed to deliver event to {pending.topic}, retrying: {error}")
+            self.buffer.insert(self._requeued, pending)
+            self._requeued += 1
+            KAFKA_PRODUCE_BUFFERED.set(len(self.buffer))
+            self._wakeup.set()
+        else:
+            logger.error(f"Failed to deliver event to {pending.topic}: {error}")
+            KAFKA_PRODUCE_DROPPED.labels(topic=pending.topic, reason="delivery_failed").inc()
+            self._notify(pending, None, error)
+
+    @staticmethod
+    def _notify(pending: PendingEvent, metadata: Optional[Any], error: Optional[BaseException]):
+        if pending.on_delivery is None:
+            return
+        try:
+            pending.on_delivery(metadata, error)
+        except Exception as e:
+            logger.error(f"Delivery callback failed: {e}", exc_info=True)
+
+    async def _run(self):
+        while True:
+            if self.producer is None and not await self._connect():
+                await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+                continue
+            self._wakeup.clear()
+            if not self.buffer:
+                await self._wakeup.wait()
+                continue
+            if not await self._drain():
+                await asyncio.sleep(RETRY_INTERVAL_SECONDS)
+
+    async def _flush(self):
+        if self.producer is not None or await self._connect():
+            await self._drain()
+
+    async def start(self):
+        """Start the background sender; it keeps retrying if the broker is down."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = DEFAULT_FLUSH_TIMEOUT):
+        """Send what is buffered, wait for acknowledgements and stop."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self.buffer:
+            try:
+                await asyncio.wait_for(self._flush(), timeout)
+            except TimeoutError:
+                pass
+        if self.producer:
+            try:
+                await self.producer.stop()
+                logger.info("Kafka producer stopped")
+            except Exception as e:
+                logger.error(f"Error stopping Kafka producer: {e}", exc_info=True)
+            self.producer = None
+
+        if self.buffer:
+            logger.warning(f"Dropping {len(self.buffer)} undelivered Kafka events on shutdown")
+            for pending in self.buffer:
+                KAFKA_PRODUCE_DROPPED.labels(topic=pending.topic, reason="shutdown").inc()
+            self.buffer.clear()
+            self._requeued = 0
+            KAFKA_PRODUCE_BUFFERED.set(0)
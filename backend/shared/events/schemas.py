@@ -0,0 +1,220 @@
+"""Local schema registry for inter-service events.
+
+Each event type has Python definitions of its payload, one per schema
+version: the fields it must carry, the ones it may carry, and aliases for
+legacy field names. Producers stamp events with the latest version of their
+type; consumers normalize decoded payloads through the registry so they can
+read canonical names (``message_id``, ``reaction_id``, ``channel_id``)
+whichever service or version produced the event.
+
+Adding a field is a new version with the field in ``optional``; renaming one
+is a new version with the old name kept as an alias, so consumers keep
+reading events still in flight from older producers.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class EventSchema:
+    """The payload definition of one event type at one version."""
+
+    event_type: str
+    version: int
+    required: Tuple[str, ...]
+    optional: Tuple[str, ...] = ()
+    # legacy field name -> canonical field name
+    aliases: Dict[str, str] = field(default_factory=dict)
+
+    def normalize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add canonical names for aliased fields; the legacy names are kept."""
+        for legacy, canonical in self.aliases.items():
+            if canonical not in data and legacy in data:
+                data[canonical] = data[legacy]
+        return data
+
+    def validate(self, data: Dict[str, Any]) -> List[str]:
+        """Problems with a payload; empty when it matches the schema."""
+        normalized = self.normalize(dict(data))
+        problems = [f"missing {name}" for name in self.required if normalized.get(name) is None]
+        known = set(self.required) | set(self.optional) | set(self.aliases)
+        problems.extend(f"unknown {name}" for name in data if name not in known)
+        return problems
+
+
+class SchemaRegistry:
+    """Event schemas by type and version."""
+
+    def __init__(self):
+        self._schemas: Dict[str, Dict[int, EventSchema]] = {}
+
+    def register(self, schema: EventSchema) -> EventSchema:
+        self._schemas.setdefault(schema.event_type, {})[schema.version] = schema
+        return schema
+
+    def latest_version(self, event_type: str) -> int:
+        """Version producers stamp on new events; 1 for unregistered types."""
+        versions = self._schemas.get(event_type)
+        return max(versions) if versions else 1
+
+    def get(self, event_type: str, version: Optional[int] = None) -> Optional[EventSchema]:
+        """Schema of an event type, at a version or the latest one."""
+        versions = self._schemas.get(event_type)
+        if not versions:
+            return None
+        if version is None:
+            version = max(versions)
+        return versions.get(version)
+
+    def event_types(self) -> List[str]:
+        return sorted(self._schemas)
+
+
+registry = SchemaRegistry()
+
+# Messages (topic: messages); the message service sends the id as "id"
+_MESSAGE_ALIASES = {"id": "message_id"}
+registry.register(
+    EventSchema(
+        "message.created",
+        1,
+        required=("message_id", "channel_id", "author_id", "content", "created_at"),
+        optional=(
+            "thread_id",
+            "parent_message_id",
+            "message_type",
+            "author_username",
+            "author_display_name",
+            "attachments",
+        ),
+        aliases=_MESSAGE_ALIASES,
+    )
+)
+registry.register(
+    EventSchema(
+        "message.updated",
+        1,
+        required=("message_id", "channel_id", "content"),
+        optional=("author_id", "is_edited", "edited_at", "updated_at"),
+        aliases=_MESSAGE_ALIASES,
+    )
+)
+registry.register(
+    EventSchema(
+        "message.deleted",
+        1,
+        required=("message_id", "channel_id"),
+        optional=("deleted_by",),
+        aliases=_MESSAGE_ALIASES,
+    )
+)
+
+# Reactions (topic: reactions); the message service sends the reaction id as "id"
+_REACTION_FIELDS = ("user_id", "username", "emoji")
+registry.register(
+    EventSchema(
+        "reaction.added",
+        1,
+        required=("message_id", "channel_id", *_REACTION_FIELDS),
+        optional=("reaction_id", "created_at"),
+        aliases={"id": "reaction_id"},
+    )
+)
+registry.register(
+    EventSchema(
+        "reaction.removed",
+        1,
+        required=("message_id", "channel_id", *_REACTION_FIELDS),
+        optional=("reaction_id", "removed_at"),
+        aliases={"id": "reaction_id"},
+    )
+)
+
+# Channels (topic: channels); channel events carry the channel as "id"
+_CHANNEL_ALIASES = {"id": "channel_id"}
+registry.register(
+    EventSchema(
+        "channel.created",
+        1,
+        required=("channel_id", "name", "channel_type", "created_at"),
+        optional=("description", "creator_id", "user_ids"),
+        aliases=_CHANNEL_ALIASES,
+    )
+)
+registry.register(
+    EventSchema(
+        "channel.updated",
+        1,
+        required=("channel_id", "name"),
+        optional=("description", "topic", "updated_by", "updated_at"),
+        aliases=_CHANNEL_ALIASES,
+    )
+)
+registry.register(
+    EventSchema(
+        "channel.deleted",
+        1,
+        required=("channel_id",),
+        optional=("name", "deleted_by", "deleted_at"),
+        aliases=_CHANNEL_ALIASES,
+    )
+)
+for _event_type, _optional in (
+    ("member.added", ("added_by", "added_at")),
+    ("member.updated", ("is_admin", "updated_by")),
+    ("member.removed", ("removed_by", "is_self_leave")),
+    ("member.joined", ("created_at",)),
+    ("member.left", ("left_at",)),
+):
+    registry.register(
+        EventSchema(_event_type, 1, required=("channel_id", "user_id"), optional=_optional)
+    )
+
+# Notifications (topic: notifications); keyed by recipient_id, the recipient's
+# JWT subject, which the websocket service routes them by
+registry.register(
+    EventSchema(
+        "notification.created",
+        1,
+        required=("recipient_id", "notification_id", "type", "title", "message", "created_at"),
+        optional=("reference_id", "reference_type", "actor_id", "actor_count"),
+    )
+)
+registry.register(EventSchema("unread_count.changed", 1, required=("recipient_id", "count")))
+
+# Threads (topic: threads)
+registry.register(
+    EventSchema(
+        "thread.deleted",
+        1,
+        required=("thread_id", "root_message_id", "channel_id"),
+        optional=("deleted_by", "deleted_at"),
+    )
+)
+
+# Files (topic: files)
+registry.register(
+    EventSchema(
+        "file.uploaded",
+        1,
+        required=("file_id", "filename", "uploaded_by"),
+        optional=(
+            "content_type",
+            "size",
+            "is_image",
+            "channel_id",
+            "message_id",
+            "url",
+            "created_at",
+        ),
+    )
+)
+registry.register(
+    EventSchema(
+        "file.deleted",
+        1,
+        required=("file_id",),
+        optional=("filename", "deleted_by", "deleted_at"),
+    )
+)
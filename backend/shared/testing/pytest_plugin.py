@@ -0,0 +1,36 @@
+"""Pytest plugin that guards endpoints against query-count regressions.
+
+Enable it from a conftest.py:
+
+    pytest_plugins = ["shared.testing.pytest_plugin"]
+
+While the plugin is active, any request handled by DatabaseMetricsMiddleware
+that executes more statements than the endpoint's ``@query_budget`` fails with
+QueryBudgetExceeded, and the failure lists every statement executed.
+"""
+
+from typing import Callable, Iterator
+
+import pytest
+
+from shared.database.instrumentation import count_queries, set_query_budget_enforcement
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets() -> Iterator[None]:
+    """Fail requests that exceed their endpoint's declared query budget."""
+    set_query_budget_enforcement(True)
+    yield
+    set_query_budget_enforcement(False)
+
+
+@pytest.fixture
+def query_counter() -> Callable:
+    """Return the count_queries context manager for asserting on a block.
+
+    Example:
+        def test_list_members(query_counter):
+            with query_counter(budget=3, label="list members") as stats:
+                ...
+    """
+    return count_queries
@@ -0,0 +1,60 @@
+"""Tests for the synthetic dataset generator."""
+
+from collections import Counter
+from datetime import datetime, timezone
+
+from shared.testing.datagen import DatasetGenerator, WorkloadProfile
+
+ANCHOR = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+PROFILE = WorkloadProfile(
+    users=100,
+    channels=30,
+    dm_channels=20,
+    memberships_per_user=6,
+    messages=5_000,
+    notifications=1_000,
+    seed=7,
+)
+
+
+def _rows(profile=PROFILE):
+    tables = {}
+    for table, rows in DatasetGenerator(profile, anchor=ANCHOR).batches():
+        tables.setdefault(table, []).extend(rows)
+    return tables
+
+
+def test_same_seed_produces_same_rows():
+    assert _rows() == _rows()
+
+
+def test_different_seed_produces_different_rows():
+    other = WorkloadProfile(**{**PROFILE.__dict__, "seed": 8})
+    assert _rows()["messages"] != _rows(other)["messages"]
+
+
+def test_row_counts_follow_profile():
+    tables = _rows()
+    replies = [row for row in tables["messages"] if row[5] is not None]
+
+    assert len(tables["users"]) == PROFILE.users
+    assert len(tables["messages"]) == PROFILE.messages
+    assert len(replies) == int(PROFILE.messages * PROFILE.reply_ratio)
+    assert len(tables["notifications"]) == PROFILE.notifications
+    assert len(tables["message_attachments"]) == len(tables["files"])
+
+
+def test_activity_is_skewed():
+    tables = _rows()
+    authors = Counter(row[2] for row in tables["messages"])
+    counts = sorted(authors.values(), reverse=True)
+
+    # The most active user writes far more than the median user
+    assert counts[0] > 5 * counts[len(counts) // 2]
+
+
+def test_reactions_are_unique_per_user_and_emoji():
+    reactions = _rows()["reactions"]
+    keys = [(row[1], row[2], row[3]) for row in reactions]
+    assert len(keys) == len(set(keys))
@@ -0,0 +1,166 @@
+"""Query budgets of hot endpoints, exercised against PostgreSQL.
+
+Each test seeds enough rows that a per-row query would exceed the endpoint's
+``@query_budget``; the pytest plugin enforces budgets, so an over-budget
+request fails with QueryBudgetExceeded listing every statement.
+"""
+
+import importlib
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import delete
+
+from services.message import dependencies as message_dependencies
+from services.message.routers import messages
+from services.threads import dependencies as thread_dependencies
+from services.threads.routers import threads
+from shared.database import (
+    Channel,
+    ChannelMember,
+    DatabaseMetricsMiddleware,
+    EventOutbox,
+    File,
+    Message,
+    Reaction,
+    Thread,
+)
+from shared.database import base as db_base
+
+CHANNEL_SERVICE = os.path.join(os.path.dirname(__file__), "..", "services", "channel")
+
+
+@pytest.fixture
+def channel_service(monkeypatch):
+    """(router module, dependencies module) of the channel service.
+
+    The service imports its modules absolutely, from its own directory, which
+    is on the path only while they are imported.
+    """
+    monkeypatch.syspath_prepend(os.path.abspath(CHANNEL_SERVICE))
+    return importlib.import_module("routers.channels"), importlib.import_module("dependencies")
+
+
+@pytest.fixture
+async def world(monkeypatch, session_factory, make_users):
+    """Three channels with unread messages, a thread with reactions and three files."""
+    monkeypatch.setattr(db_base, "async_session_factory", session_factory)
+    alice, bob, carol = await make_users("alice", "bob", "carol")
+
+    channels = [Channel(name=f"budget-{i}-{alice.username}") for i in range(3)]
+    async with session_factory() as db:
+        db.add_all(channels)
+        await db.flush()
+        for channel in channels:
+            db.add_all(ChannelMember(channel_id=channel.id, user_id=u.id) for u in (alice, bob))
+            db.add_all(
+                Message(content=f"hi {i}", channel_id=channel.id, author_id=bob.id)
+                for i in range(3)
+            )
+        root = Message(content="root", channel_id=channels[0].id, author_id=alice.id)
+        db.add(root)
+        await db.flush()
+        thread = Thread(root_message_id=root.id, reply_count=4)
+        db.add(thread)
+        await db.flush()
+        replies = [
+            Message(
+                content=f"reply {i}",
+                channel_id=channels[0].id,
+                author_id=(bob, carol)[i % 2].id,
+                thread_id=thread.id,
+            )
+            for i in range(4)
+        ]
+        db.add_all(replies)
+        await db.flush()
+        db.add_all(
+            Reaction(message_id=reply.id, user_id=user.id, emoji=emoji)
+            for reply in replies
+            for user, emoji in ((alice, "👍"), (bob, "🎉"))
+        )
+        files = [
+            File(
+                uploaded_by_id=alice.id,
+                filename=f"{i}-{alice.username}.txt",
+                original_filename=f"{i}.txt",
+                mime_type="text/plain",
+                size_bytes=3,
+                storage_key=f"test/{alice.username}/{i}",
+                bucket="test",
+            )
+            for i in range(3)
+        ]
+        db.add_all(files)
+        await db.commit()
+
+    yield alice, channels, thread, files
+
+    async with session_factory() as db:
+        keys = [str(channel.id) for channel in channels]
+        await db.execute(delete(EventOutbox).where(EventOutbox.key.in_(keys)))
+        await db.execute(delete(Channel).where(Channel.id.in_([c.id for c in channels])))
+        await db.execute(delete(File).where(File.id.in_([f.id for f in files])))
+        await db.commit()
+
+
+def _client(router, get_current_user_id, user) -> httpx.AsyncClient:
+    """Client of an app serving ``router`` to ``user``, with query budgets checked."""
+    app = FastAPI()
+    app.add_middleware(DatabaseMetricsMiddleware)
+    app.include_router(router)
+    # Stands in for the auth middleware; the user is still loaded from the database
+    app.dependency_overrides[get_current_user_id] = lambda: user.keycloak_id
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": "Bearer test"},
+    )
+
+
+async def test_channel_list_counts_members_and_unread_per_page(world, channel_service):
+    alice, channels, _, _ = world
+    router, dependencies = channel_service
+    async with _client(router.router, dependencies.get_current_user_id, alice) as client:
+        response = await client.get("/channels")
+
+    assert response.status_code == 200
+    listed = {c["id"]: c for c in response.json()["channels"]}
+    assert set(listed) == {str(channel.id) for channel in channels}
+    assert {c["member_count"] for c in listed.values()} == {2}
+    # Bob's three messages (the first channel also holds the thread)
+    assert listed[str(channels[1].id)]["unread_count"] == 3
+
+
+async def test_thread_replies_load_authors_and_reactions_in_bulk(world):
+    alice, _, thread, _ = world
+    async with _client(threads.router, thread_dependencies.get_current_user_id, alice) as client:
+        response = await client.get(f"/threads/{thread.id}/replies")
+
+    assert response.status_code == 200
+    replies = response.json()["replies"]
+    assert [reply["content"] for reply in replies] == [f"reply {i}" for i in range(4)]
+    assert all(len(reply["reactions"]) == 2 for reply in replies)
+
+
+async def test_message_attachments_are_resolved_in_bulk(world):
+    alice, channels, _, files = world
+    async with _client(messages.router, message_dependencies.get_current_user_id, alice) as client:
+        created = await client.post(
+            "/messages",
+            json={
+                "content": "three files",
+                "channel_id": str(channels[2].id),
+                "attachment_ids": [str(f.id) for f in files],
+            },
+        )
+        history = await client.get(f"/channels/{channels[2].id}/messages")
+
+    assert created.status_code == 201
+    assert len(created.json()["attachments"]) == 3
+    assert history.status_code == 200
+    latest = history.json()["messages"][0]
+    assert latest["content"] == "three files"
+    assert {a["id"] for a in latest["attachments"]} == {str(f.id) for f in files}
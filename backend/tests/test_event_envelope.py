@@ -0,0 +1,53 @@
+"""Tests for the versioned event envelope and the schema registry."""
+
+import json
+from uuid import UUID
+
+import pytest
+
+from shared.events import decode_event, encode_event, make_envelope, registry
+
+
+@pytest.mark.parametrize("encoding", ["json", "msgpack"])
+def test_envelope_round_trips_and_normalizes_field_names(encoding):
+    author = UUID("6b1f2c1e-3c55-4d0a-9d4b-2f0d3c4b5a69")
+    envelope = make_envelope(
+        "message.created",
+        {"id": "m1", "channel_id": "c1", "author_id": author, "content": "hi"},
+        source="message-service",
+    )
+    raw = encode_event(envelope, encoding)
+    assert raw[:1] == (b"{" if encoding == "json" else b"\xc1")
+
+    decoded = decode_event(raw)
+    assert decoded.event_type == "message.created"
+    assert decoded.version == registry.latest_version("message.created")
+    assert decoded.source == "message-service"
+    assert decoded.occurred_at == envelope.occurred_at
+    # Non-native values are stringified, legacy "id" is also readable as message_id
+    assert decoded.data["author_id"] == str(author)
+    assert decoded.data["message_id"] == decoded.data["id"] == "m1"
+
+
+def test_legacy_and_non_event_json_are_still_read():
+    legacy = json.dumps(
+        {"event_type": "reaction.added", "data": {"id": "r1", "message_id": "m1"}}
+    ).encode()
+    decoded = decode_event(legacy)
+    assert decoded.version == 1
+    assert decoded.data["reaction_id"] == "r1"
+
+    status = {"user_id": "u1", "status": "away"}
+    assert decode_event(json.dumps(status).encode()).as_dict() == status
+
+    with pytest.raises(ValueError):
+        decode_event(b"\xc1\x00garbage")
+
+
+def test_schema_validation_reports_missing_and_unknown_fields():
+    schema = registry.get("member.added")
+    assert schema.validate({"channel_id": "c1", "user_id": "u1", "added_by": "u2"}) == []
+    assert schema.validate({"channel_id": "c1", "colour": "red"}) == [
+        "missing user_id",
+        "unknown colour",
+    ]
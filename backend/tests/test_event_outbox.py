@@ -0,0 +1,112 @@
+"""Tests for the transactional outbox and its relay.
+
+They need PostgreSQL (advisory locks, SKIP LOCKED) and run against
+TEST_DATABASE_URL, e.g. postgresql+asyncpg://postgres@localhost/colink_test.
+"""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from shared.database.models import EventOutbox
+from shared.events import EventProducer
+from shared.events.outbox import (
+    OUTBOX_LOCK_NAMESPACE,
+    OutboxRelay,
+    add_outbox_event,
+    outbox_shard,
+)
+
+
+class FakeKafka:
+    """Acknowledges every send unless ``fail`` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.fail = False
+
+    def __call__(self, **config):
+        return self
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, headers=None):
+        future = asyncio.get_running_loop().create_future()
+        if self.fail:
+            future.set_exception(RuntimeError("not leader for partition"))
+        else:
+            self.sent.append((topic, key.decode(), json.loads(value)))
+            future.set_result(None)
+        return future
+
+
+@pytest.fixture(autouse=True)
+async def empty_outbox(session_factory):
+    async with session_factory.begin() as session:
+        await session.execute(delete(EventOutbox))
+
+
+@pytest.fixture
+async def kafka():
+    kafka = FakeKafka()
+    producer = EventProducer("kafka:9092", producer_factory=kafka)
+    await producer.start()
+    kafka.producer = producer
+    yield kafka
+    await producer.stop()
+
+
+async def outbox_count(session_factory) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(EventOutbox))
+
+
+async def test_committed_events_are_relayed_in_order_and_deleted(session_factory, kafka):
+    async with session_factory() as session:
+        for seq in range(5):
+            for channel_id in ("c1", "c2"):
+                add_outbox_event(session, "messages", "message.created",
+                                 {"channel_id": channel_id, "seq": seq}, key=channel_id)
+        await session.commit()
+    async with session_factory() as session:
+        add_outbox_event(session, "messages", "message.created", {"seq": 99}, key="c1")
+        await session.rollback()
+
+    relay = OutboxRelay(kafka.producer, session_factory, batch_size=3)
+    for shard in {outbox_shard("messages", "c1"), outbox_shard("messages", "c2")}:
+        while await relay.relay_shard(shard):
+            pass
+
+    for channel_id in ("c1", "c2"):
+        seqs = [event["data"]["seq"] for _, key, event in kafka.sent if key == channel_id]
+        assert seqs == [0, 1, 2, 3, 4]
+    assert await outbox_count(session_factory) == 0
+
+
+async def test_locked_shard_is_skipped_and_failed_batch_is_kept(session_factory, kafka):
+    shard = outbox_shard("reactions", "m1")
+    async with session_factory() as session:
+        add_outbox_event(session, "reactions", "reaction.added", {"emoji": "🎉"}, key="m1")
+        await session.commit()
+    relay = OutboxRelay(kafka.producer, session_factory)
+
+    # Another relay holds the shard: nothing is published
+    async with session_factory() as other, other.begin():
+        await other.execute(select(func.pg_advisory_xact_lock(OUTBOX_LOCK_NAMESPACE, shard)))
+        assert await relay.relay_shard(shard) == 0
+
+    # The broker rejects the batch: it stays in the outbox for the next attempt
+    kafka.fail = True
+    with pytest.raises(RuntimeError):
+        await relay.relay_shard(shard)
+    assert await outbox_count(session_factory) == 1
+
+    kafka.fail = False
+    assert await relay.relay_shard(shard) == 1
+    assert [event["event_type"] for _, _, event in kafka.sent] == ["reaction.added"]
@@ -0,0 +1,123 @@
+"""Tests for the shared fire-and-forget Kafka event producer."""
+
+import asyncio
+import json
+
+import pytest
+from aiokafka.errors import KafkaConnectionError, MessageSizeTooLargeError
+
+from shared.events import EventProducer
+from shared.events import producer as producer_module
+
+
+class FakeKafka:
+    """Builds clients that accept sends only while the broker is up."""
+
+    def __init__(self, up: bool = True):
+        self.up = up
+        self.failing = 0  # sends accepted but then failed, as when the leader goes away
+        self.sent = []
+        self.configs = []
+
+    def __call__(self, **config):
+        self.configs.append(config)
+        return FakeClient(self)
+
+
+class FakeClient:
+    def __init__(self, kafka: FakeKafka):
+        self.kafka = kafka
+
+    async def start(self):
+        if not self.kafka.up:
+            raise KafkaConnectionError("broker unreachable")
+
+    async def stop(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, headers=None):
+        if len(value) > 200:
+            raise MessageSizeTooLargeError()
+        future = asyncio.get_running_loop().create_future()
+        if self.kafka.failing:
+            self.kafka.failing -= 1
+            future.set_exception(KafkaConnectionError("connection to leader lost"))
+            return future
+        self.kafka.sent.append((topic, json.loads(value), key, headers))
+        future.set_result(f"{topic}-{len(self.kafka.sent)}")
+        return future
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(producer_module, "RETRY_INTERVAL_SECONDS", 0.01)
+
+
+async def test_buffers_while_broker_is_down_and_drains_in_order():
+    kafka = FakeKafka(up=False)
+    producer = EventProducer("kafka:9092", buffer_size=2, producer_factory=kafka)
+    await producer.start()
+
+    delivered = []
+    assert producer.publish("messages", "message.created", {"id": 1, "channel_id": "c1"}, key="c1",
+                            on_delivery=lambda metadata, error: delivered.append((metadata, error)))
+    assert producer.publish("messages", "message.updated", {"id": 1}, key="c1")
+    # Buffer is full: the newest event is dropped, the buffered ones are kept
+    assert not producer.publish("messages", "message.deleted", {"id": 1}, key="c1")
+    await asyncio.sleep(0.05)
+    assert kafka.sent == []
+
+    kafka.up = True
+    await wait_for(lambda: len(kafka.sent) == 2)
+    assert [event["event_type"] for _, event, _, _ in kafka.sent] == [
+        "message.created",
+        "message.updated",
+    ]
+    assert kafka.sent[0][2] == b"c1"
+    assert kafka.sent[0][3] == [("channel_id", b"c1")]
+    assert kafka.sent[1][3] is None
+    assert delivered == [("messages-1", None)]
+    assert kafka.configs[-1]["enable_idempotence"] is True
+
+    await producer.stop()
+    assert not producer.buffer
+
+
+async def test_rejected_event_is_dropped_without_blocking_the_rest():
+    kafka = FakeKafka()
+    producer = EventProducer("kafka:9092", producer_factory=kafka)
+    await producer.start()
+
+    errors = []
+    producer.publish("files", "file.uploaded", {"name": "x" * 500},
+                     on_delivery=lambda metadata, error: errors.append(error))
+    producer.publish("files", "file.deleted", {"name": "report.pdf"})
+    await producer.stop()
+
+    assert [event["event_type"] for _, event, _, _ in kafka.sent] == ["file.deleted"]
+    assert isinstance(errors[0], MessageSizeTooLargeError)
+
+
+async def test_failed_deliveries_are_retried_in_order():
+    kafka = FakeKafka()
+    kafka.failing = 2
+    producer = EventProducer("kafka:9092", producer_factory=kafka)
+    await producer.start()
+
+    delivered = []
+    for i in range(3):
+        producer.publish("messages", "message.created", {"id": i}, key="c1",
+                         on_delivery=lambda metadata, error: delivered.append(error))
+    await wait_for(lambda: len(kafka.sent) == 3)
+    await producer.stop()
+
+    # The third was acknowledged first; the other two went back to the buffer in order
+    assert [event["data"]["id"] for _, event, _, _ in kafka.sent] == [2, 0, 1]
+    assert delivered == [None, None, None]
@@ -0,0 +1,81 @@
+"""Tests for the hot-query EXPLAIN plan checks."""
+
+from explain_hot_queries import HotQuery, analyze_plan, compare_reports
+
+
+def _query(**kwargs):
+    return HotQuery(name="q", source="test", build=lambda params: None, **kwargs)
+
+
+def _node(node_type, rows=10, actual=10, plans=None, **extra):
+    node = {
+        "Node Type": node_type,
+        "Plan Rows": rows,
+        "Actual Rows": actual,
+        "Actual Loops": 1,
+        **extra,
+    }
+    if plans:
+        node["Plans"] = plans
+    return node
+
+
+def test_index_scan_passes():
+    plan = {
+        "Plan": _node(
+            "Limit",
+            plans=[
+                _node(
+                    "Index Scan Backward",
+                    **{"Index Name": "ix_messages_channel_id_created_at", "Relation Name": "messages"},
+                )
+            ],
+        ),
+        "Execution Time": 0.2,
+    }
+
+    entry = analyze_plan(plan, _query(expected_indexes=["ix_messages_channel_id_created_at"]))
+
+    assert entry["passed"]
+    assert entry["indexes_used"] == ["ix_messages_channel_id_created_at"]
+
+
+def test_seq_scan_and_missing_index_are_flagged():
+    plan = {"Plan": _node("Seq Scan", **{"Relation Name": "messages"})}
+
+    entry = analyze_plan(plan, _query(expected_indexes=["ix_messages_thread_id"]))
+
+    assert not entry["passed"]
+    assert {finding["rule"] for finding in entry["findings"]} == {"seq_scan", "missing_index"}
+
+
+def test_allowed_seq_scan_is_not_flagged():
+    plan = {"Plan": _node("Seq Scan", **{"Relation Name": "messages"})}
+
+    assert analyze_plan(plan, _query(allow_seq_scan=["messages"]))["passed"]
+
+
+def test_row_estimate_blowup_is_flagged_except_below_limit():
+    misestimated = _node("Hash Join", rows=100, actual=50_000)
+    assert analyze_plan({"Plan": misestimated}, _query())["findings"][0]["rule"] == "row_estimate"
+
+    # A Limit stops its input early; fewer rows than estimated is expected
+    stopped_early = _node("Limit", rows=5, actual=5, plans=[_node("Sort", rows=50_000, actual=5)])
+    assert analyze_plan({"Plan": stopped_early}, _query())["passed"]
+
+
+def test_compare_reports_lists_new_findings_and_slowdowns():
+    baseline = {"queries": [{"name": "q", "findings": [], "execution_time_ms": 1.0}]}
+    report = {
+        "queries": [
+            {
+                "name": "q",
+                "findings": [{"rule": "seq_scan", "node": "Seq Scan on messages", "detail": "x"}],
+                "execution_time_ms": 3.0,
+            }
+        ]
+    }
+
+    regressions = compare_reports(report, baseline)
+
+    assert len(regressions) == 2
@@ -0,0 +1,117 @@
+"""Tests for the notification preference cache."""
+
+import asyncio
+from uuid import uuid4
+
+from services.notifications.services.preference_cache import PreferenceCache
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.setdefault(channel, []).append(self.queue)
+        await self.queue.put({"type": "subscribe", "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def reset(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        self.redis.data.update(self.commands)
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis the cache uses, in memory."""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = {}
+        self.round_trips = 0
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers.get(channel, []):
+            await queue.put({"type": "message", "data": message})
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class Loader:
+    """Stands in for the preferences query; records which users it loaded."""
+
+    def __init__(self):
+        self.calls = []
+        self.muted = set()
+
+    async def __call__(self, db, user_ids):
+        self.calls.append(set(user_ids))
+        return {user_id: {"mentions": user_id not in self.muted} for user_id in user_ids}
+
+
+async def test_bulk_lookup_goes_local_then_redis_then_database():
+    redis, loader = FakeRedis(), Loader()
+    replica_a, replica_b = PreferenceCache(loader), PreferenceCache(loader)
+    replica_a.redis_client = replica_b.redis_client = redis
+    users = [uuid4() for _ in range(50)]
+
+    assert len(await replica_a.get_many(None, users)) == 50
+    # One MGET for the misses, one query, one pipelined write-back
+    assert loader.calls == [set(users)]
+    assert redis.round_trips == 2
+
+    # Another replica is served by Redis, the first one from memory
+    await replica_b.get_many(None, users)
+    await replica_a.get_many(None, users)
+    assert len(loader.calls) == 1
+    assert redis.round_trips == 3
+
+    # Expired local entries are read back from Redis
+    await replica_a.get_many(None, users[:1], now=10**9)
+    assert len(loader.calls) == 1
+
+
+async def test_invalidation_reaches_every_replica():
+    redis, loader = FakeRedis(), Loader()
+    replica_a, replica_b = PreferenceCache(loader), PreferenceCache(loader)
+    await replica_a.start(redis)
+    await replica_b.start(redis)
+    await asyncio.sleep(0)
+    user = uuid4()
+
+    assert (await replica_b.get(None, user))["mentions"] is True
+    loader.muted.add(user)
+    await replica_a.invalidate(user)
+    await asyncio.sleep(0)
+
+    assert (await replica_b.get(None, user))["mentions"] is False
+    assert loader.calls == [{user}, {user}]
+
+    await replica_a.stop()
+    await replica_b.stop()
@@ -0,0 +1,73 @@
+"""Tests for the unread notification counters.
+
+They run against PostgreSQL at TEST_DATABASE_URL, like test_notifications_batch.
+"""
+
+import pytest
+
+from services.notifications.schemas.notifications import NotificationType
+from services.notifications.services.notification_manager import NotificationManager
+from services.notifications.services.unread_counters import InMemoryUnreadCounters
+from shared.database import count_queries
+
+
+@pytest.fixture
+async def setup(session_factory, make_users):
+    users = await make_users("u0", "u1", "u2")
+    manager = NotificationManager()
+    manager.unread = InMemoryUnreadCounters()
+    return manager, users, session_factory
+
+
+def _notification(user_id):
+    return {"user_id": user_id, "type": "mention", "title": "Mentioned", "message": "hi"}
+
+
+async def test_counters_follow_changes_without_recounting(setup):
+    manager, (user, _, _), session_factory = setup
+    async with session_factory() as db:
+        assert await manager.get_unread_count(db, user.id) == 0  # seeds the counter
+
+        first = await manager.create_notification(
+            db, user.id, NotificationType.MENTION, "Mentioned", "hi"
+        )
+        await manager.create_notification(db, user.id, NotificationType.REPLY, "Reply", "hi")
+        await manager.create_notifications(db, [_notification(user.id)], fanned_out=[])
+        with count_queries() as stats:
+            assert await manager.get_unread_count(db, user.id) == 3
+        assert stats.count == 0
+
+        await manager.mark_as_read(db, first.id, user.id)
+        await manager.mark_as_read(db, first.id, user.id)  # already read
+        assert await manager.get_unread_count(db, user.id) == 2
+
+        assert await manager.mark_all_as_read(db, user.id) == 2
+        with count_queries() as stats:
+            assert await manager.get_unread_count(db, user.id) == 0
+        assert stats.count == 0
+
+
+async def test_bulk_read_and_reconciliation(setup):
+    manager, (a, b, c), session_factory = setup
+    async with session_factory() as db:
+        await manager.create_notifications(
+            db, [_notification(a.id), _notification(a.id), _notification(b.id)]
+        )
+
+        # Counters are only seeded by reads; one query counts every missing user
+        with count_queries() as stats:
+            counts = await manager.get_unread_counts(db, [a.id, b.id, c.id])
+        assert counts == {a.id: 2, b.id: 1, c.id: 0}
+        assert stats.count == 1
+        with count_queries() as stats:
+            assert await manager.get_unread_counts(db, [a.id, c.id]) == {a.id: 2, c.id: 0}
+        assert stats.count == 0
+
+        # Drifted counters are corrected, others are left alone
+        manager.unread.values[a.id] = 7
+        assert await manager.unread.reconcile(db) == 1
+        assert manager.unread.values == {a.id: 2, b.id: 1, c.id: 0}
+
+        # Decrements never take a counter below zero
+        await manager.unread.adjust({c.id: -3})
+        assert manager.unread.values[c.id] == 0
@@ -0,0 +1,245 @@
+"""Tests for the batch-oriented notifications consumer.
+
+They run against PostgreSQL at TEST_DATABASE_URL, like test_event_outbox.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from services.notifications.services.kafka_consumer import KafkaConsumerService
+from services.notifications.services.notification_manager import notification_manager
+from services.notifications.services.unread_counters import InMemoryUnreadCounters
+from shared.database import (
+    Channel,
+    ChannelMember,
+    Message,
+    Notification,
+    NotificationPreference,
+    count_queries,
+)
+from shared.database import base as db_base
+
+
+@pytest.fixture
+async def world(monkeypatch, session_factory, make_users):
+    monkeypatch.setattr(db_base, "async_session_factory", session_factory)
+    monkeypatch.setattr(notification_manager, "redis_client", None)
+    monkeypatch.setattr(notification_manager, "unread", InMemoryUnreadCounters())
+
+    names = ("alice", "bob", "carol", "dave")
+    users = dict(zip(names, await make_users(*names), strict=True))
+    channel = Channel(name=f"general-{users['alice'].username}")
+    async with session_factory() as db:
+        db.add(channel)
+        await db.flush()
+        root = Message(content="root", channel_id=channel.id, author_id=users["bob"].id)
+        db.add(root)
+        # Dave opted out of mentions
+        db.add(NotificationPreference(user_id=users["dave"].id, mentions=False))
+        await db.commit()
+
+    yield users, channel, root, session_factory
+
+    async with session_factory() as db:
+        await db.execute(delete(Channel).where(Channel.id == channel.id))
+        await db.commit()
+
+
+async def test_batch_is_resolved_and_written_in_a_few_statements(world):
+    users, channel, root, session_factory = world
+    alice, bob, carol, dave = (users[n] for n in ("alice", "bob", "carol", "dave"))
+    events = [
+        {
+            "event_type": "message.created",
+            "data": {
+                "message_id": str(uuid4()),
+                "author_id": str(alice.id),
+                "content": f"@{carol.username} @{dave.username} @{alice.username} look",
+                "parent_message_id": str(root.id),
+            },
+        },
+        {
+            "event_type": "reaction.added",
+            "data": {"message_id": str(root.id), "user_id": str(carol.id), "emoji": "🎉"},
+        },
+        {
+            "event_type": "member.added",
+            "data": {
+                "channel_id": str(channel.id),
+                "user_id": str(dave.id),
+                "added_by": str(alice.id),
+            },
+        },
+        {"event_type": "message.updated", "data": {"message_id": str(root.id)}},
+    ]
+    async with session_factory() as db:
+        await notification_manager.get_unread_counts(db, [bob.id, carol.id])
+
+    with count_queries() as stats:
+        created = await KafkaConsumerService().process_batch(events)
+
+    # users, messages, channels, preferences, open aggregates, one INSERT
+    assert stats.count == 6
+    assert created == 4
+
+    async with session_factory() as db:
+        rows = (
+            await db.execute(
+                select(Notification.user_id, Notification.type, Notification.title).where(
+                    Notification.user_id.in_([u.id for u in users.values()])
+                )
+            )
+        ).all()
+    assert sorted((row.user_id, row.type) for row in rows) == sorted(
+        [
+            (carol.id, "mention"),  # dave muted mentions, alice mentioned herself
+            (bob.id, "reply"),
+            (bob.id, "reaction"),
+            (dave.id, "channel_invite"),
+        ]
+    )
+    assert f"Added to #{channel.name}" in {row.title for row in rows}
+    # Existing counters were incremented, dave's is seeded on first read
+    assert notification_manager.unread.values == {bob.id: 2, carol.id: 1}
+
+
+class PresenceRedis:
+    """Serves the websocket presence hash; None when the hash does not exist."""
+
+    def __init__(self, online):
+        self.online = online
+
+    async def exists(self, key):
+        return int(self.online is not None)
+
+    async def hmget(self, key, fields):
+        return ["1" if field in self.online else None for field in fields]
+
+
+async def test_broadcast_mentions_fan_out_to_eligible_members(
+    world, make_users, monkeypatch, caplog
+):
+    users, channel, root, session_factory = world
+    alice, bob, carol, dave = (users[n] for n in ("alice", "bob", "carol", "dave"))
+    extra = await make_users(*(f"m{i}" for i in range(7)))
+    async with session_factory() as db:
+        members = [alice, bob, carol, dave, *extra]
+        for user in members:
+            db.add(ChannelMember(channel_id=channel.id, user_id=user.id))
+        await db.flush()
+        # m0 disabled channel notifications, m1 muted it, dave muted mentions
+        await db.execute(
+            update(ChannelMember)
+            .where(ChannelMember.user_id == extra[0].id)
+            .values(notifications_enabled=False)
+        )
+        await db.execute(
+            update(ChannelMember)
+            .where(ChannelMember.user_id == extra[1].id)
+            .values(muted_until=datetime.now(timezone.utc) + timedelta(hours=1))
+        )
+        await db.commit()
+
+    consumer = KafkaConsumerService()
+    consumer.fanout.page_size = 2
+    online = {alice.keycloak_id, carol.keycloak_id, extra[2].keycloak_id, extra[3].keycloak_id}
+    monkeypatch.setattr(notification_manager, "redis_client", PresenceRedis(online))
+
+    def event(content):
+        return {
+            "event_type": "message.created",
+            "data": {
+                "message_id": str(uuid4()),
+                "channel_id": str(channel.id),
+                "author_id": str(alice.id),
+                "content": content,
+            },
+        }
+
+    everyone = await consumer.process_batch([event(f"@channel deploy at 5, @{carol.username}")])
+    here = await consumer.process_batch([event("@here standup")])
+
+    async with session_factory() as db:
+        rows = (
+            await db.execute(
+                select(Notification.user_id, Notification.title).where(
+                    Notification.user_id.in_([u.id for u in members])
+                )
+            )
+        ).all()
+    broadcast = sorted(row.user_id for row in rows if "@channel" in row.title)
+    # Not the author, carol (mentioned by name), dave (mentions off), m0, m1
+    assert broadcast == sorted([bob.id, *(u.id for u in extra[2:])])
+    assert everyone == 1 + len(broadcast)
+    # Online eligible members only
+    present = sorted(row.user_id for row in rows if "@here" in row.title)
+    assert present == sorted([carol.id, extra[2].id, extra[3].id])
+    assert here == 3
+
+    # Without a presence hash (in-memory client manager) @here is skipped,
+    # not treated as nobody online
+    monkeypatch.setattr(notification_manager, "redis_client", PresenceRedis(None))
+    with caplog.at_level(logging.WARNING):
+        assert await consumer.process_batch([event("@here retro")]) == 0
+    assert "presence is unavailable" in caplog.text
+
+
+async def test_reaction_bursts_update_one_aggregate(world):
+    users, channel, root, session_factory = world
+    alice, bob, carol, dave = (users[n] for n in ("alice", "bob", "carol", "dave"))
+
+    def reaction(user, emoji="🎉"):
+        return {
+            "event_type": "reaction.added",
+            "data": {"message_id": str(root.id), "user_id": str(user.id), "emoji": emoji},
+        }
+
+    async def bob_notifications():
+        async with session_factory() as db:
+            return (
+                await db.execute(
+                    select(Notification).where(
+                        Notification.user_id == bob.id, Notification.type == "reaction"
+                    )
+                )
+            ).scalars().all()
+
+    async with session_factory() as db:
+        await notification_manager.get_unread_count(db, bob.id)
+
+    consumer = KafkaConsumerService()
+    # Alice reacting again counts once, within a batch and in a later one
+    await consumer.process_batch([reaction(alice), reaction(alice, "👍"), reaction(carol)])
+    await consumer.process_batch([reaction(alice, "🔥")])
+    (aggregate,) = await bob_notifications()
+    assert aggregate.actor_count == 2
+    assert aggregate.title == "Alice and 1 other reacted to your message"
+    await consumer.process_batch([reaction(dave, "🚀")])
+
+    (aggregate,) = await bob_notifications()
+    assert aggregate.actor_count == 3
+    assert aggregate.title == "Dave and 2 others reacted to your message"
+    assert aggregate.message == "Reacted with 🚀"
+    assert aggregate.actor_id == dave.id
+    assert notification_manager.unread.values[bob.id] == 1
+
+    # Once read, the aggregate is closed and the next reaction starts a new one
+    async with session_factory() as db:
+        await notification_manager.mark_as_read(db, aggregate.id, bob.id)
+    await consumer.process_batch([reaction(carol, "👀")])
+
+    rows = await bob_notifications()
+    assert sorted(row.title for row in rows) == [
+        "Carol reacted to your message",
+        "Dave and 2 others reacted to your message",
+    ]
+    assert notification_manager.unread.values[bob.id] == 1
+
+    # Outside the window every reaction is its own aggregate
+    consumer.coalescer.window = 0
+    await consumer.process_batch([reaction(dave, "✅")])
+    assert len(await bob_notifications()) == 3
@@ -0,0 +1,90 @@
+"""Tests for keyset pagination of a user's notifications.
+
+They run against PostgreSQL at TEST_DATABASE_URL, like test_notifications_batch.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from services.notifications.config import settings
+from services.notifications.services.notification_manager import NotificationManager
+from services.notifications.services.unread_counters import InMemoryUnreadCounters
+from shared.database import Notification, count_queries
+
+
+@pytest.fixture
+async def history(session_factory, make_users):
+    """A user with 25 notifications, several sharing a timestamp, 5 of them unread."""
+    (user,) = await make_users("u")
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    async with session_factory() as db:
+        await db.execute(
+            insert(Notification),
+            [
+                {
+                    "user_id": user.id,
+                    "type": "mention",
+                    "title": f"#{i}",
+                    "message": "hi",
+                    "is_read": i >= 5,
+                    # Pairs of notifications share a timestamp; id breaks the tie
+                    "created_at": start + timedelta(seconds=i // 2),
+                }
+                for i in range(25)
+            ],
+        )
+        await db.commit()
+
+    manager = NotificationManager()
+    manager.unread = InMemoryUnreadCounters()
+    return manager, user, session_factory
+
+
+async def test_cursor_walks_every_notification_once(history):
+    manager, user, session_factory = history
+    async with session_factory() as db:
+        seen, cursor = [], None
+        while True:
+            page = await manager.get_user_notifications(db, user.id, page_size=10, cursor=cursor)
+            seen.extend(page.notifications)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert len(seen) == 25
+        assert len({n.id for n in seen}) == 25
+        assert seen == sorted(seen, key=lambda n: (n.created_at, n.id), reverse=True)
+
+        # The page parameter still works for older clients
+        second = await manager.get_user_notifications(db, user.id, page=2, page_size=10)
+        assert second.notifications == seen[10:20]
+
+        with pytest.raises(ValueError):
+            await manager.get_user_notifications(db, user.id, cursor="not-a-cursor")
+
+
+async def test_totals_avoid_full_counts(history, monkeypatch):
+    manager, user, session_factory = history
+    async with session_factory() as db:
+        # Counted, up to the cap
+        page = await manager.get_user_notifications(db, user.id, page_size=10)
+        assert (page.total_count, page.total_is_estimate) == (25, False)
+        monkeypatch.setattr(settings, "notification_count_cap", 20)
+        page = await manager.get_user_notifications(db, user.id, page_size=10)
+        assert (page.total_count, page.total_is_estimate) == (20, True)
+
+        # Known from the page itself
+        with count_queries() as stats:
+            page = await manager.get_user_notifications(db, user.id, page_size=50)
+        assert page.total_count == 25
+        assert stats.count == 1
+
+        # Unread total from the unread counter
+        await manager.get_unread_count(db, user.id)
+        with count_queries() as stats:
+            page = await manager.get_user_notifications(db, user.id, page_size=2, is_read=False)
+        assert page.total_count == 5
+        assert page.next_cursor is not None
+        assert stats.count == 1
@@ -0,0 +1,116 @@
+"""Tests for the notification events pushed to websocket sessions.
+
+They run against PostgreSQL at TEST_DATABASE_URL, like test_notifications_batch.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from services.notifications.services.notification_manager import NotificationManager
+from services.notifications.services.realtime import RealtimePublisher
+from services.notifications.services.unread_counters import InMemoryUnreadCounters
+from shared.events import EventProducer
+
+
+class RecordingKafka:
+    """Builds clients that record what is sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, **config):
+        return self
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, headers=None):
+        self.sent.append((topic, key.decode(), json.loads(value)))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+class PresenceRedis:
+    """Serves the websocket presence hash; None when the hash does not exist."""
+
+    def __init__(self, online):
+        self.online = online
+
+    async def exists(self, key):
+        return int(self.online is not None)
+
+    async def hmget(self, key, fields):
+        return ["1" if field in self.online else None for field in fields]
+
+
+@pytest.fixture
+async def setup(session_factory, make_users):
+    users = await make_users("u0", "u1")
+    kafka = RecordingKafka()
+    producer = EventProducer("kafka:9092", producer_factory=kafka)
+    manager = NotificationManager()
+    manager.unread = InMemoryUnreadCounters()
+    manager.realtime = RealtimePublisher(producer, topic="notifications")
+    return manager, producer, kafka, users, session_factory
+
+
+def _notification(user_id, title):
+    return {"user_id": user_id, "type": "mention", "title": title, "message": "hi"}
+
+
+async def test_online_recipients_get_notifications_and_counts(setup):
+    manager, producer, kafka, (online, offline), session_factory = setup
+    async with session_factory() as db:
+        # Nothing is looked up or published while the producer is disconnected
+        await manager.create_notifications(db, [_notification(online.id, "first")])
+
+        await producer.start()
+        manager.redis_client = PresenceRedis({online.keycloak_id})
+        await manager.create_notifications(
+            db,
+            [
+                _notification(online.id, "second"),
+                _notification(online.id, "third"),
+                _notification(offline.id, "unseen"),
+            ],
+        )
+        page = await manager.get_user_notifications(db, online.id)
+        await manager.mark_as_read(db, page.notifications[0].id, online.id)
+        await producer.stop()
+
+    events = [(key, event["event_type"], event["data"]) for _, key, event in kafka.sent]
+    assert {topic for topic, _, _ in kafka.sent} == {"notifications"}
+    assert {key for key, _, _ in events} == {online.keycloak_id}
+    summary = [(event_type, data.get("title"), data.get("count")) for _, event_type, data in events]
+    assert summary == [
+        ("notification.created", "second", None),
+        ("notification.created", "third", None),
+        ("unread_count.changed", None, 3),
+        ("unread_count.changed", None, 2),
+    ]
+    created = events[0][2]
+    assert created["recipient_id"] == online.keycloak_id
+    assert created["notification_id"] in {str(n.id) for n in page.notifications}
+
+
+async def test_every_recipient_is_published_for_without_a_presence_hash(setup):
+    manager, producer, kafka, users, session_factory = setup
+    # The websocket service runs the in-memory client manager: no presence hash
+    manager.redis_client = PresenceRedis(None)
+    await producer.start()
+    async with session_factory() as db:
+        await manager.create_notifications(db, [_notification(user.id, "hi") for user in users])
+    await producer.stop()
+
+    counts = {
+        key: event["data"]["count"]
+        for _, key, event in kafka.sent
+        if event["event_type"] == "unread_count.changed"
+    }
+    assert counts == {user.keycloak_id: 1 for user in users}
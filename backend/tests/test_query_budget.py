@@ -0,0 +1,99 @@
+"""Tests for query counting and per-endpoint query budgets."""
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from shared.database import (
+    DatabaseMetricsMiddleware,
+    QueryBudgetExceeded,
+    count_queries,
+    instrument_engine,
+    query_budget,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    app = FastAPI()
+    app.add_middleware(DatabaseMetricsMiddleware)
+
+    def run_queries(count: int) -> None:
+        with engine.connect() as conn:
+            for index in range(count):
+                conn.execute(text(f"SELECT {index}"))
+
+    @app.get("/items")
+    @query_budget(2)
+    async def list_items():
+        run_queries(2)
+        return []
+
+    @app.get("/items/{item_id}")
+    @query_budget(1)
+    async def get_item(item_id: int):
+        run_queries(item_id)
+        return {"id": item_id}
+
+    # Services declare their endpoints on routers included in the app
+    router = APIRouter()
+
+    @router.get("/orders/{count}")
+    @query_budget(1)
+    async def list_orders(count: int):
+        run_queries(count)
+        return []
+
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_count_queries_records_statements(engine):
+    with count_queries() as stats:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+    assert stats.count == 2
+    assert stats.statements == ["SELECT 1", "SELECT 2"]
+
+
+def test_count_queries_reports_offending_statements(engine):
+    with pytest.raises(QueryBudgetExceeded) as exc_info:
+        with count_queries(budget=1, label="loop"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+    message = str(exc_info.value)
+    assert "loop executed 2 queries (budget: 1)" in message
+    assert "2. SELECT 2" in message
+
+
+def test_endpoint_within_budget(client):
+    assert client.get("/items").status_code == 200
+
+
+def test_endpoint_over_budget_fails(client):
+    with pytest.raises(QueryBudgetExceeded) as exc_info:
+        client.get("/items/3")
+
+    assert exc_info.value.label == "GET /items/{item_id}"
+    assert exc_info.value.stats.count == 3
+
+
+def test_included_router_endpoint_over_budget_fails(client):
+    assert client.get("/orders/1").status_code == 200
+    with pytest.raises(QueryBudgetExceeded) as exc_info:
+        client.get("/orders/2")
+
+    assert exc_info.value.label == "GET /orders/{count}"
@@ -0,0 +1,12 @@
+"""Tests for the websocket service.
+
+The service runs from services/websocket and imports its modules absolutely
+(``from config import settings``), so that directory goes first on the path.
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "services", "websocket"))
+)
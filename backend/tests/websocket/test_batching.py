@@ -0,0 +1,67 @@
+"""Tests for micro-batched room emits in the websocket service."""
+
+from services.batching import RoomBatcher
+from services.user_events import UserEventBatcher
+
+
+def _batcher(max_events=100):
+    emitted = []
+
+    async def emit(room, events):
+        emitted.append((room, events))
+
+    return RoomBatcher(emit, interval_seconds=0.02, max_events=max_events), emitted
+
+
+async def test_events_are_grouped_per_room_in_arrival_order():
+    batcher, emitted = _batcher()
+    await batcher.add("channel:1", "new_message", {"id": "m1"})
+    await batcher.add("channel:2", "reaction_added", {"emoji": "🎉"})
+    await batcher.add("channel:1", "message_deleted", {"message_id": "m1"})
+
+    assert emitted == []
+    await batcher.flush()
+
+    assert emitted == [
+        ("channel:1", [["new_message", {"id": "m1"}], ["message_deleted", {"message_id": "m1"}]]),
+        ("channel:2", [["reaction_added", {"emoji": "🎉"}]]),
+    ]
+    await batcher.flush()
+    assert len(emitted) == 2
+
+
+async def test_a_full_room_is_flushed_before_the_tick():
+    batcher, emitted = _batcher(max_events=2)
+    for index in range(3):
+        await batcher.add("channel:1", "new_message", {"id": f"m{index}"})
+
+    assert [len(events) for _, events in emitted] == [2]
+    await batcher.stop()
+    assert [len(events) for _, events in emitted] == [2, 1]
+
+
+async def test_user_batches_keep_only_the_latest_unread_count():
+    emitted = []
+
+    async def emit(user_id, events):
+        emitted.append((user_id, events))
+
+    batcher = UserEventBatcher(emit, interval_seconds=0.25)
+    await batcher.add("sub-1", "notification_created", {"notification_id": "n1"})
+    await batcher.add("sub-1", "unread_count_changed", {"count": 1})
+    await batcher.add("sub-1", "notification_created", {"notification_id": "n2"})
+    await batcher.add("sub-1", "unread_count_changed", {"count": 2})
+    await batcher.add("sub-2", "unread_count_changed", {"count": 0})
+    await batcher.flush()
+
+    assert emitted == [
+        (
+            "sub-1",
+            [
+                ["notification_created", {"notification_id": "n1"}],
+                ["notification_created", {"notification_id": "n2"}],
+                ["unread_count_changed", {"count": 2}],
+            ],
+        ),
+        ("sub-2", [["unread_count_changed", {"count": 0}]]),
+    ]
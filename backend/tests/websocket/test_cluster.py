@@ -0,0 +1,74 @@
+"""Tests for multi-node session, room and presence sharing in the websocket service."""
+
+from services.client_manager import InMemoryClientManager, InMemoryStore
+
+
+async def _cluster(*node_ids):
+    store = InMemoryStore()
+    nodes = [InMemoryClientManager(node_id, store) for node_id in node_ids]
+    received = {node.node_id: [] for node in nodes}
+    for node in nodes:
+        await node.start()
+
+        async def record(event, data, origin, node_id=node.node_id):
+            received[node_id].append((event, data, origin))
+
+        node.on_broadcast(record)
+    return nodes, received
+
+
+async def test_presence_is_shared_across_nodes():
+    (a, b), _ = await _cluster("a", "b")
+
+    assert await a.add_session("s1", "alice")
+    assert not await b.add_session("s2", "alice")  # already online via node a
+    assert await b.get_online_users() == ["alice"]
+    assert await b.online_status(["alice", "bob"]) == {"alice": True, "bob": False}
+
+    assert await a.remove_session("s1") == ("alice", False)
+    assert await b.is_online("alice")
+    assert await b.remove_session("s2") == ("alice", True)
+    assert not await a.is_online("alice")
+
+
+async def test_user_rooms_span_sessions_on_every_node():
+    (a, b), _ = await _cluster("a", "b")
+    await a.add_session("s1", "alice")
+    await b.add_session("s2", "alice")
+
+    await a.join_room("s1", "channel:1")
+    await b.join_room("s2", "channel:1")
+    await b.join_room("s2", "channel:2")
+    assert await a.user_rooms("alice") == {"channel:1", "channel:2"}
+
+    await b.remove_session("s2")
+    assert await a.user_rooms("alice") == {"channel:1"}
+
+
+async def test_rooms_are_local_for_emits_and_shared_for_counts():
+    (a, b), _ = await _cluster("a", "b")
+    await a.add_session("s1", "alice")
+    await b.add_session("s2", "bob")
+
+    await a.join_room("s1", "channel:1")
+    await b.join_room("s2", "channel:1")
+    await b.join_room("s2", "channel:2")
+
+    assert a.has_local_subscribers("channel:1")
+    assert not a.has_local_subscribers("channel:2")
+    assert await a.room_size("channel:1") == 2
+
+    await b.remove_session("s2")
+
+    assert await a.room_size("channel:1") == 1
+    assert await a.room_size("channel:2") == 0
+    assert not b.channel_rooms
+
+
+async def test_broadcasts_reach_every_node():
+    (a, b, c), received = await _cluster("a", "b", "c")
+
+    await b.broadcast("typing", {"channel_id": "1", "user_id": "bob"})
+
+    for node_id in ("a", "b", "c"):
+        assert received[node_id] == [("typing", {"channel_id": "1", "user_id": "bob"}, "b")]
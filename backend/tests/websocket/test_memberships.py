@@ -0,0 +1,107 @@
+"""Tests for the membership snapshot cache used to auto-join channel rooms."""
+
+import asyncio
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from services.client_manager import InMemoryClientManager, InMemoryStore
+from services.memberships import MembershipCache
+
+from shared.database import ChannelType
+
+
+def _cache(channel_ids, active=()):
+    fetches = []
+
+    async def fetch(token):
+        fetches.append(token)
+        await asyncio.sleep(0)
+        return {"user_id": "member-1", "channel_ids": list(channel_ids)}
+
+    cache = MembershipCache(fetch, ttl_seconds=60.0, is_active=lambda user_id: user_id in active)
+    return cache, fetches
+
+
+async def test_concurrent_connects_share_one_fetch_and_later_ones_hit_the_cache():
+    cache, fetches = _cache(["c1", "c2"])
+
+    first, second = await asyncio.gather(
+        cache.get("kc-1", "token", now=0.0), cache.get("kc-1", "token", now=0.0)
+    )
+    assert first.channel_ids == second.channel_ids == {"c1", "c2"}
+    assert await cache.get("kc-1", "token", now=30.0) is first
+    assert len(fetches) == 1
+
+    await cache.get("kc-1", "token", now=61.0)
+    assert len(fetches) == 2
+
+
+async def test_membership_events_update_snapshots_by_database_user_id():
+    cache, _ = _cache(["c1"])
+    await cache.get("kc-1", "token", now=0.0)
+
+    assert cache.channel_added("member-1", "c2") == "kc-1"
+    assert cache.channel_removed("member-1", "c1") == "kc-1"
+    assert cache.channel_added("someone-else", "c3") is None
+    cache.channel_deleted("c2")
+
+    assert not cache.is_member("kc-1", "c1")
+    assert not cache.is_member("kc-1", "c2")
+
+
+async def test_prune_keeps_snapshots_of_connected_users():
+    cache, _ = _cache(["c1"], active={"kc-1"})
+    await cache.get("kc-1", "token", now=0.0)
+    await cache.get("kc-2", "token", now=0.0)
+
+    cache.prune(now=120.0)
+
+    assert cache.is_member("kc-1", "c1")
+    assert not cache.is_member("kc-2", "c1")
+
+
+async def test_join_rooms_subscribes_a_session_in_bulk():
+    manager = InMemoryClientManager("a", InMemoryStore())
+    await manager.add_session("s1", "alice")
+
+    await manager.join_rooms("s1", ["channel:1", "channel:2", "channel:1"])
+
+    assert manager.rooms_of("s1") == {"channel:1", "channel:2"}
+    assert await manager.room_size("channel:1") == 1
+    assert await manager.user_rooms("alice") == {"channel:1", "channel:2"}
+
+
+def _channel_response(channel_type, is_member=False):
+    """GET /channels/{id} body, as ChannelResponse serializes it."""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": str(uuid4()),
+        "name": "general",
+        "channel_type": ChannelType(channel_type).value,
+        "description": None,
+        "topic": None,
+        "created_at": now,
+        "updated_at": now,
+        "member_count": 3,
+        "is_member": is_member,
+        "is_admin": False,
+        "unread_count": 0,
+    }
+
+
+async def test_only_public_channels_can_be_previewed_by_non_members(monkeypatch):
+    cache, _ = _cache([])
+    responses = {
+        "/channels/public": _channel_response(ChannelType.public),
+        "/channels/private": _channel_response(ChannelType.private),
+        "/channels/joined": _channel_response(ChannelType.private, is_member=True),
+    }
+
+    async def get_json(token, path):
+        return responses[path]
+
+    monkeypatch.setattr(cache, "_get_json", get_json)
+
+    assert await cache.can_preview("token", "public")
+    assert not await cache.can_preview("token", "private")
+    assert await cache.can_preview("token", "joined")
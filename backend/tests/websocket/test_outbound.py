@@ -0,0 +1,74 @@
+"""Tests for per-session outbound queues and backpressure in the websocket service."""
+
+from services.outbound import OutboundQueues, SessionQueue
+
+
+def _queues(backlogs, max_depth=10, max_lag_seconds=30.0):
+    sent, evicted = [], []
+
+    async def send(sid, event, payload):
+        sent.append((sid, event, payload))
+
+    async def disconnect(sid, hint):
+        evicted.append((sid, hint))
+
+    queues = OutboundQueues(
+        send,
+        lambda sid: backlogs.get(sid, 0),
+        disconnect,
+        slow_backlog=5,
+        max_depth=max_depth,
+        max_lag_seconds=max_lag_seconds,
+    )
+    return queues, sent, evicted
+
+
+def test_typing_and_presence_coalesce_while_messages_keep_order():
+    queue = SessionQueue(since=0.0)
+    queue.put("new_message", {"id": "m1"})
+    queue.put("typing_snapshot", {"channel_id": "c1", "typers": ["alice"]})
+    queue.put("presence_diff", {"users": {"alice": "online"}})
+    queue.put("new_message", {"id": "m2"})
+    queue.put("typing_snapshot", {"channel_id": "c1", "typers": []})
+    queue.put("presence_diff", {"users": {"alice": "offline", "bob": "online"}})
+
+    drained = [queue.get() for _ in range(len(queue))]
+
+    assert drained == [
+        ("new_message", {"id": "m1"}),
+        ("typing_snapshot", {"channel_id": "c1", "typers": []}),
+        ("presence_diff", {"users": {"alice": "offline", "bob": "online"}}),
+        ("new_message", {"id": "m2"}),
+    ]
+
+
+async def test_slow_sessions_are_diverted_and_drained_as_they_catch_up():
+    backlogs = {"slow": 8, "fast": 0}
+    queues, sent, _ = _queues(backlogs)
+    await queues.check(["slow", "fast"], now=0.0)
+
+    skipped = queues.divert({"slow", "fast"}, "new_message", {"id": "m1"})
+    await queues.emit_to("fast", "presence_diff", {"users": {}})
+    assert skipped == ["slow"]
+    assert sent == [("fast", "presence_diff", {"users": {}})]
+
+    backlogs["slow"] = 0
+    await queues.check(["slow", "fast"], now=1.0)
+    assert sent[-1] == ("slow", "new_message", {"id": "m1"})
+    assert queues.slow == {}
+
+
+async def test_sessions_behind_too_long_or_overflowing_are_evicted_with_a_hint():
+    backlogs = {"lagging": 8, "flooded": 8}
+    queues, sent, evicted = _queues(backlogs, max_depth=3, max_lag_seconds=30.0)
+    await queues.check(["lagging", "flooded"], now=0.0)
+
+    for index in range(5):
+        queues.divert({"flooded"}, "new_message", {"id": f"m{index}"})
+    await queues.check(["lagging", "flooded"], now=10.0)
+    assert evicted == [("flooded", {"reason": "slow_consumer"})]
+
+    await queues.check(["lagging"], now=31.0)
+    assert evicted[-1] == ("lagging", {"reason": "slow_consumer"})
+    assert queues.slow == {}
+    assert sent == []
@@ -0,0 +1,94 @@
+"""Tests for debounced, room-scoped presence in the websocket service."""
+
+from services.client_manager import PRESENCE_EVENT, InMemoryClientManager, InMemoryStore
+from services.presence import PresenceEngine
+
+
+async def _node(node_id, store):
+    manager = InMemoryClientManager(node_id, store)
+    diffs = {}
+
+    async def emit(sid, diff):
+        diffs.setdefault(sid, []).append(diff)
+
+    engine = PresenceEngine(manager, emit, grace_seconds=10.0, interval_seconds=1.0)
+
+    async def on_broadcast(event, data, origin):
+        if event == PRESENCE_EVENT:
+            engine.receive(data["changes"])
+
+    manager.on_broadcast(on_broadcast)
+    await manager.start()
+    return manager, engine, diffs
+
+
+async def test_reconnect_within_grace_period_emits_nothing():
+    manager, engine, diffs = await _node("a", InMemoryStore())
+    await engine.session_opened("bob-1", "bob")
+    await manager.join_room("bob-1", "channel:1")
+    await engine.flush()
+    diffs.clear()
+
+    await engine.session_opened("alice-1", "alice")
+    await manager.join_room("alice-1", "channel:1")
+    await engine.flush()
+    assert diffs == {"bob-1": [{"users": {"alice": "online"}}]}
+    diffs.clear()
+
+    await engine.session_closed("alice-1", now=0.0)
+    await engine.session_opened("alice-2", "alice")
+    await manager.join_room("alice-2", "channel:1")
+    await engine.publish_due(now=20.0)
+    await engine.flush_diffs()
+    assert diffs == {}
+
+    await engine.session_closed("alice-2", now=30.0)
+    await engine.publish_due(now=35.0)
+    await engine.flush_diffs()
+    assert diffs == {}
+    await engine.publish_due(now=40.0)
+    await engine.flush_diffs()
+    assert diffs == {"bob-1": [{"users": {"alice": "offline"}}]}
+
+
+async def test_changes_reach_shared_rooms_and_watchers_only():
+    store = InMemoryStore()
+    a, engine_a, diffs_a = await _node("a", store)
+    b, engine_b, diffs_b = await _node("b", store)
+
+    await engine_b.session_opened("bob-1", "bob")
+    await b.join_room("bob-1", "channel:1")
+    await engine_b.session_opened("carol-1", "carol")
+    await b.join_room("carol-1", "channel:2")
+    await engine_b.session_opened("dave-1", "dave")
+    assert await engine_b.subscribe("dave-1", ["alice"]) == {"alice": "offline"}
+    await engine_b.flush()
+    diffs_b.clear()
+
+    # Alice connects on node a; node b resolves the audience among its sockets
+    await engine_a.session_opened("alice-1", "alice")
+    await a.join_room("alice-1", "channel:1")
+    await engine_a.flush()
+    await engine_b.flush_diffs()
+
+    assert diffs_b == {
+        "bob-1": [{"users": {"alice": "online"}}],
+        "dave-1": [{"users": {"alice": "online"}}],
+    }
+    assert "alice-1" not in diffs_a
+
+
+async def test_changes_in_one_tick_batch_into_one_diff_per_session():
+    manager, engine, diffs = await _node("a", InMemoryStore())
+    await engine.session_opened("bob-1", "bob")
+    await manager.join_room("bob-1", "channel:1")
+    await engine.flush()
+    diffs.clear()
+
+    for user_id in ("alice", "carol", "dave"):
+        await engine.session_opened(f"{user_id}-1", user_id)
+        await manager.join_room(f"{user_id}-1", "channel:1")
+    await engine.status_changed("carol", "away")
+    await engine.flush()
+
+    assert diffs["bob-1"] == [{"users": {"alice": "online", "carol": "online", "dave": "online"}}]
@@ -0,0 +1,63 @@
+"""Tests for per-channel sequencing and reconnect replay in the websocket service."""
+
+from services.replay import ReplayBuffers
+
+
+def _seqs(events):
+    return [payload["seq"] for _, payload in events]
+
+
+def test_events_are_sequenced_per_channel():
+    buffers = ReplayBuffers(capacity=10)
+
+    first = buffers.stamp("c1", "new_message", {"id": "m1"})
+    buffers.stamp("c2", "new_message", {"id": "m2"})
+    second = buffers.stamp("c1", "message_deleted", {"message_id": "m1"})
+
+    assert (first["seq"], second["seq"]) == (1, 2)
+    assert first["epoch"] == second["epoch"] != buffers.buffers["c2"].epoch
+    assert second["channel_id"] == "c1"
+
+
+def test_replay_covers_the_gap_up_to_the_rejoin():
+    buffers = ReplayBuffers(capacity=10)
+    cursor = buffers.stamp("c1", "new_message", {"id": "m1"})
+    # Disconnected while three events happened
+    for index in range(2, 5):
+        buffers.stamp("c1", "new_message", {"id": f"m{index}"})
+
+    buffers.mark_joined("s2", "c1")
+    # Delivered live after the rejoin, so not part of the replay
+    buffers.stamp("c1", "new_message", {"id": "m5"})
+
+    events = buffers.missed("s2", "c1", cursor["epoch"], cursor["seq"])
+    assert _seqs(events) == [2, 3, 4]
+    assert [event for event, _ in events] == ["new_message"] * 3
+
+
+def test_evicted_gap_or_unknown_epoch_requires_a_refresh():
+    buffers = ReplayBuffers(capacity=3)
+    cursor = buffers.stamp("c1", "new_message", {"id": "m1"})
+    for index in range(2, 6):
+        buffers.stamp("c1", "new_message", {"id": f"m{index}"})
+    buffers.mark_joined("s2", "c1")
+
+    assert buffers.missed("s2", "c1", cursor["epoch"], cursor["seq"]) is None
+    assert buffers.missed("s2", "c1", "other-node", 4) is None
+    assert _seqs(buffers.missed("s2", "c1", cursor["epoch"], 3)) == [4, 5]
+    assert buffers.missed("s2", "c1", cursor["epoch"], 5) == []
+
+
+def test_buffers_outlive_their_last_subscriber_for_the_retention_period():
+    active = {"c1"}
+    buffers = ReplayBuffers(capacity=10, retention_seconds=60.0, is_active=active.__contains__)
+    buffers.stamp("c1", "new_message", {"id": "m1"}, now=0.0)
+    buffers.stamp("c2", "new_message", {"id": "m2"}, now=0.0)
+
+    buffers.prune(now=30.0)
+    active.clear()
+    buffers.prune(now=61.0)
+    assert set(buffers.buffers) == {"c1"}
+
+    buffers.prune(now=90.0)
+    assert buffers.buffers == {}
@@ -0,0 +1,149 @@
+"""Tests for routing and dispatch of Kafka events in the websocket service."""
+
+import asyncio
+import json
+import zlib
+
+from aiokafka import TopicPartition
+from aiokafka.structs import ConsumerRecord
+from services.kafka_consumer import KafkaConsumerService
+
+
+async def _noop(event):
+    pass
+
+
+def _record(topic, value, key=None, headers=(), partition=0, offset=0):
+    raw = json.dumps(value).encode() if isinstance(value, dict) else value
+    return ConsumerRecord(
+        topic, partition, offset, 0, 0, key, raw, None, 0, len(raw), list(headers)
+    )
+
+
+def _consumer(*subscribed):
+    consumer = KafkaConsumerService()
+    consumer.register_handler("messages", _noop, keyed_by_channel=True)
+    consumer.register_handler("reactions", _noop)
+    consumer.register_handler("user_status", _noop, channel_scoped=False)
+    consumer.set_subscription_filter(lambda channel_id: channel_id in subscribed)
+    return consumer
+
+
+def test_unsubscribed_channel_is_dropped_before_decoding():
+    consumer = _consumer("c1")
+    # Invalid JSON proves the value was never decoded
+    by_key = _record("messages", b"not json", key=b"c2")
+    by_header = _record("reactions", b"not json", key=b"m1", headers=[("channel_id", b"c2")])
+
+    assert consumer.route(by_key) is None
+    assert consumer.route(by_header) is None
+
+
+def test_subscribed_and_global_events_are_routed():
+    consumer = _consumer("c1")
+    event = {"event_type": "message.created", "data": {"channel_id": "c1"}}
+
+    routed = consumer.route(_record("messages", event, key=b"c1"))
+    assert routed == {**event, "version": 1, "occurred_at": None, "source": None}
+    status = {"user_id": "u", "status": "away"}
+    assert consumer.route(_record("user_status", status)) == status
+
+
+def test_events_without_header_are_filtered_after_decoding():
+    consumer = _consumer("c1")
+    event = {"event_type": "reaction.added", "data": {"channel_id": "c2"}}
+
+    # Reactions are keyed by message id, so the key says nothing about the channel
+    assert consumer.route(_record("reactions", event, key=b"m1")) is None
+
+
+def test_user_keyed_events_are_dropped_without_a_local_session():
+    consumer = KafkaConsumerService()
+    consumer.register_handler("notifications", _noop, channel_scoped=False, keyed_by_user=True)
+    consumer.set_session_filter(lambda user_id: user_id == "sub-1")
+    event = {"event_type": "unread_count.changed", "data": {"recipient_id": "sub-1", "count": 3}}
+
+    assert consumer.route(_record("notifications", b"not json", key=b"sub-2")) is None
+    assert consumer.route(_record("notifications", event, key=b"sub-1"))["data"]["count"] == 3
+
+
+async def test_dispatch_keeps_channel_order_while_channels_run_in_parallel():
+    handled = []
+    release_slow = asyncio.Event()
+
+    async def handler(event):
+        channel_id = event["data"]["channel_id"]
+        if channel_id == "slow":
+            await release_slow.wait()
+        handled.append((channel_id, event["data"]["seq"]))
+
+    consumer = KafkaConsumerService()
+    consumer.register_handler("messages", handler, keyed_by_channel=True)
+    consumer.start_workers()
+    records = [
+        _record("messages", {"data": {"channel_id": channel, "seq": seq}}, key=channel.encode())
+        for seq in range(3)
+        for channel in ("slow", "fast")
+    ]
+
+    try:
+        await consumer.dispatch(TopicPartition("messages", 0), records)
+        await asyncio.sleep(0.01)
+        # The slow channel's first handler is blocked; the other channel is done
+        assert handled == [("fast", 0), ("fast", 1), ("fast", 2)]
+
+        release_slow.set()
+        await asyncio.gather(*(queue.join() for queue in consumer.queues))
+        assert [seq for channel, seq in handled if channel == "slow"] == [0, 1, 2]
+    finally:
+        await consumer.stop()
+
+
+class PausingConsumer:
+    """Records the pause/seek calls dispatch makes on the Kafka client."""
+
+    def __init__(self):
+        self.paused, self.seeks = [], []
+
+    def pause(self, *partitions):
+        self.paused.extend(partitions)
+
+    def seek(self, tp, offset):
+        self.seeks.append((tp, offset))
+
+
+async def test_a_full_queue_pauses_only_its_partition():
+    def queue_of(channel):
+        return zlib.crc32(channel.encode()) % 2
+
+    hot = "c0"
+    cool = next(f"c{i}" for i in range(1, 100) if queue_of(f"c{i}") != queue_of(hot))
+
+    consumer = KafkaConsumerService()
+    consumer.register_handler("messages", _noop, keyed_by_channel=True)
+    consumer.consumer = PausingConsumer()
+    # Queues without workers: nothing drains them
+    consumer.queues = [asyncio.Queue(maxsize=2) for _ in range(2)]
+
+    def records(channel, partition, count):
+        return [
+            _record(
+                "messages",
+                {"data": {"channel_id": channel, "seq": offset}},
+                key=channel.encode(),
+                partition=partition,
+                offset=offset,
+            )
+            for offset in range(count)
+        ]
+
+    hot_tp, cool_tp = TopicPartition("messages", 0), TopicPartition("messages", 1)
+    await asyncio.wait_for(consumer.dispatch(hot_tp, records(hot, 0, 4)), timeout=1)
+    await asyncio.wait_for(consumer.dispatch(cool_tp, records(cool, 1, 2)), timeout=1)
+
+    # The hot partition stops at its third record and is fetched again from there
+    assert consumer.consumer.paused == [hot_tp]
+    assert consumer.consumer.seeks == [(hot_tp, 2)]
+    assert consumer.queues[queue_of(hot)].qsize() == 2
+    # The other partition's records still reach their queue
+    assert consumer.queues[queue_of(cool)].qsize() == 2
@@ -0,0 +1,55 @@
+"""Tests for typing indicator throttling, coalescing and expiry."""
+
+from services.typing_indicators import TypingAggregator
+
+
+async def _no_emit(channel_id, snapshot):
+    pass
+
+
+def _aggregator():
+    return TypingAggregator(_no_emit, throttle_seconds=1.0, ttl_seconds=5.0, interval_seconds=0.5)
+
+
+def test_throttle_limits_relays_per_user_but_passes_stops():
+    typing = _aggregator()
+
+    assert typing.accept("c1", "alice", True, now=0.0)
+    assert not typing.accept("c1", "alice", True, now=0.5)
+    assert typing.accept("c1", "bob", True, now=0.5)
+    assert typing.accept("c1", "alice", False, now=0.6)
+    assert typing.accept("c1", "alice", True, now=0.7)
+
+
+def test_typers_coalesce_into_one_snapshot_per_changed_channel():
+    typing = _aggregator()
+    for user_id in ("alice", "bob", "alice"):
+        typing.update("c1", user_id, True, username=user_id, now=0.0)
+
+    snapshots = typing.snapshots()
+
+    assert len(snapshots) == 1
+    channel_id, snapshot = snapshots[0]
+    assert channel_id == "c1"
+    assert [typer["user_id"] for typer in snapshot["typers"]] == ["alice", "bob"]
+
+    # A refresh from an existing typer changes nothing, so nothing is re-emitted
+    typing.update("c1", "alice", True, now=1.0)
+    assert typing.snapshots() == []
+
+
+def test_stale_typers_expire_and_emit_an_updated_snapshot():
+    typing = _aggregator()
+    typing.update("c1", "alice", True, now=0.0)
+    typing.update("c1", "bob", True, now=3.0)
+    typing.snapshots()
+
+    typing.expire(now=5.5)
+
+    [(_, snapshot)] = typing.snapshots()
+    assert [typer["user_id"] for typer in snapshot["typers"]] == ["bob"]
+
+    typing.expire(now=9.0)
+    [(_, snapshot)] = typing.snapshots()
+    assert snapshot["typers"] == []
+    assert typing.channels == {}
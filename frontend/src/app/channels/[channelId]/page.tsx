@@ -23,7 +23,7 @@ export default function ChannelPage({ params }: ChannelPageProps) {
   const { channelId } = use(params);
   const queryClient = useQueryClient();
   const { user: currentUser } = useAuthStore();
-  const { joinChannel, leaveChannel, onNewMessage, onMessageUpdated, onMessageDeleted, onTyping, onReactionAdded, onReactionRemoved } = useWebSocket();
+  const { joinChannel, leaveChannel, onNewMessage, onMessageUpdated, onMessageDeleted, onTypingSnapshot, onReactionAdded, onReactionRemoved } = useWebSocket();
   const [typingUsers, setTypingUsers] = useState<Map<string, string>>(new Map()); // userId -> username
   const [selectedThread, setSelectedThread] = useState<Message | null>(null);
 
@@ -259,37 +259,25 @@ export default function ChannelPage({ params }: ChannelPageProps) {
     return unsubscribe;
   }, [channelId, onMessageDeleted, queryClient]);
 
-  // Listen for typing indicators
+  // Listen for typing snapshots; the server expires stale typers
   useEffect(() => {
     const currentUserId = currentUser?.id;
 
-    const unsubscribe = onTyping((data) => {
-      if (data.channelId === channelId && data.userId !== currentUserId) {
-        setTypingUsers((prev) => {
-          const next = new Map(prev);
-          if (data.isTyping) {
-            // Use display name from the event, with fallback to username or user ID
-            const displayName = data.displayName || data.username || data.userId;
-            next.set(data.userId, displayName);
-
-            // Auto-remove after 3 seconds
-            setTimeout(() => {
-              setTypingUsers((current) => {
-                const updated = new Map(current);
-                updated.delete(data.userId);
-                return updated;
-              });
-            }, 3000);
-          } else {
-            next.delete(data.userId);
-          }
-          return next;
-        });
+    const unsubscribe = onTypingSnapshot((data) => {
+      if (data.channelId === channelId) {
+        setTypingUsers(
+          new Map(
+            data.typers
+              .filter((typer) => typer.userId !== currentUserId)
+              // Use display name from the event, with fallback to username or user ID
+              .map((typer): [string, string] => [typer.userId, typer.displayName || typer.username || typer.userId])
+          )
+        );
       }
     });
 
     return unsubscribe;
-  }, [channelId, onTyping, currentUser?.id]);
+  }, [channelId, onTypingSnapshot, currentUser?.id]);
 
   // Listen for reaction added
   useEffect(() => {
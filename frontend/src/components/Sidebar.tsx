@@ -19,7 +19,7 @@ export function Sidebar() {
   const router = useRouter();
   const queryClient = useQueryClient();
   const { user, logout } = useAuthStore();
-  const { onlineUsers } = useWebSocket();
+  const { onlineUsers, isConnected, subscribePresence } = useWebSocket();
   const [channelsExpanded, setChannelsExpanded] = useState(true);
   const [directMessagesExpanded, setDirectMessagesExpanded] = useState(true);
   const [showCreateChannelModal, setShowCreateChannelModal] = useState(false);
@@ -97,6 +97,14 @@ export function Sidebar() {
     })
     .slice(0, 12);
 
+  // DM candidates may not share a channel with us, so watch their presence explicitly
+  const dmUserIds = dmUsers.map(u => u.keycloak_id).filter(Boolean).join(',');
+  useEffect(() => {
+    if (isConnected && dmUserIds) {
+      subscribePresence(dmUserIds.split(','));
+    }
+  }, [isConnected, dmUserIds, subscribePresence]);
+
   // Debug: Log online users state
   console.log('🔍 Sidebar - Online users:', {
     count: onlineUsers.size,
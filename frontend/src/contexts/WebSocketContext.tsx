@@ -2,6 +2,7 @@
 
 import { createContext, useContext, useEffect, useState, useCallback, useRef } from 'react';
 import { io, Socket } from 'socket.io-client';
+import { useQueryClient } from '@tanstack/react-query';
 import { useAuthStore } from '@/store/authStore';
 import { config } from '@/lib/config';
 import type { Message } from '@/types';
@@ -14,6 +15,12 @@ interface ReactionData {
   emoji: string;
 }
 
+// Last sequenced event seen in a channel, sent back on reconnect to replay what was missed
+interface ChannelCursor {
+  epoch: string;
+  seq: number;
+}
+
 interface WebSocketContextType {
   socket: Socket | null;
   isConnected: boolean;
@@ -22,15 +29,36 @@ interface WebSocketContextType {
   leaveChannel: (channelId: string) => void;
   sendMessage: (channelId: string, content: string) => void;
   sendTyping: (channelId: string, isTyping: boolean) => void;
+  subscribePresence: (userIds: string[]) => void;
   onNewMessage: (callback: (message: Message) => void) => () => void;
   onMessageUpdated: (callback: (message: Message) => void) => () => void;
   onMessageDeleted: (callback: (messageId: string) => void) => () => void;
   onTyping: (callback: (data: { userId: string; channelId: string; isTyping: boolean; username?: string; displayName?: string }) => void) => () => void;
+  onTypingSnapshot: (callback: (data: TypingSnapshot) => void) => () => void;
   onUserStatusChange: (callback: (data: { userId: string; status: string }) => void) => () => void;
   onReactionAdded: (callback: (data: ReactionData) => void) => () => void;
   onReactionRemoved: (callback: (data: ReactionData) => void) => () => void;
 }
 
+// Everyone currently typing in a channel, sent whenever that set changes
+export interface TypingSnapshot {
+  channelId: string;
+  typers: { userId: string; username?: string; displayName?: string }[];
+}
+
+// Apply { user_id: status } presence updates to the set of online users
+function applyPresence(prev: Set<string>, users: Record<string, string>): Set<string> {
+  const next = new Set(prev);
+  Object.entries(users).forEach(([userId, status]) => {
+    if (status === 'offline') {
+      next.delete(userId);
+    } else {
+      next.add(userId);
+    }
+  });
+  return next;
+}
+
 const WebSocketContext = createContext<WebSocketContextType | null>(null);
 
 export function useWebSocket() {
@@ -53,6 +81,8 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
   const isAuthenticated = useAuthStore((state) => state.isAuthenticated);
   const socketRef = useRef<Socket | null>(null);
   const joinedChannelsRef = useRef<Set<string>>(new Set());
+  const cursorsRef = useRef<Record<string, ChannelCursor>>({});
+  const queryClient = useQueryClient();
 
   // Initialize WebSocket connection
   useEffect(() => {
@@ -93,6 +123,26 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
       console.log('✅ WebSocket connected:', newSocket.id);
       setIsConnected(true);
 
+      // After a reconnect, catch up on missed channel events; channels the
+      // server can no longer replay are refetched
+      if (Object.keys(cursorsRef.current).length > 0) {
+        newSocket.emit(
+          'resume',
+          { channels: cursorsRef.current },
+          (response: { replayed?: number; refresh?: string[] }) => {
+            const refresh = response?.refresh || [];
+            refresh.forEach((channelId) => {
+              delete cursorsRef.current[channelId];
+              queryClient.invalidateQueries({ queryKey: ['messages', channelId] });
+            });
+            if (refresh.length > 0) {
+              queryClient.invalidateQueries({ queryKey: ['channels'] });
+            }
+            console.log('🔁 Resumed:', response?.replayed, 'replayed,', refresh.length, 'to refresh');
+          }
+        );
+      }
+
       // Fetch initial list of online users
       fetch(`${config.websocketUrl}/online-users`)
         .then(res => res.json())
@@ -110,25 +160,35 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
       joinedChannelsRef.current.clear();
     });
 
-    // Listen for users coming online
-    newSocket.on('user_online', (data: { user_id: string }) => {
-      console.log('👤 User online:', data.user_id);
-      setOnlineUsers(prev => {
-        const newSet = new Set(prev);
-        newSet.add(data.user_id);
-        console.log('📊 Updated online users (after add):', Array.from(newSet));
-        return newSet;
+    // Micro-batched room events: [[event, payload], ...] dispatched in order
+    // to the same listeners as individually emitted events
+    newSocket.on('batch', (events: [string, unknown][]) => {
+      events.forEach(([event, payload]) => {
+        newSocket.listenersAny().forEach((listener) => listener(event, payload));
+        newSocket.listeners(event).forEach((listener) => listener(payload));
       });
     });
 
-    // Listen for users going offline
-    newSocket.on('user_offline', (data: { user_id: string }) => {
-      console.log('👤 User offline:', data.user_id);
-      setOnlineUsers(prev => {
-        const newSet = new Set(prev);
-        newSet.delete(data.user_id);
-        return newSet;
-      });
+    // Sent before the server drops a connection that fell too far behind;
+    // the reconnect resumes from the cursors below
+    newSocket.on('resync', (data: { reason: string }) => {
+      console.warn('⚠️  WebSocket resync requested:', data.reason);
+    });
+
+    // Track the newest sequenced event per channel (replays may arrive late)
+    newSocket.onAny((_event, data) => {
+      if (data && data.channel_id && data.epoch && typeof data.seq === 'number') {
+        const cursor = cursorsRef.current[data.channel_id];
+        if (!cursor || cursor.epoch !== data.epoch || cursor.seq < data.seq) {
+          cursorsRef.current[data.channel_id] = { epoch: data.epoch, seq: data.seq };
+        }
+      }
+    });
+
+    // Presence changes of users sharing a channel or DM with us (or that we
+    // subscribed to), batched by the server: { users: { user_id: status } }
+    newSocket.on('presence_diff', (data: { users: Record<string, string> }) => {
+      setOnlineUsers(prev => applyPresence(prev, data.users));
     });
 
     newSocket.on('connect_error', (error) => {
@@ -151,7 +211,7 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
         newSocket.disconnect();
       }
     };
-  }, [isAuthenticated, tokens?.access_token]);
+  }, [isAuthenticated, tokens?.access_token, queryClient]);
 
   // Join a channel (with deduplication)
   const joinChannel = useCallback((channelId: string) => {
@@ -197,6 +257,21 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
     }
   }, []);
 
+  // Watch presence of users we don't necessarily share a channel with
+  const subscribePresence = useCallback((userIds: string[]) => {
+    if (socketRef.current?.connected && userIds.length > 0) {
+      socketRef.current.emit(
+        'subscribe_presence',
+        { user_ids: userIds },
+        (response: { users?: Record<string, string> }) => {
+          if (response?.users) {
+            setOnlineUsers(prev => applyPresence(prev, response.users!));
+          }
+        }
+      );
+    }
+  }, []);
+
   // Listen for new messages
   const onNewMessage = useCallback((callback: (message: Message) => void) => {
     if (!socketRef.current) return () => {};
@@ -263,6 +338,28 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
     };
   }, []);
 
+  // Listen for coalesced "who is typing" snapshots
+  const onTypingSnapshot = useCallback((callback: (data: TypingSnapshot) => void) => {
+    if (!socketRef.current) return () => {};
+
+    const handler = (data: { channel_id: string; typers: { user_id: string; username?: string; display_name?: string }[] }) => {
+      callback({
+        channelId: data.channel_id,
+        typers: data.typers.map((typer) => ({
+          userId: typer.user_id,
+          username: typer.username,
+          displayName: typer.display_name,
+        })),
+      });
+    };
+
+    socketRef.current.on('typing_snapshot', handler);
+
+    return () => {
+      socketRef.current?.off('typing_snapshot', handler);
+    };
+  }, []);
+
   // Listen for user status changes
   const onUserStatusChange = useCallback((callback: (data: { userId: string; status: string }) => void) => {
     if (!socketRef.current) return () => {};
@@ -319,10 +416,12 @@ export function WebSocketProvider({ children }: WebSocketProviderProps) {
     leaveChannel,
     sendMessage,
     sendTyping,
+    subscribePresence,
     onNewMessage,
     onMessageUpdated,
     onMessageDeleted,
     onTyping,
+    onTypingSnapshot,
     onUserStatusChange,
     onReactionAdded,
     onReactionRemoved,
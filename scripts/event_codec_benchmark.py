@@ -0,0 +1,144 @@
+"""Encode/decode benchmark for the inter-service event envelope.
+
+Compares the JSON and msgpack encodings of shared.events.envelope on events
+shaped like the ones services publish (a message with attachments, a
+reaction, a membership change), plus the legacy ``{"event_type", "data"}``
+JSON the services used to send. Reports encode and decode throughput and
+the payload size per event.
+
+Usage:
+    python scripts/event_codec_benchmark.py
+    python scripts/event_codec_benchmark.py --iterations 200000 --output codec_report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from shared.events.envelope import decode_event, encode_event, make_envelope  # noqa: E402
+
+SAMPLE_EVENTS = {
+    "message.created": {
+        "id": "7d2c4c1e-0a55-4c1b-9b1f-3f6a8d7e2b10",
+        "content": "Deploy finished, dashboards look healthy. Ping me if anything regresses.",
+        "channel_id": "2a8f0b6e-5c3d-4e7a-8f1b-9c0d1e2f3a4b",
+        "author_id": "6b1f2c1e-3c55-4d0a-9d4b-2f0d3c4b5a69",
+        "thread_id": None,
+        "parent_message_id": None,
+        "message_type": "text",
+        "created_at": "2026-01-01T12:00:00+00:00",
+        "author_username": "grace",
+        "author_display_name": "Grace Hopper",
+        "attachments": [
+            {
+                "id": "0f1e2d3c-4b5a-4968-8776-655443322110",
+                "original_filename": "latency.png",
+                "file_url": "http://minio:9000/files/latency.png",
+                "thumbnail_url": "http://minio:9000/thumbnails/latency.png",
+                "size_bytes": 48213,
+                "mime_type": "image/png",
+            }
+        ],
+    },
+    "reaction.added": {
+        "id": "9e8d7c6b-5a49-4837-a261-504f3e2d1c0b",
+        "message_id": "7d2c4c1e-0a55-4c1b-9b1f-3f6a8d7e2b10",
+        "channel_id": "2a8f0b6e-5c3d-4e7a-8f1b-9c0d1e2f3a4b",
+        "user_id": "6b1f2c1e-3c55-4d0a-9d4b-2f0d3c4b5a69",
+        "username": "grace",
+        "emoji": "🎉",
+        "created_at": "2026-01-01T12:00:01+00:00",
+    },
+    "member.added": {
+        "channel_id": "2a8f0b6e-5c3d-4e7a-8f1b-9c0d1e2f3a4b",
+        "user_id": "1c2d3e4f-5a6b-4c7d-8e9f-0a1b2c3d4e5f",
+        "added_by": "6b1f2c1e-3c55-4d0a-9d4b-2f0d3c4b5a69",
+        "added_at": "2026-01-01T12:00:02+00:00",
+    },
+}
+
+
+def legacy_encode(event_type: str, data: dict) -> bytes:
+    return json.dumps({"event_type": event_type, "data": data}, default=str).encode("utf-8")
+
+
+def legacy_decode(raw: bytes) -> dict:
+    return json.loads(raw.decode("utf-8"))
+
+
+def rate(operation: Callable[[], object], iterations: int) -> float:
+    """Operations per second."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - started)
+
+
+def run(event_type: str, data: dict, iterations: int) -> List[Dict]:
+    envelope = make_envelope(event_type, data, source="benchmark")
+    codecs = {
+        "legacy-json": (
+            lambda: legacy_encode(event_type, data),
+            legacy_decode,
+        ),
+        "json": (
+            lambda: encode_event(envelope, "json"),
+            decode_event,
+        ),
+        "msgpack": (
+            lambda: encode_event(envelope, "msgpack"),
+            decode_event,
+        ),
+    }
+    results = []
+    for name, (encode, decode) in codecs.items():
+        raw = encode()
+        results.append(
+            {
+                "event_type": event_type,
+                "encoding": name,
+                "bytes": len(raw),
+                "encode_per_second": round(rate(encode, iterations)),
+                "decode_per_second": round(
+                    rate(lambda decode=decode, raw=raw: decode(raw), iterations)
+                ),
+            }
+        )
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark event envelope encodings")
+    parser.add_argument("--iterations", type=int, default=50_000, help="Operations per measurement")
+    parser.add_argument("--output", help="Optional JSON report path")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    results = []
+    header = f"{'event':<16} {'encoding':<12} {'bytes':>6} {'encode/s':>12} {'decode/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for event_type, data in SAMPLE_EVENTS.items():
+        for result in run(event_type, data, args.iterations):
+            results.append(result)
+            print(
+                f"{event_type:<16} {result['encoding']:<12} {result['bytes']:>6} "
+                f"{result['encode_per_second']:>12,} {result['decode_per_second']:>12,}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
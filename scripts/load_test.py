@@ -0,0 +1,610 @@
+"""Async HTTP load harness for the Colink services.
+
+Simulates users running weighted scenarios (login, sidebar, scroll history,
+send message, react, open thread, upload file) against the docker-compose
+stack and reports latency percentiles and throughput per endpoint as JSON.
+
+Usage:
+    # Closed loop: 50 virtual users with 1s think time for two minutes
+    python scripts/load_test.py --concurrency 50 --duration 120
+
+    # Open loop: 200 scenario arrivals per second (Poisson)
+    python scripts/load_test.py --rate 200 --duration 60
+
+    # Act as users generated by shared.testing.datagen (no Keycloak needed)
+    python scripts/load_test.py --auth seeded --profile medium --concurrency 100
+
+In seeded mode the harness mints unsigned tokens whose subject is the seeded
+user's keycloak_id. The services decode tokens without verifying signatures,
+so this only works against local or test deployments seeded with
+``python -m shared.testing.datagen``; the login scenario is skipped.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# Configuration
+SERVICE_URLS = {
+    "auth": os.getenv("AUTH_PROXY_URL", "http://localhost:8001"),
+    "message": os.getenv("MESSAGE_SERVICE_URL", "http://localhost:8002"),
+    "channel": os.getenv("CHANNEL_SERVICE_URL", "http://localhost:8003"),
+    "threads": os.getenv("THREADS_SERVICE_URL", "http://localhost:8005"),
+    "reactions": os.getenv("REACTIONS_SERVICE_URL", "http://localhost:8006"),
+    "files": os.getenv("FILES_SERVICE_URL", "http://localhost:8007"),
+    "notifications": os.getenv("NOTIFICATIONS_SERVICE_URL", "http://localhost:8008"),
+}
+
+DEFAULT_CREDENTIALS = "david:password123,emma:password123,frank:password123,grace:password123"
+EMOJIS = ["👍", "❤️", "😂", "🎉", "👀", "🚀"]
+MAX_RECENT_MESSAGES = 50
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class Series:
+    """Latencies and outcomes recorded under one label."""
+
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    status_codes: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self, elapsed: float) -> Dict:
+        values = sorted(self.latencies_ms)
+        count = len(values)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "latency_ms": {
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "p99": round(percentile(values, 99), 2),
+                "mean": round(sum(values) / count, 2) if count else 0.0,
+                "max": round(values[-1], 2) if values else 0.0,
+            },
+        }
+
+
+class Recorder:
+    """Collects per-endpoint and per-scenario samples."""
+
+    def __init__(self):
+        self.endpoints: Dict[str, Series] = defaultdict(Series)
+        self.scenarios: Dict[str, Series] = defaultdict(Series)
+        self.dropped_arrivals = 0
+        self.started = time.perf_counter()
+
+    def record(self, series: Series, elapsed_ms: float, status: str, ok: bool) -> None:
+        series.latencies_ms.append(elapsed_ms)
+        series.status_codes[status] += 1
+        if not ok:
+            series.errors += 1
+
+    def report(self, config: Dict) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        total = sum(len(series.latencies_ms) for series in self.endpoints.values())
+        errors = sum(series.errors for series in self.endpoints.values())
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "config": config,
+            "duration_s": round(elapsed, 2),
+            "totals": {
+                "requests": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "rps": round(total / elapsed, 2) if elapsed else 0.0,
+                "dropped_arrivals": self.dropped_arrivals,
+            },
+            "endpoints": {label: s.summary(elapsed) for label, s in sorted(self.endpoints.items())},
+            "scenarios": {name: s.summary(elapsed) for name, s in sorted(self.scenarios.items())},
+        }
+
+
+# ============================================================================
+# Virtual users
+# ============================================================================
+
+
+def unsigned_token(subject: str) -> str:
+    """Build an unsigned JWT the services will accept for ``subject``."""
+
+    def encode(payload: Dict) -> str:
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    claims = {"sub": subject, "exp": int(time.time()) + 24 * 3600}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.load-test"
+
+
+class VirtualUser:
+    """One simulated user: credentials plus the ids it has seen so far."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        username: str,
+        password: Optional[str] = None,
+        token: Optional[str] = None,
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.password = password
+        self.token = token
+        self.channel_ids: List[str] = []
+        self.message_ids: List[str] = []
+
+    async def request(
+        self,
+        label: str,
+        method: str,
+        service: str,
+        path: str,
+        ok_statuses: Tuple[int, ...] = (),
+        **kwargs,
+    ) -> Optional[httpx.Response]:
+        """Send a request and record it under ``label`` (a route template)."""
+        headers = kwargs.pop("headers", {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, f"{SERVICE_URLS[service]}{path}", headers=headers, **kwargs
+            )
+        except httpx.HTTPError as e:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.recorder.record(self.recorder.endpoints[label], elapsed_ms, type(e).__name__, False)
+            return None
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ok = response.status_code < 400 or response.status_code in ok_statuses
+        self.recorder.record(
+            self.recorder.endpoints[label], elapsed_ms, str(response.status_code), ok
+        )
+        return response if ok else None
+
+    def remember_messages(self, message_ids: List[str]) -> None:
+        self.message_ids = (self.message_ids + message_ids)[-MAX_RECENT_MESSAGES:]
+
+    async def login(self) -> bool:
+        response = await self.request(
+            "POST /auth/login",
+            "POST",
+            "auth",
+            "/auth/login",
+            json={"username": self.username, "password": self.password},
+        )
+        if response is None:
+            return False
+        self.token = response.json()["access_token"]
+        return True
+
+
+# ============================================================================
+# Scenarios
+# ============================================================================
+
+
+async def scenario_login(user: VirtualUser, rng: random.Random) -> bool:
+    """Log in again and fetch the profile, as on app start."""
+    if not await user.login():
+        return False
+    return await user.request("GET /auth/me", "GET", "auth", "/auth/me") is not None
+
+
+async def scenario_sidebar(user: VirtualUser, rng: random.Random) -> bool:
+    """Load the channel list with unread counts and the notification badge."""
+    response = await user.request("GET /channels", "GET", "channel", "/channels")
+    if response is None:
+        return False
+    user.channel_ids = [channel["id"] for channel in response.json()["channels"]]
+    badge = await user.request(
+        "GET /notifications/unread/count", "GET", "notifications", "/notifications/unread/count"
+    )
+    return badge is not None
+
+
+async def scenario_scroll_history(
+    user: VirtualUser, rng: random.Random, pages: int = 3
+) -> bool:
+    """Open a channel and scroll back through a few pages of history."""
+    if not user.channel_ids and not await scenario_sidebar(user, rng):
+        return False
+    if not user.channel_ids:
+        return True
+
+    channel_id = rng.choice(user.channel_ids)
+    params = {"limit": 50}
+    for _ in range(pages):
+        response = await user.request(
+            "GET /channels/{channel_id}/messages",
+            "GET",
+            "message",
+            f"/channels/{channel_id}/messages",
+            params=params,
+        )
+        if response is None:
+            return False
+        body = response.json()
+        user.remember_messages([message["id"] for message in body["messages"]])
+        if not body["has_more"] or not body.get("next_cursor"):
+            break
+        params = {"limit": 50, "before": body["next_cursor"]}
+    return True
+
+
+async def scenario_send_message(user: VirtualUser, rng: random.Random) -> bool:
+    """Post a message to one of the user's channels."""
+    if not user.channel_ids and not await scenario_sidebar(user, rng):
+        return False
+    if not user.channel_ids:
+        return True
+
+    response = await user.request(
+        "POST /messages",
+        "POST",
+        "message",
+        "/messages",
+        json={
+            "channel_id": rng.choice(user.channel_ids),
+            "content": f"load test message {rng.getrandbits(32):08x}",
+        },
+    )
+    if response is None:
+        return False
+    user.remember_messages([response.json()["id"]])
+    return True
+
+
+async def scenario_react(user: VirtualUser, rng: random.Random) -> bool:
+    """React to a recently seen message (an existing reaction is not an error)."""
+    if not user.message_ids and not await scenario_scroll_history(user, rng, pages=1):
+        return False
+    if not user.message_ids:
+        return True
+
+    response = await user.request(
+        "POST /messages/{message_id}/reactions",
+        "POST",
+        "reactions",
+        f"/messages/{rng.choice(user.message_ids)}/reactions",
+        ok_statuses=(409,),
+        json={"emoji": rng.choice(EMOJIS)},
+    )
+    return response is not None
+
+
+async def scenario_open_thread(user: VirtualUser, rng: random.Random) -> bool:
+    """Open a message's thread: the parent message followed by its replies."""
+    if not user.message_ids and not await scenario_scroll_history(user, rng, pages=1):
+        return False
+    if not user.message_ids:
+        return True
+
+    message_id = rng.choice(user.message_ids)
+    parent = await user.request(
+        "GET /messages/{message_id}", "GET", "message", f"/messages/{message_id}"
+    )
+    if parent is None:
+        return False
+    replies = await user.request(
+        "GET /messages/{message_id}/replies",
+        "GET",
+        "threads",
+        f"/messages/{message_id}/replies",
+        params={"limit": 50},
+    )
+    return replies is not None
+
+
+async def scenario_upload_file(user: VirtualUser, rng: random.Random) -> bool:
+    """Upload a small text attachment to one of the user's channels."""
+    if not user.channel_ids and not await scenario_sidebar(user, rng):
+        return False
+
+    data = {"channel_id": rng.choice(user.channel_ids)} if user.channel_ids else {}
+    content = rng.randbytes(rng.randint(1_000, 64_000))
+    response = await user.request(
+        "POST /api/v1/files/upload",
+        "POST",
+        "files",
+        "/api/v1/files/upload",
+        data=data,
+        files={"file": ("load-test.bin", content, "application/octet-stream")},
+    )
+    return response is not None
+
+
+Scenario = Callable[[VirtualUser, random.Random], Awaitable[bool]]
+
+SCENARIOS: Dict[str, Tuple[Scenario, float]] = {
+    "login": (scenario_login, 1),
+    "sidebar": (scenario_sidebar, 4),
+    "scroll_history": (scenario_scroll_history, 6),
+    "send_message": (scenario_send_message, 3),
+    "react": (scenario_react, 2),
+    "open_thread": (scenario_open_thread, 2),
+    "upload_file": (scenario_upload_file, 1),
+}
+
+
+def parse_weights(spec: Optional[str], auth_mode: str) -> Dict[str, float]:
+    """Merge ``name=weight,...`` overrides into the default scenario mix."""
+    weights = {name: weight for name, (_, weight) in SCENARIOS.items()}
+    for item in filter(None, (spec or "").split(",")):
+        name, _, value = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name.strip()] = float(value)
+    if auth_mode == "seeded":
+        # Seeded users have no Keycloak account to log in with
+        weights["login"] = 0
+    weights = {name: weight for name, weight in weights.items() if weight > 0}
+    if not weights:
+        raise SystemExit("At least one scenario needs a positive weight")
+    return weights
+
+
+async def run_scenario(
+    name: str, user: VirtualUser, rng: random.Random, recorder: Recorder
+) -> None:
+    """Run one scenario and record its end-to-end latency."""
+    start = time.perf_counter()
+    try:
+        ok = await SCENARIOS[name][0](user, rng)
+        status = "ok" if ok else "failed"
+    except (KeyError, ValueError, IndexError) as e:
+        # Unexpected response body; count it rather than killing the worker
+        ok, status = False, type(e).__name__
+    recorder.record(recorder.scenarios[name], (time.perf_counter() - start) * 1000, status, ok)
+
+
+# ============================================================================
+# Load models
+# ============================================================================
+
+
+async def closed_loop(
+    users: List[VirtualUser],
+    weights: Dict[str, float],
+    recorder: Recorder,
+    deadline: float,
+    think_time: float,
+    seed: int,
+) -> None:
+    """Each virtual user runs scenarios back to back with exponential think time."""
+    names, cum_weights = list(weights), list(weights.values())
+
+    async def worker(index: int, user: VirtualUser) -> None:
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=cum_weights)[0]
+            await run_scenario(name, user, rng, recorder)
+            if think_time > 0:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+
+    await asyncio.gather(*(worker(index, user) for index, user in enumerate(users)))
+
+
+async def open_loop(
+    users: List[VirtualUser],
+    weights: Dict[str, float],
+    recorder: Recorder,
+    deadline: float,
+    rate: float,
+    max_in_flight: int,
+    seed: int,
+) -> None:
+    """Start scenarios at a Poisson arrival rate, independent of response times.
+
+    Arrivals beyond ``max_in_flight`` are dropped and counted, so an overloaded
+    stack shows up as dropped arrivals instead of silently lowering the rate.
+    """
+    rng = random.Random(seed)
+    names, cum_weights = list(weights), list(weights.values())
+    in_flight: set = set()
+    index = 0
+    next_arrival = time.perf_counter()
+
+    while next_arrival < deadline:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_arrival += rng.expovariate(rate)
+
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped_arrivals += 1
+            continue
+        user = users[index % len(users)]
+        index += 1
+        name = rng.choices(names, weights=cum_weights)[0]
+        task = asyncio.create_task(
+            run_scenario(name, user, random.Random(rng.getrandbits(64)), recorder)
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+# ============================================================================
+# Setup and reporting
+# ============================================================================
+
+
+def seeded_identities(profile_name: str, count: int, seed: int) -> List[Tuple[str, str]]:
+    """Pick ``count`` (keycloak_id, username) pairs from a datagen profile."""
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+    from shared.testing.datagen import PROFILES, seeded_users
+
+    identities = seeded_users(PROFILES[profile_name])
+    picked = random.Random(seed).sample(identities, min(count, len(identities)))
+    return [(str(user_id), username) for user_id, username in picked]
+
+
+async def build_users(
+    client: httpx.AsyncClient, recorder: Recorder, args: argparse.Namespace, count: int
+) -> List[VirtualUser]:
+    """Create virtual users and log them in (keycloak mode) before the run."""
+    if args.auth == "seeded":
+        return [
+            VirtualUser(client, recorder, username, token=unsigned_token(keycloak_id))
+            for keycloak_id, username in seeded_identities(args.profile, count, args.seed)
+        ]
+
+    credentials = [item.split(":", 1) for item in args.credentials.split(",") if item]
+    users = [
+        VirtualUser(client, recorder, *credentials[index % len(credentials)])
+        for index in range(count)
+    ]
+    # Virtual users sharing an account log in once; setup logins are not measured
+    setup = Recorder()
+    tokens: Dict[str, Optional[str]] = {}
+    for user in users:
+        if user.username not in tokens:
+            probe = VirtualUser(client, setup, user.username, user.password)
+            tokens[user.username] = probe.token if await probe.login() else None
+        user.token = tokens[user.username]
+    failed = [name for name, token in tokens.items() if token is None]
+    if failed:
+        raise SystemExit(f"Login failed for: {', '.join(failed)}")
+    return users
+
+
+def print_summary(report: Dict) -> None:
+    """Print a per-endpoint latency table."""
+    header = f"{'endpoint':<42} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for section in ("endpoints", "scenarios"):
+        for label, stats in report[section].items():
+            latency = stats["latency_ms"]
+            name = label if section == "endpoints" else f"scenario:{label}"
+            print(
+                f"{name:<42} {stats['count']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} "
+                f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f}"
+            )
+        print("-" * len(header))
+    totals = report["totals"]
+    print(
+        f"{totals['requests']} requests in {report['duration_s']}s "
+        f"({totals['rps']} rps, error rate {totals['error_rate']:.2%}, "
+        f"{totals['dropped_arrivals']} dropped arrivals)"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the Colink HTTP services")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to generate load")
+    parser.add_argument(
+        "--concurrency", type=int, default=20, help="Virtual users in closed-loop mode"
+    )
+    parser.add_argument(
+        "--rate", type=float, help="Scenario arrivals per second (open loop); overrides closed loop"
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=500, help="Open loop: cap on concurrent scenarios"
+    )
+    parser.add_argument(
+        "--users", type=int, help="Distinct virtual users (default: concurrency, or 100 with --rate)"
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=1.0, help="Closed loop: mean pause between scenarios"
+    )
+    parser.add_argument(
+        "--scenarios", help="Weight overrides, e.g. 'send_message=10,upload_file=0'"
+    )
+    parser.add_argument("--auth", choices=["keycloak", "seeded"], default="keycloak")
+    parser.add_argument(
+        "--credentials", default=DEFAULT_CREDENTIALS, help="Keycloak logins as user:pass,..."
+    )
+    parser.add_argument("--profile", default="small", help="Datagen profile for --auth seeded")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--output", default="load_report.json", help="JSON report path")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        help="Exit with status 1 if the overall error rate exceeds this fraction",
+    )
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+    weights = parse_weights(args.scenarios, args.auth)
+    user_count = args.users or (100 if args.rate else args.concurrency)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight) * 2)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        recorder = Recorder()
+        users = await build_users(client, recorder, args, user_count)
+        print(
+            f"Running {len(users)} users for {args.duration}s "
+            f"({'open loop at ' + str(args.rate) + '/s' if args.rate else 'closed loop'})"
+        )
+
+        recorder.started = time.perf_counter()
+        deadline = recorder.started + args.duration
+        if args.rate:
+            await open_loop(
+                users, weights, recorder, deadline, args.rate, args.max_in_flight, args.seed
+            )
+        else:
+            await closed_loop(users, weights, recorder, deadline, args.think_time, args.seed)
+
+    config = {
+        "mode": "open" if args.rate else "closed",
+        "duration_s": args.duration,
+        "concurrency": None if args.rate else args.concurrency,
+        "rate": args.rate,
+        "users": len(users),
+        "think_time_s": None if args.rate else args.think_time,
+        "auth": args.auth,
+        "weights": weights,
+        "services": SERVICE_URLS,
+    }
+    report = recorder.report(config)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(report)
+    print(f"\nReport written to {args.output}")
+
+    if args.max_error_rate is not None and report["totals"]["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,205 @@
+"""Fan-out benchmark for websocket room emits.
+
+Measures how many events per second the websocket service can fan out to N
+sockets spread over M rooms, comparing one ``sio.emit`` per event with the
+micro-batched ``batch`` frames of services.batching, under the default JSON
+and the msgpack packet serializer, optionally with per-message deflate.
+
+Everything runs in-process on a real ``socketio.AsyncServer``: sessions are
+attached through engine.io's connect/message hooks, and each socket gets a
+writer that drains its engine.io queue and encodes every packet, which is
+the work the websocket transport does per frame. Network writes are not
+included, so the numbers are the service's CPU cost of fan-out.
+
+Usage:
+    python scripts/ws_fanout_benchmark.py --sockets 2000 --rooms 50 --events 5000
+    python scripts/ws_fanout_benchmark.py --modes emit,batch --deflate
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from typing import Dict, List
+
+import engineio
+import socketio
+
+sys.path.insert(
+    0,
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "backend", "services", "websocket")
+    ),
+)
+
+from services.batching import RoomBatcher  # noqa: E402
+
+
+def sample_message(index: int, channel_id: str) -> dict:
+    """A new_message payload shaped like the message service's events."""
+    return {
+        "id": f"00000000-0000-4000-8000-{index:012d}",
+        "channel_id": channel_id,
+        "author_id": "6b1f2c1e-3c55-4d0a-9d4b-2f0d3c4b5a69",
+        "content": "Deploy finished, dashboards look healthy. Ping me if anything regresses.",
+        "message_type": "text",
+        "thread_id": None,
+        "created_at": "2026-01-01T12:00:00+00:00",
+        "author": {"username": "grace", "display_name": "Grace Hopper"},
+        "epoch": "3f2a9c1b7d4e",
+        "seq": index,
+    }
+
+
+class Writer:
+    """Drains one engine.io socket the way its websocket writer would."""
+
+    def __init__(self, socket, deflate: bool):
+        self.socket = socket
+        self.frames = 0
+        self.bytes = 0
+        # permessage-deflate keeps a compression context per connection
+        self.compressor = zlib.compressobj(wbits=-15) if deflate else None
+
+    async def run(self):
+        while True:
+            try:
+                packets = await self.socket.poll()
+            except engineio.exceptions.QueueEmpty:  # cancelled at the end of a run
+                return
+            for pkt in packets:
+                encoded = pkt.encode()
+                if self.compressor is not None:
+                    raw = encoded if isinstance(encoded, bytes) else encoded.encode()
+                    encoded = self.compressor.compress(raw) + self.compressor.flush(
+                        zlib.Z_SYNC_FLUSH
+                    )
+                self.frames += 1
+                self.bytes += len(encoded)
+
+
+async def build_server(serializer: str, sockets: int, rooms: List[str], deflate: bool):
+    """A socket.io server with ``sockets`` sessions spread evenly over ``rooms``."""
+    sio = socketio.AsyncServer(async_mode="asgi", serializer=serializer)
+    writers = []
+    for index in range(sockets):
+        eio_sid = f"eio-{index}"
+        sio.eio.sockets[eio_sid] = engineio.async_socket.AsyncSocket(sio.eio, eio_sid)
+        await sio._handle_eio_connect(eio_sid, {})
+        await sio._handle_eio_message(eio_sid, "0")
+        sid = sio.manager.sid_from_eio_sid(eio_sid, "/")
+        await sio.enter_room(sid, rooms[index % len(rooms)])
+        writers.append(Writer(sio.eio.sockets[eio_sid], deflate))
+    # Drop the connect acknowledgements before measuring
+    for writer in writers:
+        await writer.socket.poll()
+    return sio, writers
+
+
+async def run_mode(args: argparse.Namespace, mode: str, serializer: str) -> Dict[str, float]:
+    rooms = [f"channel:{index}" for index in range(args.rooms)]
+    sio, writers = await build_server(serializer, args.sockets, rooms, args.deflate)
+    members = args.sockets / args.rooms
+
+    async def emit_batch(room: str, events: List[list]):
+        if len(events) == 1:
+            await sio.emit(events[0][0], events[0][1], room=room)
+        else:
+            await sio.emit("batch", events, room=room)
+
+    batcher = RoomBatcher(emit_batch, max_events=args.max_batch)
+    rng = random.Random(args.seed)
+    events = [(rooms[rng.randrange(args.rooms)], index) for index in range(args.events)]
+    tasks = [asyncio.create_task(writer.run()) for writer in writers]
+
+    started = time.perf_counter()
+    for offset in range(0, len(events), args.events_per_tick):
+        for room, index in events[offset : offset + args.events_per_tick]:
+            payload = sample_message(index, room.split(":", 1)[1])
+            if mode == "batch":
+                await batcher.add(room, "new_message", payload)
+            else:
+                await sio.emit("new_message", payload, room=room)
+        if mode == "batch":
+            await batcher.flush()
+        # Let the writers run between ticks, as the event loop would
+        await asyncio.sleep(0)
+    await asyncio.gather(*(writer.socket.queue.join() for writer in writers))
+    elapsed = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    frames = sum(writer.frames for writer in writers)
+    sent_bytes = sum(writer.bytes for writer in writers)
+    return {
+        "mode": mode,
+        "serializer": serializer,
+        "deflate": args.deflate,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(args.events / elapsed, 1),
+        "deliveries_per_second": round(args.events * members / elapsed, 1),
+        "frames": frames,
+        "bytes_per_delivery": round(sent_bytes / (args.events * members), 1),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark websocket room fan-out")
+    parser.add_argument("--sockets", type=int, default=2000, help="Connected sockets (N)")
+    parser.add_argument("--rooms", type=int, default=50, help="Rooms the sockets spread over (M)")
+    parser.add_argument("--events", type=int, default=5000, help="Events to fan out")
+    parser.add_argument(
+        "--events-per-tick", type=int, default=250, help="Events arriving per batching tick"
+    )
+    parser.add_argument("--max-batch", type=int, default=100, help="Events per frame at most")
+    parser.add_argument("--modes", default="emit,batch", help="Comma-separated: emit, batch")
+    parser.add_argument(
+        "--serializers", default="default,msgpack", help="Comma-separated socket.io serializers"
+    )
+    parser.add_argument("--deflate", action="store_true", help="Deflate every frame")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional JSON report path")
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+    serializers = args.serializers.split(",")
+    if "msgpack" in serializers:
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            print("msgpack is not installed, skipping the msgpack serializer")
+            serializers.remove("msgpack")
+
+    results = []
+    print(
+        f"{args.sockets} sockets in {args.rooms} rooms, {args.events} events, "
+        f"{args.events_per_tick} per tick"
+    )
+    header = f"{'mode':<6} {'serializer':<10} {'events/s':>10} {'deliveries/s':>14} {'frames':>9} {'B/delivery':>11}"
+    print(header)
+    print("-" * len(header))
+    for serializer in serializers:
+        for mode in args.modes.split(","):
+            result = await run_mode(args, mode, serializer)
+            results.append(result)
+            print(
+                f"{mode:<6} {serializer:<10} {result['events_per_second']:>10.0f} "
+                f"{result['deliveries_per_second']:>14.0f} {result['frames']:>9} "
+                f"{result['bytes_per_delivery']:>11.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,468 @@
+"""In-process load simulator for the websocket service.
+
+Starts the websocket ASGI app (``main:socket_app``) under uvicorn in a
+dedicated thread and event loop, attaches thousands of socket.io clients
+spread over rooms according to a configurable distribution, then injects
+``message.created`` events at a fixed rate and measures:
+
+- end-to-end emit latency (injection to client handler) percentiles
+- events and deliveries per second, and deliveries lost
+- memory per connection (process RSS, and server-side allocations with
+  ``--trace-memory``)
+- event-loop lag of the server loop
+
+Kafka is replaced by an in-memory event source that feeds records through
+the consumer's real routing and dispatch path, and the channel service by a
+stub returning each simulated user's rooms, so clients are subscribed by the
+same membership snapshot logic as in production. Clients run on their own
+loop in the same process and compete for the same CPU, so the numbers are a
+lower bound of what one instance sustains.
+
+Usage:
+    python scripts/ws_load_sim.py --clients 2000 --rooms 200 --rooms-per-client 5
+    python scripts/ws_load_sim.py --distribution zipf --rate 500 --duration 30
+    python scripts/ws_load_sim.py --clients 1000 --batching --trace-memory
+
+``--trace-memory`` slows connects down considerably; with thousands of
+clients, sessions may time out before the events are injected, which shows
+up as dropped connections in the report.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+WEBSOCKET_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "backend", "services", "websocket")
+)
+
+
+def configure_service(args: argparse.Namespace):
+    """Settings are read at import time, so set them before importing the service."""
+    os.environ["DEBUG"] = "false"
+    os.environ["CLIENT_MANAGER"] = "memory"
+    os.environ["EMIT_BATCHING"] = "true" if args.batching else "false"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(WEBSOCKET_DIR)))  # shared.events
+    sys.path.insert(0, WEBSOCKET_DIR)
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_ms(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50": round(percentile(ordered, 50) * 1000, 3),
+        "p95": round(percentile(ordered, 95) * 1000, 3),
+        "p99": round(percentile(ordered, 99) * 1000, 3),
+        "max": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+        "mean": round((sum(ordered) / len(ordered) if ordered else 0.0) * 1000, 3),
+    }
+
+
+class LoopLagMonitor:
+    """Samples how late the server loop wakes up from a fixed sleep."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+def rss_bytes() -> int:
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Allocations made by the server side of a connection
+SERVER_TRACE_FILTERS = [
+    "*/uvicorn/*",
+    "*/websockets/*",
+    "*/engineio/async_server.py",
+    "*/engineio/base_server.py",
+    "*/engineio/async_socket.py",
+    "*/engineio/base_socket.py",
+    "*/engineio/async_drivers/*",
+    "*/socketio/async_server.py",
+    "*/socketio/base_server.py",
+    "*/socketio/async_manager.py",
+    "*/socketio/base_manager.py",
+    f"{WEBSOCKET_DIR}/*",
+]
+
+
+def server_allocated_bytes() -> int:
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, pattern) for pattern in SERVER_TRACE_FILTERS]
+    )
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+# ============================================================================
+# Rooms and users
+# ============================================================================
+
+
+def assign_rooms(args: argparse.Namespace, rng: random.Random) -> list[list[str]]:
+    """Channel IDs each simulated client is a member of."""
+    channels = [f"sim-channel-{index}" for index in range(args.rooms)]
+    per_client = min(args.rooms_per_client, args.rooms)
+    if args.distribution == "single":
+        return [[channels[0]] for _ in range(args.clients)]
+    if args.distribution == "uniform":
+        return [rng.sample(channels, per_client) for _ in range(args.clients)]
+
+    # zipf: a few huge channels and a long tail of small ones
+    weights = [1 / (rank + 1) ** args.zipf_exponent for rank in range(args.rooms)]
+    memberships = []
+    for _ in range(args.clients):
+        chosen: set = set()
+        while len(chosen) < per_client:
+            chosen.add(rng.choices(channels, weights)[0])
+        memberships.append(sorted(chosen))
+    return memberships
+
+
+def unsigned_token(subject: str) -> str:
+    """An unsigned JWT; the websocket service reads claims without verifying."""
+    import base64
+
+    def encode(part: dict) -> str:
+        raw = json.dumps(part, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    claims = {"sub": subject, "preferred_username": subject}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.sim"
+
+
+# ============================================================================
+# Server
+# ============================================================================
+
+
+class ServerThread(threading.Thread):
+    """Runs the websocket app under uvicorn on its own event loop."""
+
+    def __init__(self, port: int, memberships: dict[str, list[str]]):
+        super().__init__(daemon=True)
+        self.port = port
+        self.memberships = memberships
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ready = threading.Event()
+        self.lag = LoopLagMonitor()
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        import main
+        import uvicorn
+        from aiokafka import TopicPartition
+        from aiokafka.structs import ConsumerRecord
+        from services.kafka_consumer import KafkaConsumerService
+
+        # Per-connection INFO logs would dominate the run
+        logging.disable(logging.INFO)
+
+        class InMemoryEventSource(KafkaConsumerService):
+            """Stands in for Kafka: published events go through route() and dispatch()."""
+
+            async def start(self):
+                self.running = True
+                self.start_workers()
+
+            async def publish(self, topic: str, event: dict, key: str):
+                raw = json.dumps(event).encode("utf-8")
+                record = ConsumerRecord(
+                    topic, 0, 0, int(time.time() * 1000), 0, key.encode(), raw,
+                    None, len(key), len(raw), [],
+                )
+                await self.dispatch(TopicPartition(topic, 0), [record])
+
+        async def fetch_memberships(token: str) -> dict:
+            subject = json.loads(_b64(token.split(".")[1]))["sub"]
+            return {"user_id": subject, "channel_ids": self.memberships[subject]}
+
+        self.source = InMemoryEventSource()
+        main.kafka_consumer = self.source
+        main.membership_cache.fetch = fetch_memberships
+
+        self.loop = asyncio.get_running_loop()
+        self.lag.start()
+        config = uvicorn.Config(
+            main.socket_app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on"
+        )
+        self.server = uvicorn.Server(config)
+        serving = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            await asyncio.sleep(0.01)
+        self.ready.set()
+        await serving
+        self.lag.stop()
+
+    def inject(self, channel_id: str, index: int):
+        """Publish a message.created event on the server loop."""
+        event = {
+            "event_type": "message.created",
+            "data": {
+                "id": f"sim-message-{index}",
+                "channel_id": channel_id,
+                "content": "simulated message",
+                "sent_at": time.perf_counter(),
+            },
+        }
+        return asyncio.run_coroutine_threadsafe(
+            self.source.publish("messages", event, channel_id), self.loop
+        )
+
+    def shutdown(self):
+        self.server.should_exit = True
+
+
+def _b64(part: str) -> bytes:
+    import base64
+
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+# ============================================================================
+# Clients
+# ============================================================================
+
+
+class Deliveries:
+    """Latencies of every event every client received."""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.disconnects = 0
+
+    def record(self, payload: dict):
+        sent_at = payload.get("sent_at")
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+
+async def connect_client(url: str, token: str, deliveries: Deliveries):
+    import socketio
+
+    client = socketio.AsyncClient(reconnection=False)
+
+    @client.on("disconnect")
+    async def on_disconnect(*args):
+        deliveries.disconnects += 1
+
+    @client.on("new_message")
+    async def on_message(data):
+        deliveries.record(data)
+
+    @client.on("batch")
+    async def on_batch(events):
+        for event, payload in events:
+            if event == "new_message":
+                deliveries.record(payload)
+
+    await client.connect(url, auth={"token": token}, transports=["websocket"], wait_timeout=30)
+    return client
+
+
+async def connect_all(url: str, tokens: list[str], deliveries: Deliveries, concurrency: int):
+    clients, failures = [], 0
+    for offset in range(0, len(tokens), concurrency):
+        results = await asyncio.gather(
+            *(connect_client(url, token, deliveries) for token in tokens[offset : offset + concurrency]),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                failures += 1
+            else:
+                clients.append(result)
+    return clients, failures
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+
+async def simulate(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    rooms = assign_rooms(args, rng)
+    users = [f"sim-user-{index}" for index in range(args.clients)]
+    memberships = dict(zip(users, rooms, strict=True))
+    room_sizes: dict[str, int] = {}
+    for channels in rooms:
+        for channel_id in channels:
+            room_sizes[channel_id] = room_sizes.get(channel_id, 0) + 1
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = ServerThread(port, memberships)
+    server.start()
+    server.ready.wait(timeout=30)
+
+    if args.trace_memory:
+        tracemalloc.start()
+        server_before = server_allocated_bytes()
+    rss_before = rss_bytes()
+    deliveries = Deliveries()
+    started = time.perf_counter()
+    clients, failures = await connect_all(
+        f"http://127.0.0.1:{port}",
+        [unsigned_token(user) for user in users],
+        deliveries,
+        args.connect_concurrency,
+    )
+    connect_seconds = time.perf_counter() - started
+    # Let the membership snapshots finish joining rooms
+    await asyncio.sleep(1.0)
+    memory = {"rss_per_connection_bytes": round((rss_bytes() - rss_before) / max(len(clients), 1))}
+    if args.trace_memory:
+        memory["server_bytes_per_connection"] = round(
+            (server_allocated_bytes() - server_before) / max(len(clients), 1)
+        )
+        tracemalloc.stop()
+
+    # Events go to rooms in proportion to their membership: busy rooms are busy
+    channel_ids = list(room_sizes)
+    weights = [room_sizes[channel_id] for channel_id in channel_ids]
+    lag_offset = len(server.lag.samples)
+    total = int(args.rate * args.duration)
+    expected = 0
+    futures = []
+    started = time.perf_counter()
+    for index in range(total):
+        target = started + index / args.rate
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        channel_id = rng.choices(channel_ids, weights)[0]
+        expected += room_sizes[channel_id]
+        futures.append(server.inject(channel_id, index))
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+    injected_seconds = time.perf_counter() - started
+
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(deliveries.latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    dropped = deliveries.disconnects
+
+    await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+    server.shutdown()
+    server.join(timeout=10)
+
+    return {
+        "config": vars(args),
+        "connections": {
+            "clients": len(clients),
+            "failed": failures,
+            "dropped": dropped,
+            "connect_seconds": round(connect_seconds, 2),
+            "largest_room": max(room_sizes.values()) if room_sizes else 0,
+        },
+        "memory": memory,
+        "events": {
+            "injected": total,
+            "events_per_second": round(total / injected_seconds, 1) if injected_seconds else 0.0,
+            "deliveries": len(deliveries.latencies),
+            "expected_deliveries": expected,
+            "deliveries_per_second": round(len(deliveries.latencies) / elapsed, 1),
+        },
+        "latency_ms": summarize_ms(deliveries.latencies),
+        "loop_lag_ms": summarize_ms(server.lag.samples[lag_offset:]),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate socket.io load on the websocket service")
+    parser.add_argument("--clients", type=int, default=1000, help="Simulated socket.io clients")
+    parser.add_argument("--rooms", type=int, default=100, help="Channels to spread clients over")
+    parser.add_argument("--rooms-per-client", type=int, default=5)
+    parser.add_argument(
+        "--distribution", choices=["uniform", "zipf", "single"], default="uniform",
+        help="How clients pick rooms (single: everyone in one room)",
+    )
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--rate", type=float, default=200, help="Injected events per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to inject events")
+    parser.add_argument("--drain-timeout", type=float, default=10, help="Seconds to wait for deliveries")
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--batching", action="store_true", help="Enable micro-batched room emits")
+    parser.add_argument("--trace-memory", action="store_true", help="Attribute server-side allocations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="ws_load_report.json", help="JSON report path")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    configure_service(args)
+    report = asyncio.run(simulate(args))
+
+    connections, events = report["connections"], report["events"]
+    latency, lag = report["latency_ms"], report["loop_lag_ms"]
+    print(
+        f"{connections['clients']} clients connected in {connections['connect_seconds']}s "
+        f"({connections['failed']} failed, {connections['dropped']} dropped), largest room {connections['largest_room']}"
+    )
+    print(f"memory: {report['memory']}")
+    print(
+        f"events: {events['injected']} at {events['events_per_second']}/s, "
+        f"{events['deliveries']}/{events['expected_deliveries']} deliveries "
+        f"({events['deliveries_per_second']}/s)"
+    )
+    print(
+        f"latency ms: p50 {latency['p50']} p95 {latency['p95']} p99 {latency['p99']} max {latency['max']}"
+    )
+    print(f"server loop lag ms: p50 {lag['p50']} p99 {lag['p99']} max {lag['max']}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+    return 0 if events["deliveries"] == events["expected_deliveries"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())